@@ -0,0 +1,372 @@
+"""
+AIMS Resilience Module
+Phân loại lỗi, retry có jitter, circuit breaker và rate limit cho các SOAP call tới AIMS
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from functools import wraps
+from typing import Dict, Any, List
+
+logger = logging.getLogger('AIMSResilience')
+
+# Optional transport libraries - only used for error classification
+try:
+    from zeep.exceptions import Fault, TransportError
+    ZEEP_AVAILABLE = True
+except ImportError:
+    ZEEP_AVAILABLE = False
+
+try:
+    from requests.exceptions import (
+        ConnectionError as RequestsConnectionError,
+        Timeout as RequestsTimeout,
+        HTTPError
+    )
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+
+# Error classes
+RETRYABLE = 'retryable'
+FATAL = 'fatal'
+
+# Defaults (override via environment)
+RATE_LIMIT_PER_SEC = float(os.getenv('AIMS_RATE_LIMIT_PER_SEC', '5'))
+RATE_LIMIT_BURST = int(os.getenv('AIMS_RATE_LIMIT_BURST', '10'))
+RATE_LIMIT_MAX_WAIT = float(os.getenv('AIMS_RATE_LIMIT_MAX_WAIT', '30'))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('AIMS_CB_FAILURE_THRESHOLD', '5'))
+BREAKER_RECOVERY_SECONDS = float(os.getenv('AIMS_CB_RECOVERY_SECONDS', '60'))
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the operation's circuit is open"""
+
+    def __init__(self, operation: str, retry_after: float):
+        self.operation = operation
+        self.retry_after = retry_after
+        super().__init__(f"AIMS circuit open for {operation}, retry after {retry_after:.0f}s")
+
+
+class RateLimitTimeout(Exception):
+    """Raised when no rate-limit token became available within the wait budget"""
+
+
+def classify_error(error: Exception) -> str:
+    """
+    Phân loại lỗi thành retryable (lỗi mạng/timeout/5xx) hoặc fatal
+    (SOAP Fault, sai credentials, lỗi 4xx, lỗi parse)
+
+    Returns:
+        str: RETRYABLE or FATAL
+    """
+    if isinstance(error, (CircuitOpenError, RateLimitTimeout)):
+        return FATAL
+
+    if ZEEP_AVAILABLE:
+        if isinstance(error, Fault):
+            return FATAL
+        if isinstance(error, TransportError):
+            status = getattr(error, 'status_code', None)
+            if status is None or status >= 500 or status == 429:
+                return RETRYABLE
+            return FATAL
+
+    if REQUESTS_AVAILABLE:
+        if isinstance(error, (RequestsConnectionError, RequestsTimeout)):
+            return RETRYABLE
+        if isinstance(error, HTTPError):
+            status = getattr(error.response, 'status_code', None)
+            if status is None or status >= 500 or status == 429:
+                return RETRYABLE
+            return FATAL
+
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return RETRYABLE
+
+    return FATAL
+
+
+def is_remote_answer(error: Exception) -> bool:
+    """
+    True if AIMS itself answered with the error (SOAP Fault or 4xx) - proof
+    the service is up; local errors (parse, bad arguments, ...) prove nothing
+    """
+    if ZEEP_AVAILABLE:
+        if isinstance(error, Fault):
+            return True
+        if isinstance(error, TransportError):
+            status = getattr(error, 'status_code', None)
+            return status is not None and 400 <= status < 500 and status != 429
+
+    if REQUESTS_AVAILABLE and isinstance(error, HTTPError):
+        status = getattr(error.response, 'status_code', None)
+        return status is not None and 400 <= status < 500 and status != 429
+
+    return False
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket dùng chung cho mọi AIMS call
+
+    Args:
+        rate_per_sec: Số token nạp lại mỗi giây
+        capacity: Số token tối đa (burst)
+    """
+
+    def __init__(self, rate_per_sec: float = RATE_LIMIT_PER_SEC, capacity: int = RATE_LIMIT_BURST):
+        self.rate = max(rate_per_sec, 0.001)
+        self.capacity = max(capacity, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.total_acquired = 0
+        self.total_waited_seconds = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Block until a token is available; False if timeout expires first"""
+        start = time.monotonic()
+        deadline = start + timeout if timeout is not None else None
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.total_acquired += 1
+                    self.total_waited_seconds += now - start
+                    return True
+                wait = (1 - self._tokens) / self.rate
+
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def get_state(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                'rate_per_sec': self.rate,
+                'capacity': self.capacity,
+                'available_tokens': round(self._tokens, 2),
+                'total_acquired': self.total_acquired,
+                'total_waited_seconds': round(self.total_waited_seconds, 3)
+            }
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker cho một SOAP operation
+
+    - closed: cho phép mọi call, đếm lỗi retryable liên tiếp
+    - open: từ chối ngay (fail fast) cho tới khi hết recovery_timeout
+    - half_open: cho phép đúng một call thử; thành công -> closed, lỗi -> open
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        operation: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        recovery_timeout: float = BREAKER_RECOVERY_SECONDS
+    ):
+        self.operation = operation
+        self.failure_threshold = max(failure_threshold, 1)
+        self.recovery_timeout = recovery_timeout
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.total_failures = 0
+        self.total_rejected = 0
+        self.last_error = None
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must be rejected"""
+        with self._lock:
+            if self._state == self.OPEN:
+                remaining = self._opened_at + self.recovery_timeout - time.monotonic()
+                if remaining > 0:
+                    self.total_rejected += 1
+                    raise CircuitOpenError(self.operation, remaining)
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+
+            if self._state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self.total_rejected += 1
+                    raise CircuitOpenError(self.operation, self.recovery_timeout)
+                self._probe_in_flight = True
+
+    def cancel_probe(self):
+        """Release a half-open probe slot that was never used"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit for {self.operation} closed")
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self, error: Exception = None):
+        with self._lock:
+            self._consecutive_failures += 1
+            self.total_failures += 1
+            self.last_error = str(error) if error else None
+            self._probe_in_flight = False
+
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(
+                        f"Circuit for {self.operation} opened after "
+                        f"{self._consecutive_failures} consecutive failures"
+                    )
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def is_open(self) -> bool:
+        """True while calls are being rejected (open and recovery time not elapsed)"""
+        with self._lock:
+            return (
+                self._state == self.OPEN
+                and time.monotonic() < self._opened_at + self.recovery_timeout
+            )
+
+    def get_state(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_after = None
+            if self._state == self.OPEN:
+                retry_after = max(0.0, self._opened_at + self.recovery_timeout - time.monotonic())
+            return {
+                'state': self._state,
+                'consecutive_failures': self._consecutive_failures,
+                'total_failures': self.total_failures,
+                'total_rejected': self.total_rejected,
+                'retry_after_seconds': round(retry_after, 1) if retry_after is not None else None,
+                'last_error': self.last_error
+            }
+
+
+# Shared registry - one breaker per operation, one bucket per process
+_breakers = {}
+_breakers_lock = threading.Lock()
+_rate_limiter = None
+
+
+def get_circuit_breaker(operation: str) -> CircuitBreaker:
+    """Get or create the circuit breaker for a SOAP operation"""
+    with _breakers_lock:
+        breaker = _breakers.get(operation)
+        if breaker is None:
+            breaker = CircuitBreaker(operation)
+            _breakers[operation] = breaker
+        return breaker
+
+
+def get_breaker_states() -> Dict[str, Dict[str, Any]]:
+    """Get state of every known circuit breaker"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.operation: b.get_state() for b in breakers}
+
+
+def get_open_circuits(operations: List[str] = None) -> List[str]:
+    """List operations whose circuit currently rejects calls"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [
+        b.operation for b in breakers
+        if b.is_open() and (operations is None or b.operation in operations)
+    ]
+
+
+def get_rate_limiter() -> TokenBucket:
+    """Get or create the shared AIMS token bucket"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _breakers_lock:
+            if _rate_limiter is None:
+                _rate_limiter = TokenBucket()
+    return _rate_limiter
+
+
+def resilient_call(
+    operation: str,
+    max_retries: int = 3,
+    base_delay: float = 1.0,
+    max_delay: float = 10.0
+):
+    """
+    Decorator thay cho retry đơn giản: rate limit, circuit breaker,
+    chỉ retry lỗi retryable với full-jitter backoff
+
+    Args:
+        operation: Tên SOAP operation (key của circuit breaker)
+        max_retries: Số lần thử tối đa
+        base_delay: Delay cơ sở (seconds)
+        max_delay: Delay tối đa cho mỗi lần chờ (seconds)
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            breaker = get_circuit_breaker(operation)
+            limiter = get_rate_limiter()
+
+            for attempt in range(1, max_retries + 1):
+                breaker.before_call()
+                if not limiter.acquire(timeout=RATE_LIMIT_MAX_WAIT):
+                    breaker.cancel_probe()
+                    raise RateLimitTimeout(f"No AIMS rate-limit token for {operation} within {RATE_LIMIT_MAX_WAIT}s")
+
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as e:
+                    if classify_error(e) == FATAL:
+                        # Do not retry or trip the breaker; only an answer from AIMS counts as liveness
+                        if is_remote_answer(e):
+                            breaker.record_success()
+                        else:
+                            breaker.cancel_probe()
+                        logger.error(f"{operation} failed with non-retryable error: {e}")
+                        raise
+
+                    breaker.record_failure(e)
+                    if attempt >= max_retries:
+                        logger.error(f"All {max_retries} attempts failed for {operation}")
+                        raise
+                    if breaker.is_open():
+                        logger.error(f"Circuit opened for {operation}, giving up: {e}")
+                        raise
+
+                    delay = random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+                    logger.warning(
+                        f"Attempt {attempt}/{max_retries} for {operation} failed: {e}. "
+                        f"Retrying in {delay:.2f}s..."
+                    )
+                    time.sleep(delay)
+                    continue
+
+                breaker.record_success()
+                return result
+        return wrapper
+    return decorator
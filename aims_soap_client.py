@@ -4,11 +4,20 @@ Kết nối AIMS Web Service (SOAP 1.1) để lấy dữ liệu phi hành đoàn
 """
 
 import os
+import time
 import logging
+import threading
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
-from functools import wraps
-import time
+
+from aims_resilience import (
+    resilient_call,
+    get_circuit_breaker,
+    get_breaker_states,
+    get_open_circuits,
+    get_rate_limiter
+)
+from aims_transport import TransportConfig, TransportMetrics, AIMSTransport, build_session
 
 # Load environment variables from .env file
 try:
@@ -31,10 +40,11 @@ logger = logging.getLogger('AIMSSoapClient')
 # Try to import zeep, provide fallback message if not installed
 try:
     from zeep import Client
-    from zeep.transports import Transport
     from zeep.exceptions import Fault, TransportError
-    from requests import Session
+    from zeep.wsdl.utils import etree_to_string
     from requests.exceptions import RequestException
+    # lxml ships with zeep; used to parse FlightDetailsForPeriod incrementally
+    from lxml import etree as lxml_etree
     ZEEP_AVAILABLE = True
 except ImportError:
     ZEEP_AVAILABLE = False
@@ -48,26 +58,6 @@ except ImportError:
     logger.warning("pytz not installed. Run: pip install pytz")
 
 
-def retry_on_failure(max_retries: int = 3, base_delay: float = 1.0):
-    """Decorator for retry logic with exponential backoff"""
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            last_exception = None
-            for attempt in range(max_retries):
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    last_exception = e
-                    delay = base_delay * (2 ** attempt)
-                    logger.warning(f"Attempt {attempt + 1}/{max_retries} failed: {e}. Retrying in {delay}s...")
-                    time.sleep(delay)
-            logger.error(f"All {max_retries} attempts failed for {func.__name__}")
-            raise last_exception
-        return wrapper
-    return decorator
-
-
 class AIMSSoapClient:
     """
     AIMS Web Service SOAP Client
@@ -83,7 +73,9 @@ class AIMSSoapClient:
         wsdl_url: str = None,
         username: str = None,
         password: str = None,
-        timeout: int = 30
+        timeout: int = None,
+        stream_flights: bool = None,
+        transport_config: TransportConfig = None
     ):
         """
         Khởi tạo AIMS SOAP Client
@@ -92,7 +84,10 @@ class AIMSSoapClient:
             wsdl_url: URL của WSDL endpoint
             username: Tên đăng nhập AIMS
             password: Mật khẩu AIMS
-            timeout: Timeout cho requests (seconds)
+            timeout: Timeout mặc định cho requests (seconds, default: AIMS_TIMEOUT or 30)
+            stream_flights: Parse FlightDetailsForPeriod incrementally
+                (default: AIMS_STREAM_FLIGHTS env)
+            transport_config: Pool size, keep-alive, compression, per-operation timeouts
         """
         # Load from environment if not provided
         self.wsdl_url = wsdl_url or os.getenv(
@@ -101,10 +96,18 @@ class AIMSSoapClient:
         )
         self.username = username or os.getenv('AIMS_USERNAME', '')
         self.password = password or os.getenv('AIMS_PASSWORD', '')
-        self.timeout = timeout
+        self.transport_config = transport_config or TransportConfig(default_timeout=timeout)
+        self.timeout = self.transport_config.default_timeout
+        self.transport_metrics = TransportMetrics()
+        if stream_flights is None:
+            stream_flights = os.getenv('AIMS_STREAM_FLIGHTS', 'false').lower() == 'true'
+        self.stream_flights = stream_flights
         
         self._client = None
         self._service = None
+        self._session = None
+        self._flight_item_elements = None
+        self._init_lock = threading.Lock()
         
         # Timezone for Vietnam
         self.gmt7 = pytz.timezone('Asia/Ho_Chi_Minh') if PYTZ_AVAILABLE else None
@@ -115,19 +118,43 @@ class AIMSSoapClient:
         if not ZEEP_AVAILABLE:
             raise ImportError("zeep library not installed. Run: pip install zeep")
             
-        if self._client is None:
+        if self._client is not None:
+            return
+        
+        # Scheduler and API threads may race on first use - build one client only
+        with self._init_lock:
+            if self._client is not None:
+                return
             try:
-                session = Session()
-                session.verify = True  # SSL verification
-                transport = Transport(session=session, timeout=self.timeout)
+                session = build_session(self.transport_config)
+                transport = AIMSTransport(
+                    config=self.transport_config,
+                    metrics=self.transport_metrics,
+                    session=session
+                )
                 
-                self._client = Client(self.wsdl_url, transport=transport)
-                self._service = self._client.service
+                client = Client(self.wsdl_url, transport=transport)
+                self._session = session
+                self._service = client.service
+                self._client = client
                 logger.info(f"AIMS SOAP Client initialized: {self.wsdl_url}")
             except Exception as e:
                 logger.error(f"Failed to initialize AIMS client: {e}")
                 raise
                 
+    def get_transport_metrics(self) -> Dict[str, Any]:
+        """
+        Transport metrics: request latency per SOAP operation and connection reuse
+        
+        Returns:
+            dict: {'config': ..., 'operations': {op: {...}}, 'connections': {...}}
+        """
+        return {
+            'config': self.transport_config.to_dict(),
+            'operations': self.transport_metrics.operations(),
+            'connections': TransportMetrics.pool_stats(self._session)
+        }
+    
     def is_configured(self) -> bool:
         """Check if credentials are configured"""
         return bool(self.username and self.password)
@@ -148,7 +175,11 @@ class AIMSSoapClient:
             'message': '',
             'wsdl_url': self.wsdl_url,
             'credentials_configured': self.is_configured(),
-            'operations': []
+            'operations': [],
+            'circuit_breakers': get_breaker_states(),
+            'open_circuits': get_open_circuits(),
+            'rate_limiter': get_rate_limiter().get_state(),
+            'transport': self.get_transport_metrics()
         }
         
         if not ZEEP_AVAILABLE:
@@ -165,8 +196,10 @@ class AIMSSoapClient:
                     for operation in port.binding._operations.values():
                         result['operations'].append(operation.name)
             
-            result['status'] = 'ok'
+            result['status'] = 'degraded' if result['open_circuits'] else 'ok'
             result['message'] = f'Connected. Found {len(result["operations"])} operations.'
+            if result['open_circuits']:
+                result['message'] += f' Circuit open for: {", ".join(result["open_circuits"])}.'
             logger.info(f"AIMS Connection test: OK - {len(result['operations'])} operations available")
             
         except Exception as e:
@@ -203,7 +236,7 @@ class AIMSSoapClient:
             utc_dt = self.utc.localize(utc_dt)
         return utc_dt.astimezone(self.gmt7)
     
-    @retry_on_failure(max_retries=3)
+    @resilient_call('CrewMemberRosterDetailsForPeriod', max_retries=3)
     def get_crew_roster(
         self, 
         crew_id: int,
@@ -297,7 +330,71 @@ class AIMSSoapClient:
             logger.error(f"Error in get_crew_roster: {e}")
             raise
     
-    @retry_on_failure(max_retries=3)
+    # TAIMSFlight child elements read by _build_flight_dict
+    FLIGHT_FIELDS = (
+        'FlightDD', 'FlightMM', 'FlightYY', 'FlightCarrier', 'FlightNo',
+        'FlightDep', 'FlightArr', 'FlightReg', 'FlightAcType', 'FlightStatus',
+        'FlightStd', 'FlightSta', 'FlightAtd', 'FlightAta'
+    )
+    
+    def _flight_period_params(self, from_date: datetime, to_date: datetime) -> Dict[str, str]:
+        """Build FlightDetailsForPeriod request parameters"""
+        from_parts = self._format_date_parts(from_date)
+        to_parts = self._format_date_parts(to_date)
+        return {
+            'UN': self.username,
+            'PSW': self.password,
+            'FromDD': from_parts['DD'],
+            'FromMMonth': from_parts['MM'],
+            'FromYYYY': from_parts['YYYY'],
+            'FromHH': '00',
+            'FromMMin': '00',
+            'ToDD': to_parts['DD'],
+            'ToMMonth': to_parts['MM'],
+            'ToYYYY': to_parts['YYYY'],
+            'ToHH': '23',
+            'ToMMin': '59'
+        }
+    
+    def _build_flight_dict(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Map one TAIMSFlight (field name -> value) to the fact_actuals dict
+        
+        Shared by the zeep path and the streaming path so both produce identical output.
+        """
+        flight_date = f"{values.get('FlightDD')}/{values.get('FlightMM')}/{values.get('FlightYY')}"
+        
+        return {
+            # Map to fact_actuals schema
+            # Calculate block time in minutes from ATD/ATA
+            'block_minutes': self._calculate_block_minutes(
+                values.get('FlightAtd'),
+                values.get('FlightAta')
+            ),
+            'dep_actual_dt': self._parse_aims_datetime(
+                flight_date,
+                values.get('FlightAtd') or values.get('FlightStd')
+            ),
+            'ac_reg': values.get('FlightReg'),
+            
+            # Additional useful fields
+            'flight_no': f"{values.get('FlightCarrier')}{values.get('FlightNo')}",
+            'departure': values.get('FlightDep'),
+            'arrival': values.get('FlightArr'),
+            'status': values.get('FlightStatus'),
+            'ac_type': values.get('FlightAcType'),
+            
+            # Schedule times
+            'std': values.get('FlightStd'),
+            'sta': values.get('FlightSta'),
+            'atd': values.get('FlightAtd'),
+            'ata': values.get('FlightAta'),
+            
+            # Flight date
+            'flight_date': flight_date
+        }
+    
+    @resilient_call('FlightDetailsForPeriod', max_retries=3)
     def get_flight_details(
         self,
         from_date: datetime,
@@ -322,60 +419,16 @@ class AIMSSoapClient:
         """
         self._init_client()
         
-        from_parts = self._format_date_parts(from_date)
-        to_parts = self._format_date_parts(to_date)
-        
         try:
             response = self._service.FlightDetailsForPeriod(
-                UN=self.username,
-                PSW=self.password,
-                FromDD=from_parts['DD'],
-                FromMMonth=from_parts['MM'],
-                FromYYYY=from_parts['YYYY'],
-                FromHH='00',
-                FromMMin='00',
-                ToDD=to_parts['DD'],
-                ToMMonth=to_parts['MM'],
-                ToYYYY=to_parts['YYYY'],
-                ToHH='23',
-                ToMMin='59'
+                **self._flight_period_params(from_date, to_date)
             )
             
             flights = []
             if hasattr(response, 'FlightList') and response.FlightList:
                 for flight in response.FlightList.TAIMSFlight:
-                    # Calculate block time in minutes from ATD/ATA
-                    block_minutes = self._calculate_block_minutes(
-                        getattr(flight, 'FlightAtd', ''),
-                        getattr(flight, 'FlightAta', '')
-                    )
-                    
-                    flight_data = {
-                        # Map to fact_actuals schema
-                        'block_minutes': block_minutes,
-                        'dep_actual_dt': self._parse_aims_datetime(
-                            f"{getattr(flight, 'FlightDD', '')}/{getattr(flight, 'FlightMM', '')}/{getattr(flight, 'FlightYY', '')}",
-                            getattr(flight, 'FlightAtd', '') or getattr(flight, 'FlightStd', '')
-                        ),
-                        'ac_reg': getattr(flight, 'FlightReg', ''),
-                        
-                        # Additional useful fields
-                        'flight_no': f"{getattr(flight, 'FlightCarrier', '')}{getattr(flight, 'FlightNo', '')}",
-                        'departure': getattr(flight, 'FlightDep', ''),
-                        'arrival': getattr(flight, 'FlightArr', ''),
-                        'status': getattr(flight, 'FlightStatus', ''),
-                        'ac_type': getattr(flight, 'FlightAcType', ''),
-                        
-                        # Schedule times
-                        'std': getattr(flight, 'FlightStd', ''),
-                        'sta': getattr(flight, 'FlightSta', ''),
-                        'atd': getattr(flight, 'FlightAtd', ''),
-                        'ata': getattr(flight, 'FlightAta', ''),
-                        
-                        # Flight date
-                        'flight_date': f"{getattr(flight, 'FlightDD', '')}/{getattr(flight, 'FlightMM', '')}/{getattr(flight, 'FlightYY', '')}"
-                    }
-                    flights.append(flight_data)
+                    values = {field: getattr(flight, field, '') for field in self.FLIGHT_FIELDS}
+                    flights.append(self._build_flight_dict(values))
             
             logger.info(f"Fetched {len(flights)} flight details for period {from_date.date()} to {to_date.date()}")
             
@@ -395,7 +448,158 @@ class AIMSSoapClient:
             logger.error(f"Error in get_flight_details: {e}")
             raise
     
-    @retry_on_failure(max_retries=3)
+    @resilient_call('FlightDetailsForPeriod', max_retries=3)
+    def _open_flight_details_stream(self, from_date: datetime, to_date: datetime):
+        """
+        POST FlightDetailsForPeriod bypassing zeep's response parsing
+        
+        zeep still builds the envelope from the WSDL; the HTTP response is
+        returned unread (stream=True) so the body can be parsed incrementally.
+        """
+        self._init_client()
+        
+        operation = 'FlightDetailsForPeriod'
+        envelope = self._client.create_message(
+            self._service, operation, **self._flight_period_params(from_date, to_date)
+        )
+        binding = self._service._binding
+        address = self._service._binding_options['address']
+        soap_action = binding._operations[operation].soapaction or ''
+        
+        started = time.perf_counter()
+        try:
+            response = self._session.post(
+                address,
+                data=etree_to_string(envelope),
+                headers={'Content-Type': 'text/xml; charset=utf-8', 'SOAPAction': f'"{soap_action}"'},
+                stream=True,
+                timeout=self.transport_config.timeout_for(operation)
+            )
+        except Exception:
+            self.transport_metrics.record(operation, time.perf_counter() - started, ok=False)
+            raise
+        # Latency to response headers; the body is consumed by the caller
+        self.transport_metrics.record(operation, time.perf_counter() - started, ok=response.status_code == 200)
+        
+        if response.status_code != 200:
+            content = response.content
+            response.close()
+            fault = self._extract_soap_fault(content)
+            if fault:
+                raise Fault(fault)
+            raise TransportError(
+                f"FlightDetailsForPeriod returned HTTP {response.status_code}",
+                status_code=response.status_code,
+                content=content
+            )
+        
+        # Let urllib3 undo gzip/deflate while we read the raw stream
+        response.raw.decode_content = True
+        return response
+    
+    def _extract_soap_fault(self, content: bytes) -> Optional[str]:
+        """Return the faultstring of a SOAP Fault body, or None"""
+        try:
+            root = lxml_etree.fromstring(content)
+        except Exception:
+            return None
+        for elem in root.iter():
+            if isinstance(elem.tag, str) and elem.tag.rsplit('}', 1)[-1] == 'faultstring':
+                return elem.text or 'SOAP Fault'
+        return None
+    
+    def _get_flight_item_elements(self) -> Dict[str, Any]:
+        """
+        Map TAIMSFlight child name -> zeep schema element, read from the WSDL
+        
+        The streaming parser converts each field with the element zeep uses,
+        so values match get_flight_details (e.g. FlightDD as int).
+        """
+        if self._flight_item_elements is None:
+            operation = self._service._binding._operations['FlightDetailsForPeriod']
+            pending = [operation.output.body]
+            elements = {}
+            while pending:
+                element = pending.pop()
+                children = getattr(element.type, 'elements', None) or []
+                if element.name == 'TAIMSFlight':
+                    elements = dict(children)
+                    break
+                pending.extend(child for _, child in children)
+            self._flight_item_elements = elements
+        return self._flight_item_elements
+    
+    def _iter_taims_flights(self, stream):
+        """
+        Incrementally parse a FlightDetailsForPeriod envelope
+        
+        Yields one {field: value} dict per TAIMSFlight and frees each element
+        right after, so memory stays flat regardless of window size.
+        A read or parse error mid-body counts as a failure on the
+        FlightDetailsForPeriod circuit breaker, like a failed call.
+        """
+        elements = self._get_flight_item_elements()
+        schema = self._client.wsdl.types
+        try:
+            for _, elem in lxml_etree.iterparse(stream, events=('end',), tag='{*}TAIMSFlight'):
+                values = {}
+                for child in elem:
+                    name = lxml_etree.QName(child).localname
+                    element = elements.get(name)
+                    values[name] = element.parse(child, schema) if element is not None else child.text
+                yield values
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+        except Exception as e:
+            # resilient_call only saw the response headers succeed
+            get_circuit_breaker('FlightDetailsForPeriod').record_failure(e)
+            logger.error(f"FlightDetailsForPeriod stream failed mid-body: {e}")
+            raise
+    
+    def _stream_flights(self, response, from_date: datetime, to_date: datetime):
+        """Yield flight dicts from an open FlightDetailsForPeriod response, then close it"""
+        count = 0
+        try:
+            for values in self._iter_taims_flights(response.raw):
+                count += 1
+                yield self._build_flight_dict(values)
+        finally:
+            response.close()
+            logger.info(f"Streamed {count} flight details for period {from_date.date()} to {to_date.date()}")
+    
+    def get_flight_details_stream(self, from_date: datetime, to_date: datetime) -> Dict[str, Any]:
+        """
+        Streaming variant of get_flight_details (raw-response mode)
+        
+        Same result shape and SOAP Fault handling as get_flight_details, but
+        'flights' is a lazy iterator parsed while AIMS is still sending instead
+        of a list of zeep objects, and 'count' is None. Connection errors before
+        the first byte are retried by the resilience layer.
+        
+        Args:
+            from_date: Ngày bắt đầu
+            to_date: Ngày kết thúc
+            
+        Returns:
+            dict: {'success', 'from_date', 'to_date', 'count', 'flights', 'error'}
+        """
+        try:
+            response = self._open_flight_details_stream(from_date, to_date)
+        except Fault as e:
+            logger.error(f"SOAP Fault in get_flight_details_stream: {e}")
+            return {'success': False, 'error': str(e), 'flights': []}
+        
+        return {
+            'success': True,
+            'from_date': from_date.isoformat(),
+            'to_date': to_date.isoformat(),
+            'count': None,
+            'flights': self._stream_flights(response, from_date, to_date),
+            'error': None
+        }
+    
+    @resilient_call('GetCrewList', max_retries=3)
     def get_crew_list(
         self,
         from_date: datetime = None,
@@ -594,7 +798,7 @@ class AIMSSoapClient:
         ata = raw.get('ATA') or raw.get('STA')
         return self._calculate_block_minutes(atd, ata)
     
-    @retry_on_failure(max_retries=3)
+    @resilient_call('FetchLegMembersPerDay', max_retries=3)
     def fetch_leg_members_per_day(self, date: datetime) -> Dict[str, Any]:
         """
         FetchLegMembersPerDay - Lấy tất cả chuyến bay và phi hành đoàn trong ngày
@@ -679,7 +883,7 @@ class AIMSSoapClient:
             logger.error(f"Error in fetch_leg_members_per_day: {e}")
             raise
     
-    @retry_on_failure(max_retries=3)
+    @resilient_call('FetchCrewQuals', max_retries=3)
     def fetch_crew_quals(self, crew_id: int = 0) -> Dict[str, Any]:
         """
         FetchCrewQuals - Lấy ID, Name, Qualifications của tổ bay
@@ -738,7 +942,7 @@ class AIMSSoapClient:
             logger.error(f"Error in fetch_crew_quals: {e}")
             raise
     
-    @retry_on_failure(max_retries=3)
+    @resilient_call('CrewScheduleChangesForPeriod', max_retries=3)
     def crew_schedule_changes_for_period(
         self, 
         from_date: datetime, 
@@ -853,6 +1057,9 @@ if __name__ == '__main__':
         print(f"\nStatus: {result['status']}")
         print(f"Message: {result['message']}")
         
+        if result['open_circuits']:
+            print(f"Open circuits: {', '.join(result['open_circuits'])}")
+        
         if result['status'] == 'ok':
             print(f"\nAvailable operations ({len(result['operations'])}):")
             for op in sorted(result['operations'])[:10]:
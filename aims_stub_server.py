@@ -0,0 +1,675 @@
+"""
+AIMS SOAP Stand-in Server
+Giả lập AIMS Web Service (SOAP 1.1) chạy local với dữ liệu tổng hợp có thể scale,
+dùng để chạy thử và benchmark ETL khi không có mạng / không có endpoint thật
+
+Usage:
+    python aims_stub_server.py --port 8765 --aircraft 80 --crew 3000
+    AIMS_WSDL_URL=http://127.0.0.1:8765/aimswebservice?singlewsdl python etl_scheduler.py --run-once
+
+Runtime control (latency / fault injection):
+    GET /_control?latency_ms=200&fault_rate=0.1&http_error_rate=0.05&operations=FlightDetailsForPeriod
+    GET /_stats
+"""
+
+import json
+import time
+import random
+import logging
+import threading
+import xml.etree.ElementTree as ET
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import escape
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('AIMSStubServer')
+
+TNS = 'http://tempuri.org/'
+SOAP_ENV_NS = 'http://schemas.xmlsoap.org/soap/envelope/'
+
+# ==================== SOAP CONTRACT ====================
+# Item types returned inside list wrappers (field -> nested array type, or None for string)
+
+ITEM_TYPES = {
+    'TAIMSFlight': [
+        'FlightDD', 'FlightMM', 'FlightYY', 'FlightCarrier', 'FlightNo',
+        'FlightDep', 'FlightArr', 'FlightReg', 'FlightAcType', 'FlightStatus',
+        'FlightStd', 'FlightSta', 'FlightAtd', 'FlightAta'
+    ],
+    'TAIMSCrewMember': ['ID', 'Name', 'Role'],
+    'TAIMSLegMember': ['Flt', 'Reg', 'Dep', 'Arr', 'STD', 'STA', ('CrewList', 'TAIMSCrewMember')],
+    'TAIMSCrewRostItm': [
+        'CrewId', 'Day', 'Flt', 'Carrier', 'Dep', 'Arr', 'STD', 'STA',
+        'ATD', 'ATA', 'CROUTE', 'CrewBase'
+    ],
+    'TAIMSCrewQual': ['ID', 'Name', 'Quals', 'Base', 'Rank'],
+    'TAIMSScheduleChange': ['CrewId', 'ChangeType', 'ChangeDate', 'OldValue', 'NewValue', 'Reason'],
+    'TAIMSGetCrewItm': [
+        'Id', 'CrewName', 'ShortName', 'Quals', 'Email', 'Location',
+        'Nationality', 'EmploymentDate', 'ContactCell'
+    ],
+}
+
+# Non-string fields (AIMS types the flight date parts as int; zeep returns them as int)
+FIELD_XSD_TYPES = {
+    'TAIMSFlight': {'FlightDD': 'int', 'FlightMM': 'int', 'FlightYY': 'int'},
+}
+
+# Operation -> (request params [(name, xsd type)], list element name, item type)
+OPERATIONS = {
+    'FlightDetailsForPeriod': (
+        [('UN', 'string'), ('PSW', 'string'),
+         ('FromDD', 'string'), ('FromMMonth', 'string'), ('FromYYYY', 'string'),
+         ('FromHH', 'string'), ('FromMMin', 'string'),
+         ('ToDD', 'string'), ('ToMMonth', 'string'), ('ToYYYY', 'string'),
+         ('ToHH', 'string'), ('ToMMin', 'string')],
+        'FlightList', 'TAIMSFlight'
+    ),
+    'FetchLegMembersPerDay': (
+        [('UN', 'string'), ('PSW', 'string'),
+         ('DD', 'string'), ('MM', 'string'), ('YYYY', 'string')],
+        'LegList', 'TAIMSLegMember'
+    ),
+    'CrewMemberRosterDetailsForPeriod': (
+        [('UN', 'string'), ('PSW', 'string'), ('ID', 'int'),
+         ('FmDD', 'string'), ('FmMM', 'string'), ('FmYY', 'string'),
+         ('ToDD', 'string'), ('ToMM', 'string'), ('ToYY', 'string')],
+        'TAIMSCrewRostDetailList', 'TAIMSCrewRostItm'
+    ),
+    'FetchCrewQuals': (
+        [('UN', 'string'), ('PSW', 'string'), ('ID', 'int')],
+        'QualsList', 'TAIMSCrewQual'
+    ),
+    'CrewScheduleChangesForPeriod': (
+        [('UN', 'string'), ('PSW', 'string'),
+         ('FmDD', 'string'), ('FmMM', 'string'), ('FmYY', 'string'),
+         ('ToDD', 'string'), ('ToMM', 'string'), ('ToYY', 'string')],
+        'ChangeList', 'TAIMSScheduleChange'
+    ),
+    'GetCrewList': (
+        [('UN', 'string'), ('PSW', 'string'), ('ID', 'int'), ('PrimaryQualify', 'boolean'),
+         ('FmDD', 'string'), ('FmMM', 'string'), ('FmYY', 'string'),
+         ('ToDD', 'string'), ('ToMM', 'string'), ('ToYY', 'string'),
+         ('BaseStr', 'string'), ('ACStr', 'string'), ('PosStr', 'string')],
+        'CrewList', 'TAIMSGetCrewItm'
+    ),
+}
+
+
+def build_wsdl(location: str) -> str:
+    """Build a document/literal WSDL describing the stub operations"""
+    types = []
+    for item_type, fields in ITEM_TYPES.items():
+        xsd_types = FIELD_XSD_TYPES.get(item_type, {})
+        elements = []
+        for field in fields:
+            if isinstance(field, tuple):
+                name, nested = field
+                elements.append(f'<s:element minOccurs="0" name="{name}" type="tns:ArrayOf{nested}"/>')
+            else:
+                elements.append(f'<s:element minOccurs="0" name="{field}" type="s:{xsd_types.get(field, "string")}"/>')
+        types.append(f'<s:complexType name="{item_type}"><s:sequence>{"".join(elements)}</s:sequence></s:complexType>')
+        types.append(
+            f'<s:complexType name="ArrayOf{item_type}"><s:sequence>'
+            f'<s:element minOccurs="0" maxOccurs="unbounded" name="{item_type}" type="tns:{item_type}"/>'
+            f'</s:sequence></s:complexType>'
+        )
+
+    messages, port_ops, binding_ops = [], [], []
+    for op, (params, list_name, item_type) in OPERATIONS.items():
+        param_xml = ''.join(
+            f'<s:element minOccurs="0" name="{name}" type="s:{xsd}"/>' for name, xsd in params
+        )
+        types.append(f'<s:element name="{op}"><s:complexType><s:sequence>{param_xml}</s:sequence></s:complexType></s:element>')
+        types.append(
+            f'<s:complexType name="{op}ResultType"><s:sequence>'
+            f'<s:element minOccurs="0" name="ErrorExplanation" type="s:string"/>'
+            f'<s:element minOccurs="0" name="{list_name}" type="tns:ArrayOf{item_type}"/>'
+            f'</s:sequence></s:complexType>'
+        )
+        types.append(
+            f'<s:element name="{op}Response"><s:complexType><s:sequence>'
+            f'<s:element minOccurs="0" name="{op}Result" type="tns:{op}ResultType"/>'
+            f'</s:sequence></s:complexType></s:element>'
+        )
+        messages.append(
+            f'<wsdl:message name="{op}SoapIn"><wsdl:part name="parameters" element="tns:{op}"/></wsdl:message>'
+            f'<wsdl:message name="{op}SoapOut"><wsdl:part name="parameters" element="tns:{op}Response"/></wsdl:message>'
+        )
+        port_ops.append(
+            f'<wsdl:operation name="{op}"><wsdl:input message="tns:{op}SoapIn"/>'
+            f'<wsdl:output message="tns:{op}SoapOut"/></wsdl:operation>'
+        )
+        binding_ops.append(
+            f'<wsdl:operation name="{op}"><soap:operation soapAction="{TNS}{op}" style="document"/>'
+            f'<wsdl:input><soap:body use="literal"/></wsdl:input>'
+            f'<wsdl:output><soap:body use="literal"/></wsdl:output></wsdl:operation>'
+        )
+
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<wsdl:definitions xmlns:wsdl="http://schemas.xmlsoap.org/wsdl/" '
+        'xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/" '
+        'xmlns:s="http://www.w3.org/2001/XMLSchema" '
+        f'xmlns:tns="{TNS}" targetNamespace="{TNS}">'
+        f'<wsdl:types><s:schema elementFormDefault="qualified" targetNamespace="{TNS}">'
+        f'{"".join(types)}</s:schema></wsdl:types>'
+        f'{"".join(messages)}'
+        f'<wsdl:portType name="AIMSWebServiceSoap">{"".join(port_ops)}</wsdl:portType>'
+        '<wsdl:binding name="AIMSWebServiceSoap" type="tns:AIMSWebServiceSoap">'
+        '<soap:binding transport="http://schemas.xmlsoap.org/soap/http"/>'
+        f'{"".join(binding_ops)}</wsdl:binding>'
+        '<wsdl:service name="AIMSWebService">'
+        '<wsdl:port name="AIMSWebServiceSoap" binding="tns:AIMSWebServiceSoap">'
+        f'<soap:address location="{escape(location)}"/>'
+        '</wsdl:port></wsdl:service></wsdl:definitions>'
+    )
+
+
+# ==================== SYNTHETIC DATA ====================
+
+AIRPORTS = ['SGN', 'HAN', 'DAD', 'CXR', 'PQC', 'HPH', 'VII', 'BMV', 'UIH', 'DLI', 'BKK', 'ICN', 'SIN', 'TPE']
+BASES = ['SGN', 'HAN', 'DAD', 'CXR']
+AC_TYPES = ['320', '321', '330']
+LAST_NAMES = ['NGUYEN', 'TRAN', 'LE', 'PHAM', 'HOANG', 'VU', 'VO', 'DANG', 'BUI', 'DO', 'HO', 'NGO']
+FIRST_NAMES = ['AN', 'BINH', 'CUONG', 'DUNG', 'GIANG', 'HAI', 'HUNG', 'KHANH', 'LINH', 'MINH',
+               'NAM', 'PHUONG', 'QUAN', 'SON', 'THAO', 'TRANG', 'TUAN', 'VY']
+# Crew complement per aircraft-day: cockpit CP/FO, cabin PU + 3 FA
+CREW_COMPLEMENT = ['CP', 'FO', 'PU', 'FA', 'FA', 'FA']
+
+
+def _fmt_hm(minutes: int) -> str:
+    minutes %= 24 * 60
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class SyntheticAIMSData:
+    """
+    Deterministic synthetic fleet, crew and daily flying program
+
+    Cùng seed + cùng scale -> cùng dữ liệu trên mọi máy, mọi lần chạy.
+
+    Args:
+        seed: Random seed
+        aircraft: Số tàu bay
+        crew: Số phi hành đoàn (tối thiểu đủ 6 người / tàu / ngày)
+        legs_per_aircraft: Số chặng bay mỗi tàu mỗi ngày
+        today: Ngày "hôm nay" (flights trước ngày này có actual times)
+    """
+
+    def __init__(
+        self,
+        seed: int = 42,
+        aircraft: int = 40,
+        crew: int = 1500,
+        legs_per_aircraft: int = 6,
+        today: date = None
+    ):
+        self.seed = seed
+        self.legs_per_aircraft = max(legs_per_aircraft, 1)
+        self.today = today or date.today()
+
+        rng = random.Random(f"{seed}-fleet")
+        self.fleet = []
+        for i in range(max(aircraft, 1)):
+            self.fleet.append({
+                'reg': f"VN-A{500 + i}",
+                'ac_type': AC_TYPES[i % len(AC_TYPES)],
+                'base': BASES[i % len(BASES)],
+            })
+
+        crew = max(crew, len(self.fleet) * len(CREW_COMPLEMENT))
+        self.crew = []
+        self.crew_by_role = {'CP': [], 'FO': [], 'PU': [], 'FA': []}
+        role_weights = [('CP', 0.15), ('FO', 0.15), ('PU', 0.15), ('FA', 0.55)]
+        for i in range(crew):
+            # Guarantee every role has enough members for one full day of flying
+            role = CREW_COMPLEMENT[i % len(CREW_COMPLEMENT)] if i < len(self.fleet) * len(CREW_COMPLEMENT) \
+                else rng.choices([r for r, _ in role_weights], [w for _, w in role_weights])[0]
+            member = {
+                'id': str(1000 + i),
+                'name': f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)} {rng.choice(FIRST_NAMES)}",
+                'role': role,
+                'base': rng.choice(BASES),
+                'ac_type': rng.choice(AC_TYPES),
+            }
+            member['short_name'] = member['name'].split()[-1]
+            self.crew.append(member)
+            self.crew_by_role[role].append(member)
+        self.crew_by_id = {c['id']: c for c in self.crew}
+
+    @lru_cache(maxsize=512)
+    def legs_for_date(self, day: date) -> Tuple[Dict[str, Any], ...]:
+        """All legs (with crew) operated on a calendar date"""
+        rng = random.Random(f"{self.seed}-{day.isoformat()}")
+        pools = {role: rng.sample(members, len(members)) for role, members in self.crew_by_role.items()}
+        cursor = {role: 0 for role in pools}
+
+        def next_member(role):
+            member = pools[role][cursor[role] % len(pools[role])]
+            cursor[role] += 1
+            return member
+
+        legs = []
+        for idx, ac in enumerate(self.fleet):
+            crew_set = [next_member(role) for role in CREW_COMPLEMENT]
+            station = ac['base']
+            minute = 5 * 60 + rng.randint(0, 120)
+            for leg_no in range(self.legs_per_aircraft):
+                # Cabin crew swap half way through some days -> produces crew rotations
+                if leg_no == self.legs_per_aircraft // 2 and rng.random() < 0.2:
+                    crew_set = crew_set[:2] + [next_member(role) for role in CREW_COMPLEMENT[2:]]
+
+                dest = rng.choice([a for a in AIRPORTS if a != station])
+                block = rng.randint(55, 150)
+                std, sta = minute, minute + block
+                leg = {
+                    'day': day,
+                    'carrier': 'VJ',
+                    'flight_no': str(100 + idx * self.legs_per_aircraft + leg_no),
+                    'reg': ac['reg'],
+                    'ac_type': ac['ac_type'],
+                    'dep': station,
+                    'arr': dest,
+                    'std': _fmt_hm(std),
+                    'sta': _fmt_hm(sta),
+                    'atd': '',
+                    'ata': '',
+                    'status': 'SCH',
+                    'crew': [{'id': c['id'], 'name': c['name'], 'role': c['role']} for c in crew_set],
+                }
+                if day < self.today:
+                    delay = rng.choice([0, 0, 0, 5, 10, 15, 30])
+                    leg['atd'] = _fmt_hm(std + delay)
+                    leg['ata'] = _fmt_hm(sta + delay + rng.randint(-5, 5))
+                    leg['status'] = 'ARR'
+                legs.append(leg)
+                station = dest
+                minute = sta + rng.randint(35, 60)
+        return tuple(legs)
+
+    def iter_days(self, from_day: date, to_day: date):
+        day = from_day
+        while day <= to_day:
+            yield day
+            day += timedelta(days=1)
+
+    def schedule_changes_for_date(self, day: date) -> List[Dict[str, Any]]:
+        rng = random.Random(f"{self.seed}-changes-{day.isoformat()}")
+        changes = []
+        for _ in range(max(1, len(self.crew) // 200)):
+            member = rng.choice(self.crew)
+            change_type, old, new, reason = rng.choice([
+                ('DUTY', 'OFF', 'SBY', 'Crew shortage'),
+                ('DUTY', 'SBY', 'FLY', 'Standby activation'),
+                ('SICK', 'FLY', 'SL', 'Sick leave'),
+                ('SICK', 'FLY', 'CSL', 'Call sick'),
+                ('SWAP', 'FLY', 'OFF', 'Roster swap'),
+            ])
+            changes.append({
+                'CrewId': member['id'], 'ChangeType': change_type,
+                'ChangeDate': day.strftime('%d/%m/%y'),
+                'OldValue': old, 'NewValue': new, 'Reason': reason,
+            })
+        return changes
+
+
+# ==================== SERVER ====================
+
+class StubConfig:
+    """Mutable, thread-safe latency / fault injection settings"""
+
+    def __init__(self, seed: int = 42):
+        self._lock = threading.Lock()
+        self._rng = random.Random(f"{seed}-faults")
+        self.latency_ms = 0.0
+        self.latency_jitter_ms = 0.0
+        self.fault_rate = 0.0          # SOAP Fault (HTTP 500) - fatal for the client
+        self.http_error_rate = 0.0     # HTTP 503 - retryable for the client
+        self.hang_rate = 0.0           # Sleep hang_seconds - triggers client timeout
+        self.hang_seconds = 60.0
+        self.operations = None         # None = inject on every operation
+        self.username = None           # Set to require UN/PSW
+        self.password = None
+
+    def update(self, values: Dict[str, str]):
+        with self._lock:
+            for key in ('latency_ms', 'latency_jitter_ms', 'fault_rate',
+                        'http_error_rate', 'hang_rate', 'hang_seconds'):
+                if key in values:
+                    setattr(self, key, float(values[key]))
+            if 'operations' in values:
+                ops = [o for o in values['operations'].split(',') if o]
+                self.operations = set(ops) or None
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'latency_ms': self.latency_ms,
+                'latency_jitter_ms': self.latency_jitter_ms,
+                'fault_rate': self.fault_rate,
+                'http_error_rate': self.http_error_rate,
+                'hang_rate': self.hang_rate,
+                'hang_seconds': self.hang_seconds,
+                'operations': sorted(self.operations) if self.operations else None,
+            }
+
+    def draw(self, operation: str) -> Tuple[float, Optional[str]]:
+        """Return (delay seconds, injected failure kind or None) for one request"""
+        with self._lock:
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-1, 1) * self.latency_jitter_ms) / 1000.0
+            if self.operations and operation not in self.operations:
+                return delay, None
+            roll = self._rng.random()
+            if roll < self.hang_rate:
+                return delay + self.hang_seconds, None
+            roll -= self.hang_rate
+            if roll < self.http_error_rate:
+                return delay, 'http_error'
+            roll -= self.http_error_rate
+            if roll < self.fault_rate:
+                return delay, 'fault'
+            return delay, None
+
+
+class AIMSStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, data: SyntheticAIMSData, config: StubConfig):
+        super().__init__(address, AIMSStubHandler)
+        self.data = data
+        self.config = config
+        self.stats_lock = threading.Lock()
+        self.stats = {}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/aimswebservice"
+
+    def record(self, operation: str, status: int, nbytes: int, seconds: float):
+        with self.stats_lock:
+            s = self.stats.setdefault(operation, {'requests': 0, 'errors': 0, 'bytes': 0, 'seconds': 0.0})
+            s['requests'] += 1
+            s['errors'] += 1 if status >= 400 else 0
+            s['bytes'] += nbytes
+            s['seconds'] += seconds
+
+
+def _envelope(body: str) -> bytes:
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        f'<soap:Envelope xmlns:soap="{SOAP_ENV_NS}"><soap:Body>{body}</soap:Body></soap:Envelope>'
+    ).encode('utf-8')
+
+
+def _fault(message: str, code: str = 'soap:Server') -> bytes:
+    return _envelope(
+        f'<soap:Fault><faultcode>{code}</faultcode><faultstring>{escape(message)}</faultstring></soap:Fault>'
+    )
+
+
+def _item_xml(item_type: str, values: Dict[str, Any]) -> str:
+    parts = [f'<{item_type}>']
+    for field in ITEM_TYPES[item_type]:
+        if isinstance(field, tuple):
+            name, nested = field
+            children = ''.join(_item_xml(nested, v) for v in values.get(name, []))
+            parts.append(f'<{name}>{children}</{name}>')
+        else:
+            parts.append(f'<{field}>{escape(str(values.get(field, "")))}</{field}>')
+    parts.append(f'</{item_type}>')
+    return ''.join(parts)
+
+
+def _result_xml(operation: str, items: List[Dict[str, Any]], error: str = '') -> bytes:
+    _, list_name, item_type = OPERATIONS[operation]
+    body = [f'<{operation}Response xmlns="{TNS}"><{operation}Result>']
+    if error:
+        body.append(f'<ErrorExplanation>{escape(error)}</ErrorExplanation>')
+    body.append(f'<{list_name}>')
+    body.extend(_item_xml(item_type, item) for item in items)
+    body.append(f'</{list_name}></{operation}Result></{operation}Response>')
+    return _envelope(''.join(body))
+
+
+def _parse_date(dd: str, mm: str, yy: str) -> date:
+    year = int(yy)
+    if year < 100:
+        year += 2000
+    return date(year, int(mm), int(dd))
+
+
+def _flight_item(leg: Dict[str, Any]) -> Dict[str, Any]:
+    day = leg['day']
+    return {
+        'FlightDD': f"{day.day:02d}", 'FlightMM': f"{day.month:02d}", 'FlightYY': f"{day.year % 100:02d}",
+        'FlightCarrier': leg['carrier'], 'FlightNo': leg['flight_no'],
+        'FlightDep': leg['dep'], 'FlightArr': leg['arr'],
+        'FlightReg': leg['reg'], 'FlightAcType': leg['ac_type'], 'FlightStatus': leg['status'],
+        'FlightStd': leg['std'], 'FlightSta': leg['sta'],
+        'FlightAtd': leg['atd'], 'FlightAta': leg['ata'],
+    }
+
+
+def handle_operation(data: SyntheticAIMSData, operation: str, params: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Build the result items for one SOAP operation"""
+    if operation == 'FlightDetailsForPeriod':
+        from_day = _parse_date(params['FromDD'], params['FromMMonth'], params['FromYYYY'])
+        to_day = _parse_date(params['ToDD'], params['ToMMonth'], params['ToYYYY'])
+        return [_flight_item(leg) for day in data.iter_days(from_day, to_day) for leg in data.legs_for_date(day)]
+
+    if operation == 'FetchLegMembersPerDay':
+        day = _parse_date(params['DD'], params['MM'], params['YYYY'])
+        return [{
+            'Flt': f"{leg['carrier']}{leg['flight_no']}", 'Reg': leg['reg'],
+            'Dep': leg['dep'], 'Arr': leg['arr'], 'STD': leg['std'], 'STA': leg['sta'],
+            'CrewList': [{'ID': c['id'], 'Name': c['name'], 'Role': c['role']} for c in leg['crew']],
+        } for leg in data.legs_for_date(day)]
+
+    if operation == 'CrewMemberRosterDetailsForPeriod':
+        crew_id = str(params.get('ID', ''))
+        from_day = _parse_date(params['FmDD'], params['FmMM'], params['FmYY'])
+        to_day = _parse_date(params['ToDD'], params['ToMM'], params['ToYY'])
+        member = data.crew_by_id.get(crew_id, {})
+        items = []
+        for day in data.iter_days(from_day, to_day):
+            for leg in data.legs_for_date(day):
+                if any(c['id'] == crew_id for c in leg['crew']):
+                    items.append({
+                        'CrewId': crew_id, 'Day': day.strftime('%d/%m/%y'),
+                        'Flt': f"{leg['carrier']}{leg['flight_no']}", 'Carrier': leg['carrier'],
+                        'Dep': leg['dep'], 'Arr': leg['arr'], 'STD': leg['std'], 'STA': leg['sta'],
+                        'ATD': leg['atd'], 'ATA': leg['ata'],
+                        'CROUTE': f"{leg['dep']}-{leg['arr']}", 'CrewBase': member.get('base', ''),
+                    })
+        return items
+
+    if operation == 'FetchCrewQuals':
+        crew_id = str(params.get('ID', '0'))
+        members = data.crew if crew_id in ('', '0') else [m for m in [data.crew_by_id.get(crew_id)] if m]
+        return [{
+            'ID': m['id'], 'Name': m['name'], 'Quals': f"{m['ac_type']} {m['role']}",
+            'Base': m['base'], 'Rank': m['role'],
+        } for m in members]
+
+    if operation == 'CrewScheduleChangesForPeriod':
+        from_day = _parse_date(params['FmDD'], params['FmMM'], params['FmYY'])
+        to_day = _parse_date(params['ToDD'], params['ToMM'], params['ToYY'])
+        return [c for day in data.iter_days(from_day, to_day) for c in data.schedule_changes_for_date(day)]
+
+    if operation == 'GetCrewList':
+        crew_id = str(params.get('ID', '0'))
+        members = data.crew if crew_id in ('', '0') else [m for m in [data.crew_by_id.get(crew_id)] if m]
+        base, ac, pos = params.get('BaseStr', ''), params.get('ACStr', ''), params.get('PosStr', '')
+        return [{
+            'Id': m['id'], 'CrewName': m['name'], 'ShortName': m['short_name'],
+            'Quals': f"{m['ac_type']} {m['role']}", 'Email': f"crew{m['id']}@example.invalid",
+            'Location': m['base'], 'Nationality': 'VN', 'EmploymentDate': '01/01/2020',
+            'ContactCell': f"09{int(m['id']):08d}",
+        } for m in members
+            if (not base or m['base'] == base) and (not ac or ac in m['ac_type']) and (not pos or m['role'] == pos)]
+
+    raise KeyError(operation)
+
+
+class AIMSStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt % args)
+
+    def _send(self, status: int, body: bytes, content_type: str = 'text/xml; charset=utf-8'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query, keep_blank_values=True)
+
+        if parsed.path == '/_control':
+            self.server.config.update({k: v[-1] for k, v in query.items()})
+            body = json.dumps(self.server.config.to_dict()).encode('utf-8')
+            return self._send(200, body, 'application/json')
+
+        if parsed.path == '/_stats':
+            with self.server.stats_lock:
+                body = json.dumps(self.server.stats).encode('utf-8')
+            return self._send(200, body, 'application/json')
+
+        if any(k.lower() in ('wsdl', 'singlewsdl') for k in query):
+            host = self.headers.get('Host') or '%s:%s' % self.server.server_address[:2]
+            wsdl = build_wsdl(f"http://{host}{parsed.path}")
+            return self._send(200, wsdl.encode('utf-8'))
+
+        self._send(404, b'Not found', 'text/plain')
+
+    def do_POST(self):
+        started = time.perf_counter()
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length)
+
+        operation, params = None, {}
+        try:
+            root = ET.fromstring(raw)
+            body = root.find(f'{{{SOAP_ENV_NS}}}Body')
+            call = list(body)[0]
+            operation = call.tag.split('}')[-1]
+            params = {child.tag.split('}')[-1]: (child.text or '') for child in call}
+        except Exception as e:
+            payload = _fault(f"Malformed SOAP request: {e}", 'soap:Client')
+            self._send(500, payload)
+            return self.server.record('invalid', 500, len(payload), time.perf_counter() - started)
+
+        config = self.server.config
+        delay, failure = config.draw(operation)
+        if delay:
+            time.sleep(delay)
+
+        status = 200
+        if failure == 'http_error':
+            status, payload = 503, b'Service Unavailable'
+            self._send(status, payload, 'text/plain')
+        elif failure == 'fault':
+            status, payload = 500, _fault(f"Injected fault for {operation}")
+            self._send(status, payload)
+        elif operation not in OPERATIONS:
+            status, payload = 500, _fault(f"Unknown operation {operation}", 'soap:Client')
+            self._send(status, payload)
+        elif config.username and (params.get('UN') != config.username or params.get('PSW') != config.password):
+            status, payload = 500, _fault('Invalid user name or password', 'soap:Client')
+            self._send(status, payload)
+        else:
+            try:
+                payload = _result_xml(operation, handle_operation(self.server.data, operation, params))
+            except (KeyError, ValueError) as e:
+                payload = _result_xml(operation, [], error=f"Invalid parameters: {e}")
+            self._send(status, payload)
+
+        self.server.record(operation, status, len(payload), time.perf_counter() - started)
+
+
+def start_stub_server(
+    host: str = '127.0.0.1',
+    port: int = 0,
+    data: SyntheticAIMSData = None,
+    config: StubConfig = None,
+    **data_kwargs
+) -> AIMSStubServer:
+    """
+    Start the stand-in server on a background thread
+
+    Args:
+        host: Bind address
+        port: Port (0 = random free port)
+        data: Pre-built synthetic data (default: SyntheticAIMSData(**data_kwargs))
+        config: Fault/latency config
+
+    Returns:
+        AIMSStubServer: running server; WSDL at server.url + '?singlewsdl'
+    """
+    data = data or SyntheticAIMSData(**data_kwargs)
+    server = AIMSStubServer((host, port), data, config or StubConfig(data.seed))
+    thread = threading.Thread(target=server.serve_forever, name='aims-stub', daemon=True)
+    thread.start()
+    logger.info(
+        f"AIMS stub listening on {server.url} "
+        f"({len(data.fleet)} aircraft, {len(data.crew)} crew, {data.legs_per_aircraft} legs/aircraft/day)"
+    )
+    return server
+
+
+# CLI
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local AIMS SOAP stand-in server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--aircraft', type=int, default=40)
+    parser.add_argument('--crew', type=int, default=1500)
+    parser.add_argument('--legs', type=int, default=6, help='Legs per aircraft per day')
+    parser.add_argument('--today', default=None, help='Reference date YYYY-MM-DD (default: today)')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--latency-jitter-ms', type=float, default=0)
+    parser.add_argument('--fault-rate', type=float, default=0)
+    parser.add_argument('--http-error-rate', type=float, default=0)
+    parser.add_argument('--username', default=None, help='Require these credentials')
+    parser.add_argument('--password', default=None)
+    args = parser.parse_args()
+
+    today = datetime.strptime(args.today, '%Y-%m-%d').date() if args.today else None
+    data = SyntheticAIMSData(args.seed, args.aircraft, args.crew, args.legs, today)
+    config = StubConfig(args.seed)
+    config.update({
+        'latency_ms': args.latency_ms,
+        'latency_jitter_ms': args.latency_jitter_ms,
+        'fault_rate': args.fault_rate,
+        'http_error_rate': args.http_error_rate,
+    })
+    config.username, config.password = args.username, args.password
+
+    server = AIMSStubServer((args.host, args.port), data, config)
+    print("=" * 60)
+    print("AIMS SOAP Stand-in Server")
+    print("=" * 60)
+    print(f"WSDL: {server.url}?singlewsdl")
+    print(f"Fleet: {len(data.fleet)} aircraft, {len(data.crew)} crew, {data.legs_per_aircraft} legs/day")
+    print(f"Control: http://{args.host}:{args.port}/_control?latency_ms=200&fault_rate=0.1")
+    print("Press Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+        print("\nServer stopped.")
@@ -0,0 +1,247 @@
+"""
+AIMS Transport Module
+Cấu hình HTTP transport cho AIMS SOAP client: connection pool, keep-alive,
+nén gzip, timeout theo từng operation và metrics (reuse connection, latency)
+"""
+
+import os
+import time
+import socket
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger('AIMSTransport')
+
+try:
+    from requests import Session
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    HTTPAdapter = object
+    REQUESTS_AVAILABLE = False
+
+try:
+    from zeep.transports import Transport
+    ZEEP_AVAILABLE = True
+except ImportError:
+    Transport = object
+    ZEEP_AVAILABLE = False
+
+
+# Default per-operation timeouts (seconds). Period queries return far more data
+# than single-day / single-crew lookups, so one global timeout=30 fits neither.
+DEFAULT_OPERATION_TIMEOUTS = {
+    'FlightDetailsForPeriod': 120,
+    'CrewScheduleChangesForPeriod': 60,
+    'GetCrewList': 60,
+    'FetchCrewQuals': 60,
+    'CrewMemberRosterDetailsForPeriod': 30,
+    'FetchLegMembersPerDay': 30,
+}
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() == 'true'
+
+
+class TransportConfig:
+    """
+    HTTP transport settings for the AIMS client
+
+    Environment:
+        AIMS_POOL_CONNECTIONS: Số host pool được cache (default 4)
+        AIMS_POOL_MAXSIZE: Số connection tối đa mỗi host (default 16)
+        AIMS_KEEPALIVE: Giữ connection + TCP keep-alive (default true)
+        AIMS_COMPRESSION: Gửi Accept-Encoding gzip/deflate (default true)
+        AIMS_CONNECT_TIMEOUT: Timeout kết nối (default 10s)
+        AIMS_TIMEOUT: Timeout đọc mặc định (default 30s)
+        AIMS_OPERATION_TIMEOUTS: Override, e.g. "FlightDetailsForPeriod=180,GetCrewList=90"
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = None,
+        pool_maxsize: int = None,
+        keepalive: bool = None,
+        compression: bool = None,
+        connect_timeout: float = None,
+        default_timeout: float = None,
+        operation_timeouts: Dict[str, float] = None
+    ):
+        self.pool_connections = pool_connections or int(os.getenv('AIMS_POOL_CONNECTIONS', '4'))
+        self.pool_maxsize = pool_maxsize or int(os.getenv('AIMS_POOL_MAXSIZE', '16'))
+        self.keepalive = _env_bool('AIMS_KEEPALIVE', True) if keepalive is None else keepalive
+        self.compression = _env_bool('AIMS_COMPRESSION', True) if compression is None else compression
+        self.connect_timeout = connect_timeout or float(os.getenv('AIMS_CONNECT_TIMEOUT', '10'))
+        self.default_timeout = default_timeout or float(os.getenv('AIMS_TIMEOUT', '30'))
+
+        self.operation_timeouts = dict(DEFAULT_OPERATION_TIMEOUTS)
+        for item in os.getenv('AIMS_OPERATION_TIMEOUTS', '').split(','):
+            if '=' in item:
+                name, value = item.split('=', 1)
+                try:
+                    self.operation_timeouts[name.strip()] = float(value)
+                except ValueError:
+                    logger.warning(f"Ignoring invalid AIMS_OPERATION_TIMEOUTS entry: {item}")
+        if operation_timeouts:
+            self.operation_timeouts.update(operation_timeouts)
+
+    def timeout_for(self, operation: Optional[str]):
+        """(connect, read) timeout tuple for a SOAP operation"""
+        read = self.operation_timeouts.get(operation, self.default_timeout)
+        return (self.connect_timeout, read)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'pool_connections': self.pool_connections,
+            'pool_maxsize': self.pool_maxsize,
+            'keepalive': self.keepalive,
+            'compression': self.compression,
+            'connect_timeout': self.connect_timeout,
+            'default_timeout': self.default_timeout,
+            'operation_timeouts': dict(self.operation_timeouts),
+        }
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter that enables TCP keep-alive on pooled sockets"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        options = list(HTTPConnection.default_socket_options)
+        options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        kwargs['socket_options'] = options
+        super().init_poolmanager(*args, **kwargs)
+
+
+def build_session(config: TransportConfig) -> 'Session':
+    """Create a requests Session sized and configured for AIMS traffic"""
+    if not REQUESTS_AVAILABLE:
+        raise ImportError("requests library not installed. Run: pip install requests")
+
+    session = Session()
+    session.verify = True  # SSL verification
+
+    adapter_cls = KeepAliveAdapter if config.keepalive else HTTPAdapter
+    # Retries are owned by aims_resilience, never by urllib3
+    adapter = adapter_cls(
+        pool_connections=config.pool_connections,
+        pool_maxsize=config.pool_maxsize,
+        max_retries=0,
+        pool_block=False
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    session.headers['Accept-Encoding'] = 'gzip, deflate' if config.compression else 'identity'
+    session.headers['Connection'] = 'keep-alive' if config.keepalive else 'close'
+    return session
+
+
+class TransportMetrics:
+    """Per-operation request latency plus connection-pool reuse counters"""
+
+    def __init__(self, sample_size: int = 200):
+        self._lock = threading.Lock()
+        self._sample_size = sample_size
+        self._ops = {}
+
+    def record(self, operation: str, seconds: float, ok: bool = True, nbytes: int = 0):
+        with self._lock:
+            op = self._ops.get(operation)
+            if op is None:
+                op = {
+                    'requests': 0, 'errors': 0, 'bytes': 0,
+                    'total_seconds': 0.0, 'max_seconds': 0.0,
+                    'samples': deque(maxlen=self._sample_size)
+                }
+                self._ops[operation] = op
+            op['requests'] += 1
+            op['errors'] += 0 if ok else 1
+            op['bytes'] += nbytes
+            op['total_seconds'] += seconds
+            op['max_seconds'] = max(op['max_seconds'], seconds)
+            op['samples'].append(seconds)
+
+    def operations(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for name, op in self._ops.items():
+                samples = sorted(op['samples'])
+                p50 = samples[len(samples) // 2] if samples else 0.0
+                p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else 0.0
+                result[name] = {
+                    'requests': op['requests'],
+                    'errors': op['errors'],
+                    'bytes': op['bytes'],
+                    'avg_ms': round(op['total_seconds'] / op['requests'] * 1000, 1) if op['requests'] else 0.0,
+                    'p50_ms': round(p50 * 1000, 1),
+                    'p95_ms': round(p95 * 1000, 1),
+                    'max_ms': round(op['max_seconds'] * 1000, 1),
+                }
+            return result
+
+    @staticmethod
+    def pool_stats(session) -> Dict[str, Any]:
+        """Connection reuse derived from urllib3 pool counters"""
+        stats = {'pools': 0, 'requests': 0, 'new_connections': 0, 'reused': 0, 'reuse_ratio': 0.0}
+        if session is None:
+            return stats
+        seen = set()
+        for adapter in session.adapters.values():
+            if id(adapter) in seen or not hasattr(adapter, 'poolmanager'):
+                continue
+            seen.add(id(adapter))
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                stats['pools'] += 1
+                stats['requests'] += pool.num_requests
+                stats['new_connections'] += pool.num_connections
+        stats['reused'] = max(0, stats['requests'] - stats['new_connections'])
+        if stats['requests']:
+            stats['reuse_ratio'] = round(stats['reused'] / stats['requests'], 3)
+        return stats
+
+
+def operation_from_headers(headers: Dict[str, str]) -> Optional[str]:
+    """Extract the operation name from a SOAPAction header"""
+    action = (headers or {}).get('SOAPAction', '') or ''
+    action = action.strip('"')
+    return action.rstrip('/').rsplit('/', 1)[-1] or None
+
+
+class AIMSTransport(Transport):
+    """
+    zeep Transport with per-operation timeouts and latency metrics
+
+    zeep only supports one operation_timeout; this resolves the timeout from
+    the SOAPAction of each call instead.
+    """
+
+    def __init__(self, config: TransportConfig, metrics: TransportMetrics, session=None, **kwargs):
+        self.config = config
+        self.metrics = metrics
+        super().__init__(session=session, timeout=config.default_timeout, **kwargs)
+
+    def post(self, address, message, headers):
+        operation = operation_from_headers(headers) or 'unknown'
+        started = time.perf_counter()
+        ok = False
+        nbytes = 0
+        try:
+            response = self.session.post(
+                address,
+                data=message,
+                headers=headers,
+                timeout=self.config.timeout_for(operation)
+            )
+            ok = response.status_code < 400
+            nbytes = len(response.content)
+            return response
+        finally:
+            self.metrics.record(operation, time.perf_counter() - started, ok, nbytes)
@@ -1,25 +1,32 @@
-import csv
+"""
+Phân tích một ngày bay từ snapshot Parquet (không parse lại CSV)
+Tạo snapshot trước: python data_processor.py --export-snapshot
+
+Usage:
+    python analyze_data.py [DD/MM/YY]   (default: 15/01/26)
+"""
+
 import re
+import sys
 from collections import defaultdict
-from datetime import datetime
-
-# Read flight data
-flights = []
-with open('DayRepReport15Jan2026.csv', 'r', encoding='utf-8') as f:
-    reader = csv.reader(f)
-    for row in reader:
-        if len(row) >= 15 and row[0] and (row[0].startswith('15/01') or row[0].startswith('16/01')):
-            if row[1]:  # Has REG
-                flights.append({
-                    'date': row[0],
-                    'reg': row[1],
-                    'flt': row[2],
-                    'dep': row[3],
-                    'arr': row[4],
-                    'std': row[5],  # Scheduled Time Departure
-                    'sta': row[6],  # Scheduled Time Arrival
-                    'crew': row[14] if len(row) > 14 else ''
-                })
+from datetime import datetime, timedelta
+
+from snapshot_store import SnapshotBackend
+
+analysis_date = sys.argv[1] if len(sys.argv) > 1 else '15/01/26'
+analysis_day = datetime.strptime(analysis_date, '%d/%m/%y')
+next_date = (analysis_day + timedelta(days=1)).strftime('%d/%m/%y')
+snapshot = SnapshotBackend()
+
+# Read flight data: the day and the next one, only the columns used below
+flights = [
+    flight for flight in snapshot.get_flights_range(
+        analysis_date, next_date, columns='date,reg,flt,dep,arr,std,sta,crew'
+    )
+    if flight['reg']  # Has REG
+]
+if not flights:
+    sys.exit(f"No flights for {analysis_date} in {snapshot.root}. Run: python data_processor.py --export-snapshot")
 
 # 1. Count unique aircraft registrations and calculate average flight hours
 unique_regs = set(f['reg'] for f in flights if f['reg'])
@@ -54,7 +61,7 @@ for flight in flights:
 
 print("=" * 60)
 print("CREW MANAGEMENT DASHBOARD - DATA ANALYSIS")
-print("Date: 15/01/2026")
+print(f"Date: {analysis_day:%d/%m/%Y}")
 print("=" * 60)
 
 # 1. AIRCRAFT METRICS
@@ -82,7 +89,7 @@ def extract_crew_ids(crew_string):
     crew_ids = []
     # Match pattern like (CP) 7531 or (FO) 7440
     pattern = r'\(([A-Z]{2})\)\s*(\d+)'
-    matches = re.findall(pattern, crew_string)
+    matches = re.findall(pattern, crew_string or '')
     return [(role, id) for role, id in matches]
 
 # Track crew to REG mapping
@@ -131,25 +138,19 @@ print("4. AIRCRAFT UTILIZATION (from SacutilReport)")
 print("=" * 60)
 
 ac_utilization = {}
-with open('SacutilReport1.csv', 'r', encoding='utf-8') as f:
-    content = f.read()
-    lines = content.split('\n')
-    for line in lines:
-        if '15.01' in line:
-            parts = line.split(',')
-            if len(parts) >= 12:
-                ac_type = parts[1]
-                dom_block = parts[2]
-                int_block = parts[3]
-                total_block = parts[4]
-                avg_util = parts[11] if len(parts) > 11 else ''
-                ac_utilization[ac_type] = {
-                    'dom': dom_block,
-                    'int': int_block,
-                    'total': total_block,
-                    'avg': avg_util
-                }
-                print(f"  {ac_type}: Dom={dom_block}, Int={int_block}, Total={total_block}, Avg={avg_util}")
+for row in snapshot.get_ac_utilization(analysis_date, columns='ac_type,dom_block,int_block,total_block,avg_util'):
+    ac_type = row['ac_type']
+    dom_block = row['dom_block']
+    int_block = row['int_block']
+    total_block = row['total_block']
+    avg_util = row['avg_util'] or ''
+    ac_utilization[ac_type] = {
+        'dom': dom_block,
+        'int': int_block,
+        'total': total_block,
+        'avg': avg_util
+    }
+    print(f"  {ac_type}: Dom={dom_block}, Int={int_block}, Total={total_block}, Avg={avg_util}")
 
 # 5. SUMMARY FOR DASHBOARD
 print("\n" + "=" * 60)
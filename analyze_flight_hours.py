@@ -1,10 +1,15 @@
 """
 Aviation Safety Data Analysis
 Phân tích giờ bay tích lũy của phi hành đoàn
+Đọc rolling hours mới nhất từ snapshot Parquet (python data_processor.py --export-snapshot)
 """
 
+import sys
+
 import pandas as pd
 
+from snapshot_store import SnapshotBackend
+
 # ========================================
 # BƯỚC 1: HÀM CHUYỂN ĐỔI VÀ PHÂN LOẠI
 # ========================================
@@ -36,12 +41,16 @@ def classify_status(hours, limit=1000):
 # BƯỚC 2: ĐỌC VÀ LÀM SẠCH DỮ LIỆU
 # ========================================
 
-file_path = r'd:\Python\Json convert\RolCrTotReport.csv'
+snapshot = SnapshotBackend()
 
-# Đọc file CSV, bỏ qua 5 dòng đầu (header metadata)
-df_raw = pd.read_csv(file_path, skiprows=5, header=None, encoding='utf-8')
+# Đọc snapshot rolling hours mới nhất, chỉ các cột cần dùng
+rows = snapshot.get_rolling_hours(columns='crew_id,name,seniority,block_28day,block_12month')
+if not rows:
+    sys.exit(f"No rolling hours in {snapshot.root}. Run: python data_processor.py --export-snapshot")
+df_raw = pd.DataFrame(rows)
 
 # Đặt tên cột
+df_raw = df_raw[['crew_id', 'name', 'seniority', 'block_28day', 'block_12month']]
 df_raw.columns = ['ID', 'Name', 'Seniority', '28Day_BlockTime', '12Month_BlockTime']
 
 # Loại bỏ các dòng metadata cuối file (chỉ giữ dòng có ID là số)
@@ -17,6 +17,13 @@ sys.path.insert(0, root_dir)
 app = Flask(__name__, template_folder=root_dir)
 app.secret_key = os.environ.get('SECRET_KEY', 'crew-dashboard-2026')
 
+from json_codec import install_flask_json
+install_flask_json(app)  # jsonify / tojson use the fast codec (orjson when installed)
+
+# Concurrent requests share one data load and one dashboard computation per (version, date)
+from single_flight import SingleFlight
+coalesce = SingleFlight()
+
 # ==================== SAFE IMPORTS ====================
 processor = None
 db = None
@@ -49,15 +56,20 @@ else:
 # ==================== DATA LOADING HELPERS ====================
 
 def ensure_data_loaded():
-    """Ensure processor has data loaded (from Supabase or Local)"""
+    """Ensure processor has data loaded (from Supabase or Local); overlapping requests share one load"""
     if not processor:
         return
+    coalesce.do(('load',), _load_data)
+
 
+def _load_data():
+    # The version keys cached dashboard computations: bump it only when the data was reloaded
     if supabase_connected and db:
         try:
             # Refresh data from Supabase
             # This populates processor's internal state (flights, rolling_hours, etc.)
-            processor.load_from_supabase()
+            processor.load_from_storage()
+            processor.version += 1
         except Exception as e:
             print(f"[ERROR] Supabase load failed: {e}")
             # Fallback to local files if Supabase fails? 
@@ -66,15 +78,29 @@ def ensure_data_loaded():
     else:
         # Local mode - process files
         try:
-            processor.process_dayrep_csv()
-            processor.process_sacutil_csv()
-            processor.process_rolcrtot_csv()
-            processor.process_crew_schedule_csv()
+            processor.process_reports()
+            processor.version += 1
         except Exception as e:
             print(f"[ERROR] Local load failed: {e}")
 
 
 
+def dashboard_payload(filter_date):
+    """Dashboard data plus compliance rate (shared between coalesced requests: read-only)"""
+    data = processor.get_dashboard_data(filter_date)
+    
+    # Special handling for calculating specific stats if needed
+    # (e.g. compliance rate is calculated in api_server.py but maybe not in get_dashboard_data?)
+    # In api_server.py: 
+    # compliance_stats = processor.calculate_rolling_28day_stats()
+    # data['compliance_rate'] = compliance_stats.get('compliance_rate', 100)
+    
+    compliance_stats = processor.calculate_rolling_28day_stats()
+    data['compliance_rate'] = compliance_stats.get('compliance_rate', 100)
+    return data
+
+
+
 # ==================== ROUTES ====================
 @app.route('/')
 def index():
@@ -89,17 +115,8 @@ def index():
         
         # Get Dashboard Data (Directly from processor to match local consistency)
         if processor:
-            data = processor.get_dashboard_data(filter_date)
-            
-            # Special handling for calculating specific stats if needed
-            # (e.g. compliance rate is calculated in api_server.py but maybe not in get_dashboard_data?)
-            # In api_server.py: 
-            # compliance_stats = processor.calculate_rolling_28day_stats()
-            # data['compliance_rate'] = compliance_stats.get('compliance_rate', 100)
-            
-            compliance_stats = processor.calculate_rolling_28day_stats()
-            data['compliance_rate'] = compliance_stats.get('compliance_rate', 100)
-            
+            data = coalesce.do(('dashboard', processor.version, filter_date or None),
+                               lambda: dashboard_payload(filter_date))
         else:
             data = {} # Should not happen if initialized correctly
             
@@ -162,6 +179,28 @@ def upload_files():
     return redirect(url_for('index'))
 
 
+@app.route('/upload/dayrep-bulk', methods=['POST'])
+def upload_dayrep_bulk():
+    if not processor:
+        return jsonify({'error': 'DataProcessor not loaded'}), 500
+    
+    try:
+        if 'archive' in request.files and request.files['archive'].filename:
+            source = request.files['archive'].read()
+        else:
+            source = [(f.filename, f.read()) for f in request.files.getlist('dayrep') if f.filename]
+        if not source:
+            return jsonify({'error': 'No DayRep files uploaded'}), 400
+        
+        res = processor.process_dayrep_bulk(source, sync_db=supabase_connected)
+        print(f"[UPLOAD] Bulk dayrep: {res}")
+        return jsonify(res)
+    except Exception as e:
+        print(f"[ERROR] Bulk upload failed: {e}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 400
+
+
 @app.route('/api/status')
 def api_status():
     return jsonify({
@@ -3,14 +3,17 @@ Flask Server for Crew Management Dashboard (SSR Version)
 Renders the dashboard directly using Jinja2 templates.
 """
 
-from flask import Flask, request, render_template, redirect, url_for
+from flask import Flask, Response, request, render_template, redirect, url_for
 from werkzeug.utils import secure_filename
 import os
 from pathlib import Path
-from data_processor import get_processor, refresh_data
+from data_processor import REPORT_PARSERS, get_processor, update_processor, refresh_data, collect_dayrep_files
+from json_codec import install_flask_json, iter_encode
+from single_flight import SingleFlight
 
 app = Flask(__name__, template_folder='.')  # Look for templates in current dir
 app.secret_key = 'crew-dashboard-secret'  # Required for sessions if needed
+install_flask_json(app)  # jsonify / dict returns / tojson use the fast codec
 
 # Configuration
 UPLOAD_FOLDER = Path(__file__).parent / 'uploads'
@@ -23,6 +26,21 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# Concurrent requests for the same dataset version and date share one computation
+dashboard_flights = SingleFlight()
+
+def dashboard_payload(processor, filter_date):
+    """Dashboard metrics plus the rolling-hours compliance rate (shared between callers: read-only)"""
+    def compute():
+        data = processor.get_dashboard_data(filter_date)
+        
+        # Calculate compliance rate from rolling_hours
+        compliance_stats = processor.calculate_rolling_28day_stats()
+        data['compliance_rate'] = compliance_stats.get('compliance_rate', 100)
+        return data
+    
+    return dashboard_flights.do(('dashboard', processor.version, filter_date or None), compute)
+
 @app.route('/', methods=['GET'])
 def index():
     """Render the dashboard with data"""
@@ -32,15 +50,10 @@ def index():
     filter_date = request.args.get('date', None)
     
     # Get data
-    data = processor.get_dashboard_data(filter_date)
-    
-    # Calculate compliance rate from rolling_hours
-    compliance_stats = processor.calculate_rolling_28day_stats()
-    data['compliance_rate'] = compliance_stats.get('compliance_rate', 100)
+    data = dashboard_payload(processor, filter_date)
     
     # Check DB connection status for UI debugging
-    from supabase_client import is_connected
-    db_connected = is_connected()
+    db_connected = processor.db.is_connected()
     
     # Check AIMS availability
     try:
@@ -56,56 +69,67 @@ def index():
                           db_connected=db_connected,
                           aims_enabled=aims_enabled)
 
+@app.route('/api/dashboard', methods=['GET'])
+def dashboard_json():
+    """Dashboard data as compact JSON, streamed (large crew lists go out in chunks)"""
+    processor = get_processor()
+    data = dashboard_payload(processor, request.args.get('date', None))
+    return Response(iter_encode(data), mimetype='application/json')
+
 @app.route('/upload', methods=['POST'])
 def upload_files():
     """Handle file uploads via standard HTML Form - In-Memory Processing for Vercel/Supabase"""
     
-    # Map form field names to processor methods
-    file_map = {
-        'dayrep': 'process_dayrep_csv',
-        'sacutil': 'process_sacutil_csv',
-        'rolcrtot': 'process_rolcrtot_csv',
-        'crew_schedule': 'process_crew_schedule_csv'
-    }
-    
     processor = get_processor()
-    uploaded_any = False
+    uploads = {}
+    
+    # Form field names are the REPORT_PARSERS keys
+    for field_name in REPORT_PARSERS:
+        file = request.files.get(field_name)
+        # Check if file is selected
+        if file and file.filename:
+            uploads[field_name] = file.read()
     
-    for field_name, method_name in file_map.items():
-        if field_name in request.files:
-            file = request.files[field_name]
-            # Check if file is selected
-            if file and file.filename:
-                try:
-                    # Read content into memory
-                    content = file.read()
-                    
-                    # Get the processing method
-                    process_method = getattr(processor, method_name)
-                    
-                    # Process directly with content
-                    # Note: process_* methods in data_processor now support file_content arg
-                    process_method(file_content=content)
-                    
-                    uploaded_any = True
-                    print(f"Processed {field_name} in-memory")
-                except Exception as e:
-                    print(f"Error processing {field_name}: {e}")
+    # Unlabelled reports: the layout decides which parser gets the file
+    for file in request.files.getlist('reports'):
+        if file and file.filename:
+            content = file.read()
+            report = processor.detect_report_type(content)
+            if report:
+                uploads[report] = content
+            else:
+                print(f"Unrecognized report layout: {file.filename}")
     
-    if uploaded_any:
-        # Refresh data processor to load new files
-        # Actually process_* methods already updated the internal state AND Supabase.
-        # But calling refresh_data() might be redundant if we just processed.
-        # However, to be safe and ensure everything is consistent:
-        # refresh_data() -> loads from Supabase.
-        # Since we just inserted to Supabase, loading again confirms round-trip.
-        # But it might be slow.
-        # Let's rely on the in-memory update done by process_* methods for now.
-        pass
+    if uploads:
+        # Parsed on a copy of the dataset and published in one swap: pages being
+        # rendered keep the snapshot they started with, a failed upload publishes nothing
+        try:
+            update_processor(lambda draft: draft.process_reports(uploads=uploads))
+            print(f"Processed {', '.join(uploads)} in-memory")
+        except Exception as e:
+            print(f"Error processing reports: {e}")
     
     # Redirect back to dashboard
     return redirect(url_for('index'))
 
+@app.route('/upload/dayrep-bulk', methods=['POST'])
+def upload_dayrep_bulk():
+    """Ingest many DayRep CSVs at once: a 'archive' zip and/or multiple 'dayrep' files"""
+    files = []
+    
+    try:
+        archive = request.files.get('archive')
+        if archive and archive.filename:
+            files.extend(collect_dayrep_files(archive.read()))
+        files.extend((f.filename, f.read()) for f in request.files.getlist('dayrep') if f and f.filename)
+        
+        if not files:
+            return {'error': 'No DayRep files uploaded'}, 400
+        return update_processor(lambda draft: draft.process_dayrep_bulk(files))
+    except Exception as e:
+        print(f"Error processing bulk DayRep upload: {e}")
+        return {'error': str(e)}, 400
+
 @app.route('/debug', methods=['GET'])
 def debug_info():
     """Return inner state for debugging"""
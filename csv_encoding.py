@@ -0,0 +1,82 @@
+"""
+CSV Encoding Module
+Nhận diện encoding một lần cho file CSV export từ AIMS: BOM sniffing, thử
+utf-8 trên một đoạn đầu có giới hạn, rồi decode toàn bộ một lượt duy nhất
+"""
+
+import codecs
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+# How much of the payload is inspected to pick a codec
+SNIFF_BYTES = 64 * 1024
+
+# Longest BOMs first: the UTF-32 LE BOM starts with the UTF-16 LE one
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+
+FALLBACK_ERRORS = 'csv_cp1252_fallback'
+
+
+def _cp1252_fallback(error: UnicodeDecodeError):
+    """
+    Decode error handler: bytes the chosen codec rejects are read as
+    cp1252 (latin1 for the five bytes cp1252 leaves undefined), so a stray
+    byte past the sniffed prefix does not force a second full decode
+    """
+    chunk = error.object[error.start:error.end]
+    text = ''.join(
+        bytes([b]).decode('cp1252', errors='strict') if b not in (0x81, 0x8D, 0x8F, 0x90, 0x9D)
+        else chr(b)
+        for b in chunk
+    )
+    return text, error.end
+
+
+codecs.register_error(FALLBACK_ERRORS, _cp1252_fallback)
+
+
+def detect_encoding(data: bytes) -> Tuple[str, int]:
+    """
+    Pick the codec for a payload
+
+    Returns:
+        (codec, bom_length): BOM codec if present, else utf-8 when the
+        prefix sample is valid utf-8, else cp1252
+    """
+    for bom, codec in BOMS:
+        if data.startswith(bom):
+            return codec, len(bom)
+
+    sample = data[:SNIFF_BYTES]
+    try:
+        # final=False: a multi-byte character cut by the sample boundary is fine
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8', 0
+    except UnicodeDecodeError:
+        return 'cp1252', 0
+
+
+def decode_bytes(data: Union[bytes, bytearray, str]) -> str:
+    """Decode CSV bytes in one pass, BOM stripped"""
+    if isinstance(data, str):
+        return data
+    data = bytes(data)
+    codec, bom_length = detect_encoding(data)
+    return data[bom_length:].decode(codec, errors=FALLBACK_ERRORS)
+
+
+def read_text(file_path: Union[str, Path]) -> Optional[str]:
+    """Read and decode a CSV file (None if missing or unreadable)"""
+    if not file_path:
+        return None
+    try:
+        return decode_bytes(Path(file_path).read_bytes())
+    except OSError as e:
+        print(f"Error reading {file_path}: {e}")
+        return None
@@ -3,22 +3,159 @@ Data Processor Module for Crew Dashboard
 Handles CSV parsing and KPI calculations
 """
 
+import io
 import csv
+import itertools
 import os
 import re
+import zipfile
+import sys
 import json
-from collections import defaultdict
-from datetime import datetime
+import time
+import uuid
+import weakref
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
 from pathlib import Path
-import supabase_client as db
+from storage_backend import NullBackend, get_backend
+from csv_encoding import decode_bytes, read_text
+import json_codec
+from report_formats import (
+    REPORT_FORMATS, find_report_header, detect_report,
+    classify_duty_column, duty_runs, find_crew_base,
+    hhmm_to_minutes, hhmm_to_hours, minutes_to_hhmm, to_int,
+    YEAR_PATTERN, TEXT_DATE_PATTERN, DASH_DATE_PATTERN, SLASH_DATE_PATTERN,
+    PERIOD_PATTERN, FILENAME_DATE_PATTERN
+)
+
+# Live processors in this process - the ETL pushes deltas to them directly
+_live_processors = weakref.WeakSet()
+# Identifies this process in etl_notifications (skip deltas already pushed in-process)
+PROCESS_TOKEN = uuid.uuid4().hex
+# How often a processor checks etl_notifications for deltas from other processes
+NOTIFY_POLL_SECONDS = float(os.getenv('ETL_NOTIFY_POLL_SECONDS', '10'))
+# AIMS leg-member roles that do not operate the leg (same meaning as the '*' marker in DayRep)
+NON_OPERATING_ROLES = {'DH', 'DHD', 'PAX', 'EXT'}
+# Parallel report ingest: report -> (parser, processor state it rebuilds, storage sync)
+REPORT_PARSERS = {
+    'dayrep': ('process_dayrep_csv', (
+        'flights', 'flights_by_date', 'available_dates', 'crew_to_regs', 'crew_to_regs_by_date',
+        'crew_roles', 'reg_flight_hours', 'reg_flight_hours_by_date', 'reg_flight_count',
+        'reg_flight_count_by_date', 'crew_group_rotations', 'crew_group_rotations_by_date', 'reg_types'
+    ), '_sync_flights'),
+    'sacutil': ('process_sacutil_csv', ('ac_utilization', 'ac_utilization_by_date'), '_sync_ac_utilization'),
+    'rolcrtot': ('process_rolcrtot_csv', ('rolling_hours', 'crew_name_map'), '_sync_rolling_hours'),
+    'crew_schedule': ('process_crew_schedule_csv', (
+        'crew_schedule', 'crew_schedule_by_date', 'standby_records'
+    ), '_sync_crew_schedule'),
+}
+# Processor state a copy-on-write fork copies: everything ingest rebuilds or ETL deltas patch
+FORK_ATTRS = tuple(dict.fromkeys(
+    [attr for _, attrs, _ in REPORT_PARSERS.values() for attr in attrs] + ['leg_members_by_date', '_leg_dates']
+))
+PARALLEL_INGEST = os.getenv('PARALLEL_INGEST', 'false').lower() == 'true'
+# Bulk DayRep ingest: one DayRepReport<date>.csv per day, e.g. DayRepReport15Jan2026.csv
+DAYREP_FILE_PATTERN = re.compile(r'dayrep.*\.csv$', re.IGNORECASE)
+DAYREP_NAME_DATE = re.compile(r'(\d{1,2})([A-Za-z]{3})(\d{4})')
+
+
+def live_processors():
+    """DataProcessor instances alive in this process that are patched in place (not the published dataset)"""
+    return list(_live_processors)
+
+
+def aims_enabled():
+    """AIMS_ENABLED=true: the ETL feeds fact_actuals / fact_leg_members / etl_notifications"""
+    return os.getenv('AIMS_ENABLED', 'false').lower() == 'true'
+
+
+def _plain_state(value):
+    """defaultdicts (two levels deep) -> plain dicts so parser state can be pickled"""
+    if isinstance(value, defaultdict):
+        return {key: _plain_state(inner) for key, inner in value.items()}
+    return value
+
+
+def _fork_state(value):
+    """Copy a container and the containers directly inside it (records themselves stay shared)"""
+    if isinstance(value, dict):
+        copied = value.copy()  # defaultdict.copy keeps the default_factory
+        for key, inner in value.items():
+            if isinstance(inner, (dict, list, set)):
+                copied[key] = inner.copy()
+        return copied
+    if isinstance(value, (list, set)):
+        return value.copy()
+    return value
+
+
+def collect_dayrep_files(source):
+    """
+    DayRep files of a bulk upload as [(name, bytes)], oldest report first
+    
+    Args:
+        source: Directory, .zip path, zip bytes, or an iterable of (name, bytes)
+    """
+    files = []
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    if isinstance(source, (str, Path)) and Path(source).is_dir():
+        for path in Path(source).iterdir():
+            if path.is_file() and DAYREP_FILE_PATTERN.search(path.name):
+                files.append((path.name, path.read_bytes()))
+    elif isinstance(source, (str, Path, io.IOBase)):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                name = info.filename.rsplit('/', 1)[-1]
+                if not info.is_dir() and DAYREP_FILE_PATTERN.search(name):
+                    files.append((name, archive.read(info)))
+    else:
+        files = [(name, content) for name, content in source if DAYREP_FILE_PATTERN.search(name)]
+    
+    def report_order(item):
+        # Later reports win on overlapping flights - order by the date in the name
+        match = DAYREP_NAME_DATE.search(item[0])
+        if match:
+            try:
+                return (datetime.strptime(''.join(match.groups()), '%d%b%Y'), item[0])
+            except ValueError:
+                pass
+        return (datetime.max, item[0])
+    
+    return sorted(files, key=report_order)
+
+
+def _parse_dayrep_worker(content):
+    """Process-pool worker: parse one DayRep file, return its flights and REG -> AC type map"""
+    if not content:
+        # process_dayrep_csv would fall back to the files in uploads/ or the cwd
+        return [], {}
+    processor = DataProcessor(storage=NullBackend())
+    processor.process_dayrep_csv(file_content=content, sync_db=False)
+    return processor.flights, processor.reg_types
+
+
+def _parse_report_worker(report, data_dir, file_content=None):
+    """Process-pool worker: parse one report on a storage-less processor and return its state"""
+    method_name, attrs, _ = REPORT_PARSERS[report]
+    processor = DataProcessor(data_dir, storage=NullBackend())
+    result = getattr(processor, method_name)(file_content=file_content, sync_db=False)
+    return result, {attr: _plain_state(getattr(processor, attr)) for attr in attrs}
+
 
 class DataProcessor:
-    def __init__(self, data_dir=None):
+    def __init__(self, data_dir=None, storage=None):
         self.data_dir = Path(data_dir) if data_dir else Path(".")
+        # Persistent storage (storage_backend.StorageBackend): Supabase or embedded SQLite
+        self.db = storage or get_backend()
         self.flights = []
         self.flights_by_date = defaultdict(list)  # Store flights grouped by date
         self.available_dates = []  # List of available dates
         self.current_filter_date = None  # Current date filter (None = all dates)
+        self.version = 0  # Dataset version: bumped when a new dataset is published
         self.crew_to_regs = defaultdict(set)
         self.crew_to_regs_by_date = defaultdict(lambda: defaultdict(set))  # Crew regs by date
         self.crew_roles = {}
@@ -49,17 +186,46 @@ class DataProcessor:
         self.crew_name_map = {}
         self.reg_types = {}
         
-        # Try to load from Supabase first
-        if db.is_connected():
-            print("Connected to Supabase. Loading data...")
-            self.load_from_supabase()
+        # Structured crew per leg from AIMS (fact_leg_members), by operating date.
+        # Days present here take crew from these records instead of the DayRep crew string.
+        self.leg_members_by_date = defaultdict(dict)  # date -> (calendar_date, flt, dep) -> {'reg', 'calendar_date', 'crew': {id: (role, name)}}
+        self._leg_dates = {}  # leg_key -> operating date
+        
+        # ETL delta state
+        self._delta_lock = threading.RLock()
+        self._notify_cursor = None
+        self._last_notify_poll = 0.0
+        _live_processors.add(self)
+        
+        # Try to load from the storage backend first
+        if self.db.is_connected():
+            print(f"Connected to {self.db.name} storage. Loading data...")
+            self.load_from_storage()
         else:
-            print("Supabase not connected. Using local/empty state.")
+            print("Storage not connected. Using local/empty state.")
 
-    def load_from_supabase(self):
-        """Load all data from Supabase"""
+    def fork(self):
+        """
+        Copy-on-write copy of this processor for building the next dataset
+        
+        Containers of FORK_ATTRS are copied two levels deep; flight, standby and
+        leg records are shared, so ingest and deltas replace records instead of
+        editing them. The fork is not registered in live_processors().
+        """
+        clone = DataProcessor.__new__(DataProcessor)
+        clone.__dict__.update(self.__dict__)
+        for attr in FORK_ATTRS:
+            setattr(clone, attr, _fork_state(getattr(self, attr)))
+        clone._delta_lock = threading.RLock()
+        return clone
+    
+    def load_from_storage(self):
+        """Load all data from the storage backend (Supabase or SQLite)"""
+        # Notifications older than this load are already reflected in it
+        self._notify_cursor = datetime.now(timezone.utc).isoformat()
+        
         # 1. Flights
-        db_flights = db.get_flights()
+        db_flights = self.db.get_flights()
         if db_flights:
             self.flights = db_flights
             self.flights_by_date = defaultdict(list)
@@ -112,10 +278,23 @@ class DataProcessor:
                                  self.crew_group_rotations_by_date[op_date][key].append(reg)
             
             self.available_dates = sorted(list(unique_dates), key=lambda d: self._parse_date_for_sort(d))
-            print(f"Loaded {len(self.flights)} flights from Supabase")
+            print(f"Loaded {len(self.flights)} flights from {self.db.name}")
+        
+        # 1b. AIMS actuals and leg crew synced by the ETL, patched over the DayRep flights
+        if aims_enabled():
+            db_actuals = self.db.get_fact_actuals()
+            if db_actuals:
+                self.apply_etl_delta('flights', db_actuals, [])
+                print(f"Merged {len(db_actuals)} AIMS actuals from {self.db.name}")
+            db_legs = self.db.get_fact_leg_members()
+            if db_legs:
+                self.process_leg_members(db_legs)
+                print(f"Loaded {len(db_legs)} AIMS leg members from {self.db.name}")
+        elif self.leg_members_by_date:
+            self._reindex_dates(list(self.leg_members_by_date))
 
         # 2. AC Utilization
-        db_util = db.get_ac_utilization()
+        db_util = self.db.get_ac_utilization()
         if db_util:
             self.ac_utilization = {}
             self.ac_utilization_by_date = defaultdict(dict)
@@ -142,7 +321,7 @@ class DataProcessor:
             print(f"Loaded AC Util for {len(self.ac_utilization_by_date)} dates")
 
         # 3. Rolling Hours
-        db_rolling = db.get_rolling_hours()
+        db_rolling = self.db.get_rolling_hours()
         if db_rolling:
             self.rolling_hours = []
             for item in db_rolling:
@@ -164,7 +343,7 @@ class DataProcessor:
             print(f"Loaded {len(self.rolling_hours)} rolling hour records")
 
         # 4. Crew Schedule (legacy aggregate)
-        db_schedule = db.get_crew_schedule()
+        db_schedule = self.db.get_crew_schedule()
         if db_schedule:
              self.crew_schedule_by_date = defaultdict(lambda: {'SL': 0, 'CSL': 0, 'SBY': 0, 'OSBY': 0})
              self.crew_schedule['summary'] = {'SL': 0, 'CSL': 0, 'SBY': 0, 'OSBY': 0}
@@ -175,10 +354,10 @@ class DataProcessor:
                      self.crew_schedule_by_date[d][s] += 1
                  if s:
                      self.crew_schedule['summary'][s] += 1
-             print(f"Loaded Crew Schedule from Supabase")
+             print(f"Loaded Crew Schedule from {self.db.name}")
         
         # 5. Standby Records (individual crew with date ranges)
-        db_standby = db.get_standby_records()
+        db_standby = self.db.get_standby_records()
         if db_standby:
             self.standby_records = []
             for item in db_standby:
@@ -212,21 +391,10 @@ class DataProcessor:
             print(f"Reconstructed {len(self.standby_records)} standby records from crew_schedule")
         
     def _read_file_safe(self, file_path):
-        """Read file with encoding fallback (utf-8 -> cp1252 -> latin1)"""
+        """Read file, codec sniffed once from BOM / prefix (see csv_encoding)"""
         if not file_path or not file_path.exists():
             return None
-            
-        encodings = ['utf-8', 'cp1252', 'latin1']
-        for enc in encodings:
-            try:
-                with open(file_path, 'r', encoding=enc) as f:
-                    return f.read()
-            except UnicodeDecodeError:
-                continue
-            except Exception as e:
-                print(f"Error reading {file_path}: {e}")
-                return None
-        return None
+        return read_text(file_path)
         
     def parse_time(self, time_str):
         """Parse time string HH:MM to minutes from midnight"""
@@ -325,51 +493,196 @@ class DataProcessor:
         return date_str
     
     def detect_csv_format(self, header_row):
-        """Detect CSV format based on header row and return column indices"""
-        # Default column mapping for format: DATE,REG,FLT,DEP,ARR,STD,STA,...,Crew #,Crew
-        col_map = {
-            'date': 0,
-            'reg': 1,
-            'flt': 2,
-            'dep': 3,
-            'arr': 4,
-            'std': 5,
-            'sta': 6,
-            'crew': 14,
-            'ac': -1 # Default no AC column
-        }
-        
-        row_lower = [str(c).lower().strip() for c in header_row]
-        for idx, col in enumerate(row_lower):
-            if 'date' in col: col_map['date'] = idx
-            elif 'reg' in col: col_map['reg'] = idx
-            elif 'ac' == col or 'type' in col: col_map['ac'] = idx # Detect AC/Type column
-            elif 'flt' in col or 'flight' in col: col_map['flt'] = idx
-            elif 'dep' in col: col_map['dep'] = idx
-            elif 'arr' in col: col_map['arr'] = idx
-            elif 'std' in col: col_map['std'] = idx
-            elif 'sta' in col: col_map['sta'] = idx
-            elif 'crew' in col: col_map['crew'] = idx
-            
-        # Check if crew column exists (either explicitly found or by length heuristic)
-        # Verify if 'crew' index was actually updated from default 14
-        found_crew_col = 'crew' in [c.lower() for c in row_lower if 'crew' in c.lower()]
-        col_map['has_crew'] = found_crew_col or (col_map['crew'] < len(header_row))
-        
+        """Detect DayRep column indices from a header row (see report_formats)"""
+        fmt = REPORT_FORMATS['dayrep']
+        col_map = fmt.match_header(header_row) or dict(fmt.defaults, found=set())
+        # Crew is the last column of the default layout; without a header cell
+        # it only exists if the row is wide enough
+        col_map['has_crew'] = 'crew' in col_map['found'] or col_map['crew'] < len(header_row)
         return col_map
     
     def _decode_content(self, content):
-        """Decode byte content using multiple encodings"""
-        if isinstance(content, str):
-            return content
+        """Decode byte content, codec sniffed once from BOM / prefix"""
+        return decode_bytes(content)
+
+    def process_reports(self, uploads=None, sync_db=True, parallel=None, max_workers=None):
+        """
+        Parse the DayRep, Sacutil, RolCrTot and Crew schedule reports
+        
+        With parallel=True each parser runs in its own process on a throwaway
+        processor (they share no state) and the returned state is merged here;
+        cross-report enrichment and the storage sync then run once, so a refresh
+        takes about as long as the slowest report.
+        
+        Args:
+            uploads: {report: file bytes} for a subset of REPORT_PARSERS
+                (default: all four, from uploads/ or the demo files)
+            sync_db: Write the parsed reports to the storage backend
+            parallel: Use a process pool (default: PARALLEL_INGEST env)
+            max_workers: Pool size (default: one process per report)
             
-        encodings = ['utf-8', 'cp1252', 'latin1']
-        for enc in encodings:
+        Returns:
+            dict: report -> parser return value
+        """
+        uploads = uploads or {}
+        reports = list(uploads) or list(REPORT_PARSERS)
+        parallel = PARALLEL_INGEST if parallel is None else parallel
+        
+        if parallel and len(reports) > 1:
             try:
-                return content.decode(enc)
-            except UnicodeDecodeError:
-                continue
-        return None
+                return self._process_reports_pool(reports, uploads, sync_db, max_workers)
+            except (OSError, BrokenProcessPool) as e:
+                print(f"Parallel ingest unavailable ({e}), parsing sequentially")
+        
+        results = {}
+        for report in reports:
+            method_name = REPORT_PARSERS[report][0]
+            results[report] = getattr(self, method_name)(file_content=uploads.get(report), sync_db=sync_db)
+        return results
+    
+    def detect_report_type(self, file_content):
+        """Report key (see REPORT_PARSERS) of an unlabelled CSV upload, None if unknown"""
+        text = self._decode_content(file_content)
+        if not text:
+            return None
+        return detect_report(csv.reader(io.StringIO(text)))
+    
+    def _process_reports_pool(self, reports, uploads, sync_db, max_workers):
+        """Parse reports in a process pool, then merge, enrich and sync in this process"""
+        with ProcessPoolExecutor(max_workers=max_workers or len(reports)) as pool:
+            futures = {
+                report: pool.submit(_parse_report_worker, report, str(self.data_dir), uploads.get(report))
+                for report in reports
+            }
+            parsed = {report: future.result() for report, future in futures.items()}
+        
+        results = {}
+        with self._delta_lock:
+            for report in REPORT_PARSERS:
+                if report not in parsed:
+                    continue
+                result, state = parsed[report]
+                results[report] = result
+                for attr, value in state.items():
+                    if attr != 'crew_name_map':
+                        self._restore_state(attr, value)
+            
+            # Cross-report enrichment: names from RolCrTot, AIMS leg-member names fill the gaps
+            if 'rolcrtot' in parsed:
+                names = parsed['rolcrtot'][1]['crew_name_map']
+                for date_legs in self.leg_members_by_date.values():
+                    for leg in date_legs.values():
+                        for crew_id, (_, name) in leg['crew'].items():
+                            if name:
+                                names.setdefault(crew_id, name)
+                self.crew_name_map = names
+            
+            # Days with AIMS leg members keep their structured crew
+            if 'dayrep' in parsed and self.leg_members_by_date:
+                self._reindex_dates(list(self.leg_members_by_date))
+        
+        if sync_db:
+            for report in parsed:
+                getattr(self, REPORT_PARSERS[report][2])()
+        return results
+    
+    def process_dayrep_bulk(self, source, sync_db=True, parallel=True, max_workers=None):
+        """
+        Ingest many DayRep files (one per day) as one dataset
+        
+        Files are parsed in parallel, then merged: a flight is identified by
+        (calendar date, flight number, departure) and the newest report wins, so
+        files that overlap - including the 00:00-03:59 departures that
+        get_operating_date carries over to the previous operating day - do not
+        double count. Indexes are rebuilt once and storage is synced once.
+        
+        Args:
+            source: Directory, .zip path, zip bytes, or an iterable of (name, bytes)
+            sync_db: Write the merged flights to the storage backend
+            parallel: Parse files in a process pool (falls back to sequential)
+            max_workers: Pool size (default: CPU count)
+            
+        Returns:
+            dict: files (parsed), flights, duplicates (overlapping rows dropped),
+                dates, skipped (names of empty / blank files)
+        """
+        files = []
+        skipped = []
+        for name, content in collect_dayrep_files(source):
+            # An empty payload must never reach the parser: it reads the demo files instead
+            if content and decode_bytes(content).strip():
+                files.append((name, content))
+            else:
+                skipped.append(name)
+        if skipped:
+            print(f"Bulk DayRep ingest: skipped {len(skipped)} empty files: {', '.join(skipped)}")
+        if not files:
+            return {'files': 0, 'flights': 0, 'duplicates': 0, 'dates': 0, 'skipped': skipped}
+        
+        contents = [content for _, content in files]
+        parsed = None
+        if parallel and len(contents) > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                    parsed = list(pool.map(_parse_dayrep_worker, contents))
+            except (OSError, BrokenProcessPool) as e:
+                print(f"Parallel DayRep ingest unavailable ({e}), parsing sequentially")
+        if parsed is None:
+            parsed = [_parse_dayrep_worker(content) for content in contents]
+        
+        # Overlaps are resolved between files only; rows within one report are kept as-is
+        merged = {}
+        reg_types = {}
+        duplicates = 0
+        for flights, file_reg_types in parsed:
+            reg_types.update(file_reg_types)
+            file_rows = defaultdict(list)
+            for flight in flights:
+                file_rows[(flight['calendar_date'], flight['flt'], flight['dep'])].append(flight)
+            for key, rows in file_rows.items():
+                if key in merged:
+                    duplicates += len(merged.pop(key))
+                merged[key] = rows
+        
+        with self._delta_lock:
+            self.flights = [flight for rows in merged.values() for flight in rows]
+            self.flights_by_date = defaultdict(list)
+            for flight in self.flights:
+                self.flights_by_date[flight['date']].append(flight)
+            self.reg_flight_hours_by_date = defaultdict(lambda: defaultdict(float))
+            self.reg_flight_count_by_date = defaultdict(lambda: defaultdict(int))
+            self.crew_to_regs_by_date = defaultdict(lambda: defaultdict(set))
+            self.crew_group_rotations_by_date = defaultdict(lambda: defaultdict(list))
+            self.crew_roles = {}
+            self.reg_types = reg_types
+            self._reindex_dates(set(self.flights_by_date) | set(self.leg_members_by_date))
+        
+        if sync_db:
+            self._sync_flights()
+        
+        print(f"Bulk DayRep ingest: {len(files)} files, {len(self.flights)} flights, "
+              f"{duplicates} overlapping rows resolved, {len(self.available_dates)} operating days")
+        return {
+            'files': len(files),
+            'flights': len(self.flights),
+            'duplicates': duplicates,
+            'dates': len(self.available_dates),
+            'skipped': skipped
+        }
+    
+    def _restore_state(self, attr, value):
+        """Set parser state returned by a worker, rebuilding defaultdicts from the current attribute"""
+        template = getattr(self, attr)
+        if isinstance(template, defaultdict):
+            restored = defaultdict(template.default_factory)
+            for key, inner in value.items():
+                slot = restored[key]
+                if isinstance(slot, defaultdict):
+                    slot.update(inner)
+                else:
+                    restored[key] = inner
+            value = restored
+        setattr(self, attr, value)
 
     def process_dayrep_csv(self, file_path=None, file_content=None, sync_db=True):
         """Process DayRepReport CSV file with operating day logic (04:00-03:59)
@@ -426,66 +739,42 @@ class DataProcessor:
             return 0
 
         # Auto-detect format from header row (usually row 2 or 3)
-        col_map = None
-        header_row_idx = None
-        for i, row in enumerate(rows[:5]):  # Check first 5 rows for header
-            if len(row) >= 6:
-                row_lower = [c.lower().strip() for c in row]
-                if 'date' in row_lower and ('reg' in row_lower or 'flt' in row_lower):
-                    col_map = self.detect_csv_format(row)
-                    header_row_idx = i
-                    break
-        
-        # If no header found, use default mapping based on content detection
-        if col_map is None:
-            col_map = {
-                'date': 0, 'reg': 1, 'flt': 2, 'dep': 3, 'arr': 4,
-                'std': 5, 'sta': 6, 'crew': 14, 'has_crew': True
-            }
+        _, header_row_idx, col_map = find_report_header('dayrep', rows)
+        if col_map is not None:
+            col_map['has_crew'] = 'crew' in col_map['found'] or col_map['crew'] < len(rows[header_row_idx])
+        else:
+            # If no header found, use default mapping based on content detection
+            col_map = dict(REPORT_FORMATS['dayrep'].defaults, has_crew=True)
             header_row_idx = -1
         
+        date_idx, reg_idx, ac_idx = col_map['date'], col_map['reg'], col_map['ac']
+        flt_idx, dep_idx, arr_idx = col_map['flt'], col_map['dep'], col_map['arr']
+        std_idx, sta_idx, crew_idx = col_map['std'], col_map['sta'], col_map['crew']
+        has_crew = col_map['has_crew']
+        # Need at least the basic columns to process
+        min_cols = max(date_idx, reg_idx, flt_idx, dep_idx, arr_idx, std_idx, sta_idx) + 1
+        
         # Process data rows
         for row in rows[header_row_idx + 1:]:
-            # Need at least the basic columns to process
-            min_cols = max(col_map['date'], col_map['reg'], col_map['flt'], 
-                          col_map['dep'], col_map['arr'], col_map['std'], col_map['sta']) + 1
-            
-            if len(row) >= min_cols and row[col_map['date']]:
-                date_str = row[col_map['date']].strip()
+            if len(row) >= min_cols and row[date_idx]:
+                date_str = row[date_idx].strip()
                 # Check if first column looks like a date (contains / and digits)
                 if '/' in date_str and any(c.isdigit() for c in date_str):
-                    reg = row[col_map['reg']].strip() if col_map['reg'] < len(row) else ''
-                    
-                    # Capture AC Type if available (usually in column 1 in detected format)
-                    # col_map usually has reg at 1, flt at 2.
-                    # Wait, detect_csv_format uses: 'date': 0, 'reg': 1, 'flt': 2...
-                    # User said "A/C type sẽ lấy thông tin từ Dayrepreport".
-                    # Let's check DayRep structure. 
-                    # Usually: Date, AC, Reg, Flt... OR Date, Reg, Flt...
-                    # If AC column exists, it should be mapped.
-                    # Current detect_csv_format (line 405) defaults to: 'date': 0, 'reg': 1, 'flt': 2
-                    # If there's an AC Type column, we need to detect it.
-                    # Let's check detect_csv_format implementation (line 288).
-                    # If columns are: Date, AC Type, Reg, Flt... then Reg is index 2.
-                    # We need to ensure we capture AC Type.
-                    
-                    # Capture AC Type
-
-                    
-                    if 'ac' in col_map and col_map['ac'] < len(row):
-                         ac_type = row[col_map['ac']].strip()
-                         if reg and ac_type:
-                             self.reg_types[reg] = ac_type
+                    reg = row[reg_idx].strip()
                     
-                    reg = row[col_map['reg']].strip() if col_map['reg'] < len(row) else ''
+                    # Capture AC Type if the layout has an AC/Type column
+                    if 0 <= ac_idx < len(row):
+                        ac_type = row[ac_idx].strip()
+                        if reg and ac_type:
+                            self.reg_types[reg] = ac_type
                     
                     # Skip rows without REG (some dates may not have aircraft assigned yet)
                     if not reg:
                         continue
                     
                     calendar_date = self.normalize_date(date_str)
-                    std_time = row[col_map['std']].strip() if col_map['std'] < len(row) and row[col_map['std']] else ''
-                    sta_time = row[col_map['sta']].strip() if col_map['sta'] < len(row) and row[col_map['sta']] else ''
+                    std_time = row[std_idx].strip()
+                    sta_time = row[sta_idx].strip()
                     
                     # Apply operating day logic (04:00-03:59)
                     operating_date = self.get_operating_date(calendar_date, std_time)
@@ -493,16 +782,16 @@ class DataProcessor:
                     
                     # Get crew string if available
                     crew_string = ''
-                    if col_map['has_crew'] and col_map['crew'] < len(row):
-                        crew_string = row[col_map['crew']]
+                    if has_crew and crew_idx < len(row):
+                        crew_string = row[crew_idx]
                     
                     flight = {
                         'date': operating_date,
                         'calendar_date': calendar_date,
                         'reg': reg,
-                        'flt': row[col_map['flt']].strip() if col_map['flt'] < len(row) else '',
-                        'dep': row[col_map['dep']].strip() if col_map['dep'] < len(row) else '',
-                        'arr': row[col_map['arr']].strip() if col_map['arr'] < len(row) else '',
+                        'flt': row[flt_idx].strip(),
+                        'dep': row[dep_idx].strip(),
+                        'arr': row[arr_idx].strip(),
                         'std': std_time,
                         'sta': sta_time,
                         'crew': crew_string
@@ -542,9 +831,21 @@ class DataProcessor:
         # Sort dates chronologically
         self.available_dates = sorted(list(unique_dates), key=lambda d: self._parse_date_for_sort(d))
         
-        # INSERT TO SUPABASE
-        if sync_db and db.is_connected() and len(self.flights) > 0:
-            print("syncing flights to supabase...")
+        # Days with AIMS leg members keep their structured crew
+        if self.leg_members_by_date:
+            self._reindex_dates(list(self.leg_members_by_date))
+        
+        # INSERT TO STORAGE
+        if sync_db:
+            self._sync_flights()
+        
+        return len(self.flights)
+    
+    def _sync_flights(self, backend=None):
+        """Write the parsed DayRep flights to the storage backend (full refresh)"""
+        db = backend or self.db
+        if db.is_connected() and len(self.flights) > 0:
+            print(f"syncing flights to {db.name}...")
             flights_payload = []
             for flight in self.flights:
                 flights_payload.append({
@@ -559,8 +860,6 @@ class DataProcessor:
                     'crew': flight.get('crew', '')
                 })
             db.insert_flights(flights_payload)
-        
-        return len(self.flights)
     
     def _parse_date_for_sort(self, date_str):
         """Parse date string for sorting purposes"""
@@ -604,34 +903,24 @@ class DataProcessor:
         # Parse CSV properly
         rows = list(csv.reader(content.splitlines()))
         
-        # Helper functions
-        def parse_time_to_min(time_str):
-            try:
-                if ':' in time_str:
-                    h, m = time_str.split(':')
-                    return int(h) * 60 + int(m)
-                return 0
-            except:
-                return 0
-        
-        def parse_int(val):
-            try:
-                return int(val)
-            except:
-                return 0
-        
-        def min_to_time(minutes):
-            return f"{minutes // 60:02d}:{minutes % 60:02d}"
+        # Column layout from the header (fixed positions if there is none)
+        _, _, col_map = find_report_header('sacutil', rows)
+        if col_map is None:
+            col_map = REPORT_FORMATS['sacutil'].defaults
+        date_idx, ac_idx = col_map['date'], col_map['ac']
+        block_idx = (col_map['dom_block'], col_map['int_block'], col_map['total_block'])
+        cycle_idx = (col_map['dom_cycles'], col_map['int_cycles'], col_map['total_cycles'])
+        util_idx = col_map['avg_util']
+        min_cols = max(date_idx, ac_idx, *block_idx, *cycle_idx) + 1
         
         # Try to detect year from file content (e.g., "20/01/2026-31/01/2026")
         report_year = 2026  # Default
         for row in rows[:5]:
-            row_str = ','.join(row)
-            import re
-            year_match = re.search(r'20(\d{2})', row_str)
+            year_match = YEAR_PATTERN.search(','.join(row))
             if year_match:
                 report_year = 2000 + int(year_match.group(1))
                 break
+        year_suffix = str(report_year)[-2:]
         
         # Aggregate data by date and by aircraft type
         # Structure: ac_stats_by_date[date_str][ac_type] = {stats}
@@ -649,10 +938,10 @@ class DataProcessor:
         })
         
         for row in rows:
-            if len(row) < 8:
+            if len(row) < min_cols:
                 continue
             
-            first_col = row[0].strip()
+            first_col = row[date_idx].strip()
             # Skip header rows, totals, and non-data rows
             if not first_col or 'Totals' in first_col or 'Period' in first_col or 'Generated' in first_col:
                 continue
@@ -672,36 +961,23 @@ class DataProcessor:
                 day = int(day)
                 month = int(month)
                 # Construct date string in DD/MM/YY format (same as DayRep/CrewSchedule)
-                date_str = f"{day:02d}/{month:02d}/{str(report_year)[-2:]}"
+                date_str = f"{day:02d}/{month:02d}/{year_suffix}"
             except:
                 continue
                 
             # Get AC type - handle formats like "320", "321", "330", "A320", etc.
-            ac_type = row[1].strip()
+            # (SacutilReport has no REG; REG -> type comes from DayRep)
+            ac_type = row[ac_idx].strip()
             if not ac_type or ac_type in ['AC', 'ACTYPE', 'Aircraft', 'Date']:
                 continue
             
             # Normalize AC type (strip leading 'A' if present for consistency)
             if ac_type.startswith('A') and len(ac_type) > 1 and ac_type[1:].isdigit():
                 ac_type = ac_type[1:]
-                
-            # Store AC Type for this REG if we have reg info
-            # NOTE: SacutilReport has AC Type but NOT specific REG (e.g. VN-A500).
-            # DayRepReport HAS Reg and AC Type. We should capture it there.
-            # But here in SacutilReport, we only have aggregate stats per AC Type.
-            # So we can't map Reg -> Type here.
-            # We must do it in process_dayrep_csv.
             
-            dom_block = parse_time_to_min(row[2].strip()) if len(row) > 2 else 0
-            int_block = parse_time_to_min(row[3].strip()) if len(row) > 3 else 0
-            total_block = parse_time_to_min(row[4].strip()) if len(row) > 4 else 0
-            
-            dom_cycles = parse_int(row[5].strip()) if len(row) > 5 else 0
-            int_cycles = parse_int(row[6].strip()) if len(row) > 6 else 0
-            total_cycles = parse_int(row[7].strip()) if len(row) > 7 else 0
-            
-            # Get avg util from last column (index 11 in new format)
-            avg_util = row[11].strip() if len(row) > 11 else ''
+            dom_block, int_block, total_block = (hhmm_to_minutes(row[i].strip()) for i in block_idx)
+            dom_cycles, int_cycles, total_cycles = (to_int(row[i].strip()) for i in cycle_idx)
+            avg_util = row[util_idx].strip() if util_idx < len(row) else ''
             
             # Aggregate by date and AC type
             stats = ac_stats_by_date[date_str][ac_type]
@@ -730,9 +1006,9 @@ class DataProcessor:
             self.ac_utilization_by_date[date_str] = {}
             for ac_type, stats in ac_types.items():
                 self.ac_utilization_by_date[date_str][ac_type] = {
-                    'dom_block': min_to_time(stats['dom_block_min']),
-                    'int_block': min_to_time(stats['int_block_min']),
-                    'total_block': min_to_time(stats['total_block_min']),
+                    'dom_block': minutes_to_hhmm(stats['dom_block_min']),
+                    'int_block': minutes_to_hhmm(stats['int_block_min']),
+                    'total_block': minutes_to_hhmm(stats['total_block_min']),
                     'dom_cycles': str(stats['dom_cycles']),
                     'int_cycles': str(stats['int_cycles']),
                     'total_cycles': str(stats['total_cycles']),
@@ -742,18 +1018,26 @@ class DataProcessor:
         # Store totals (for "All Dates" view)
         for ac_type, stats in ac_stats_total.items():
             self.ac_utilization[ac_type] = {
-                'dom_block': min_to_time(stats['dom_block_min']),
-                'int_block': min_to_time(stats['int_block_min']),
-                'total_block': min_to_time(stats['total_block_min']),
+                'dom_block': minutes_to_hhmm(stats['dom_block_min']),
+                'int_block': minutes_to_hhmm(stats['int_block_min']),
+                'total_block': minutes_to_hhmm(stats['total_block_min']),
                 'dom_cycles': str(stats['dom_cycles']),
                 'int_cycles': str(stats['int_cycles']),
                 'total_cycles': str(stats['total_cycles']),
                 'avg_util': stats['last_avg_util']
             }
         
-        # INSERT TO SUPABASE
-        if sync_db and db.is_connected() and len(self.ac_utilization_by_date) > 0:
-            print("syncing ac_utilization to supabase...")
+        # INSERT TO STORAGE
+        if sync_db:
+            self._sync_ac_utilization()
+        
+        return len(self.ac_utilization)
+    
+    def _sync_ac_utilization(self, backend=None):
+        """Write the parsed SacutilReport rows to the storage backend (full refresh)"""
+        db = backend or self.db
+        if db.is_connected() and len(self.ac_utilization_by_date) > 0:
+            print(f"syncing ac_utilization to {db.name}...")
             util_data = []
             for date_str, ac_types in self.ac_utilization_by_date.items():
                 for ac_type, stats in ac_types.items():
@@ -775,8 +1059,6 @@ class DataProcessor:
             # So stats['dom_block'] is "HH:MM".
             
             db.insert_ac_utilization(util_data)
-
-        return len(self.ac_utilization)
     
     def process_rolcrtot_csv(self, file_path=None, file_content=None, sync_db=True):
         """Process RolCrTotReport CSV file - Rolling crew hours totals"""
@@ -815,48 +1097,15 @@ class DataProcessor:
         # Row 2: ID, Name, Seniority, Last, Last
         # Row 3: '', '', '', 28-Day(s), 12-Month(s)
         # Row 4: '', '', '', Block Time, Block Time
-        # Data starts at row 5
-        
-        # Find the row with 'Name' column (ID might be empty in header)
-        data_start_idx = 0
-        header_found = False
-        header_map = {'id': 0, 'name': 1, 'seniority': 2, 'block_28day': 3, 'block_12month': 4}
-        
-        for i, row in enumerate(rows[:20]):
-            row_lower = [str(c).lower().strip() for c in row]
-            
-            # Check for specific patterns from the user's image
-            # Row usually has "Name" and maybe "Seniority" or "Last"
-            if 'name' in row_lower:
-                header_found = True
-                
-                # Dynamic column mapping
-                for idx, col in enumerate(row_lower):
-                    if 'id' == col: header_map['id'] = idx
-                    elif 'name' in col: header_map['name'] = idx
-                    elif 'seniority' in col: header_map['seniority'] = idx
-                
-                # Start looking for data from next row
-                data_start_idx = i + 1
-                
-                # Check next rows for Block Time headers (28-day, 12-month)
-                # These might be in row i+1 or i+2
-                for j in range(1, 4):
-                    if i + j < len(rows):
-                        sub_row = [str(c).lower().strip() for c in rows[i+j]]
-                        for idx, col in enumerate(sub_row):
-                            if '28-day' in col: header_map['block_28day'] = idx
-                            elif '12-month' in col: header_map['block_12month'] = idx
-                
-                # Skip header rows (e.g., "28-Day(s)", "Block Time")
-                # Look ahead for a row where the first column is a digit (Crew ID)
-                while data_start_idx < len(rows):
-                    if len(rows[data_start_idx]) > 0:
-                        first_cell = str(rows[data_start_idx][header_map['id']]).strip()
-                        if first_cell and first_cell.isdigit():
-                            break
-                    data_start_idx += 1
-                break
+        # Data starts at row 5 (sub-header rows are skipped by the crew ID check)
+        _, header_idx, header_map = find_report_header('rolcrtot', rows)
+        if header_map is None:
+            header_map = REPORT_FORMATS['rolcrtot'].defaults
+            data_start_idx = 0
+        else:
+            data_start_idx = header_idx + 1
+        id_idx, name_idx, seniority_idx = header_map['id'], header_map['name'], header_map['seniority']
+        b28_idx, b12m_idx = header_map['block_28day'], header_map['block_12month']
         
         for row in rows[data_start_idx:]:
             if len(row) < 4: continue
@@ -864,28 +1113,19 @@ class DataProcessor:
             # Safe extraction
             try:
                 # Ensure index exists
-                crew_id = row[header_map['id']].strip() if header_map['id'] < len(row) else ''
+                crew_id = row[id_idx].strip() if id_idx < len(row) else ''
                 if not crew_id or not crew_id[0].isdigit(): continue
                 
-                name = row[header_map['name']].strip() if header_map['name'] < len(row) else ''
-                seniority = row[header_map['seniority']].strip() if header_map['seniority'] < len(row) else '0'
+                name = row[name_idx].strip() if name_idx < len(row) else ''
+                seniority = row[seniority_idx].strip() if seniority_idx < len(row) else '0'
                 
                 # Get block hours from fixed column positions
-                b28 = row[header_map['block_28day']].strip() if header_map['block_28day'] < len(row) else '0:00'
-                b12m = row[header_map['block_12month']].strip() if header_map['block_12month'] < len(row) else '0:00'
+                b28 = row[b28_idx].strip() if b28_idx < len(row) else '0:00'
+                b12m = row[b12m_idx].strip() if b12m_idx < len(row) else '0:00'
                 
                 # Parse hours from HH:MM format
-                def parse_hours(time_str):
-                    try:
-                        if ':' in time_str:
-                            h, m = time_str.split(':')
-                            return float(h) + float(m) / 60
-                        return 0.0
-                    except:
-                        return 0.0
-                
-                hours_28day = parse_hours(b28)
-                hours_12month = parse_hours(b12m)
+                hours_28day = hhmm_to_hours(b28)
+                hours_12month = hhmm_to_hours(b12m)
                 
                 # Determine status based on 28-day limit (100 hours)
                 try:
@@ -935,9 +1175,17 @@ class DataProcessor:
         # Sort by 28-day hours descending
         self.rolling_hours.sort(key=lambda x: x['hours_28day'], reverse=True)
         
-        # INSERT TO SUPABASE
-        if sync_db and db.is_connected() and len(self.rolling_hours) > 0:
-            print("syncing rolling_hours to supabase...")
+        # INSERT TO STORAGE
+        if sync_db:
+            self._sync_rolling_hours()
+        
+        return len(self.rolling_hours)
+    
+    def _sync_rolling_hours(self, backend=None):
+        """Write the parsed RolCrTotReport rows to the storage backend (full refresh)"""
+        db = backend or self.db
+        if db.is_connected() and len(self.rolling_hours) > 0:
+            print(f"syncing rolling_hours to {db.name}...")
             hours_data = []
             for item in self.rolling_hours:
                 hours_data.append({
@@ -954,8 +1202,6 @@ class DataProcessor:
                     'status_12m': item.get('status_12m', 'normal')
                 })
             db.insert_rolling_hours(hours_data)
-            
-        return len(self.rolling_hours)
     
     def process_crew_schedule_csv(self, file_path=None, file_content=None, sync_db=True):
         """Process Crew schedule CSV file - Standby, sick-call, fatigue status"""
@@ -1012,7 +1258,7 @@ class DataProcessor:
         # This is the report generation date - use YEAR from here (more reliable)
         for i in range(min(5, len(rows))):
             line_str = ",".join(rows[i])
-            date_match = re.search(r'(\d{1,2})\s+([A-Za-z]{3})\s+(\d{4})', line_str)
+            date_match = TEXT_DATE_PATTERN.search(line_str)
             if date_match:
                 try:
                     d_day, d_month_str, d_year = date_match.groups()
@@ -1029,7 +1275,7 @@ class DataProcessor:
         for i in range(min(5, len(rows))):
             line_str = ",".join(rows[i])
             # Relaxed regex: allow any chars between Period and date (e.g. "Period: " or "Period ")
-            period_match = re.search(r'Period.*(\d{1,2})/(\d{1,2})/(\d{4})', line_str)
+            period_match = PERIOD_PATTERN.search(line_str)
             if period_match:
                 try:
                     p_day, p_month, p_year = period_match.groups()
@@ -1060,46 +1306,19 @@ class DataProcessor:
                 if found_month_name: break
             if found_month_name: break
 
-        # 2. Detect columns (Standard vs Matrix)
-        is_matrix = False
-        
-        for i, row in enumerate(rows[:10]):
-            row_upper = [c.upper().strip() for c in row]
-            
-            # Check for Matrix headers (ID and Day Numbers like '20', '21')
-            day_cols = [idx for idx, c in enumerate(row) if c.strip().isdigit() and 1 <= int(c.strip()) <= 31]
-            
-            if 'ID' in row_upper and len(day_cols) > 3:
-                is_matrix = True
-                data_start_idx = i + 1
-                
-                # Map standard columns
-                for idx, col in enumerate(row_upper):
-                    if col == 'ID': header_map['id'] = idx
-                    elif 'NAM' in col: header_map['name'] = idx
-                
-                # Map date columns
-                for idx in day_cols:
-                    day_num = int(row[idx].strip())
-                    # Construct date string DD/MM/YY
-                    # Handle month rollover? For simplicity assume report covers one month mostly
-                    # or strictly use report_month.
-                    date_str = f"{day_num:02d}/{report_month:02d}/{str(report_year)[-2:]}"
-                    date_cols[idx] = date_str
-                break
-                
-            # Check for Standard headers
-            elif 'ID' in row_upper and ('SL' in row_upper or 'SBY' in row_upper or 'FDUT' in row_upper or 'CREW' in str(row_upper)):
-                for idx, col in enumerate(row_upper):
-                    if col == 'ID': header_map['id'] = idx
-                    elif 'NAM' in col: header_map['name'] = idx
-                    elif 'BASE' in col: header_map['base'] = idx
-                    elif col == 'SL': header_map['sl'] = idx
-                    elif col == 'CSL': header_map['csl'] = idx
-                    elif col == 'SBY': header_map['sby'] = idx
-                    elif col == 'OSBY': header_map['osby'] = idx
-                data_start_idx = i + 1
-                break
+        # 2. Detect columns (Standard vs Matrix) from the registered layouts
+        fmt, header_idx, col_map = find_report_header('crew_schedule', rows)
+        is_matrix = fmt is not None and fmt.name == 'crew_schedule_matrix'
+        if fmt is not None:
+            header_map = {field: col_map[field] for field in col_map['found'] if field != 'days'}
+            data_start_idx = header_idx + 1
+        if is_matrix:
+            # Map date columns
+            # Handle month rollover? For simplicity assume report covers one month mostly
+            # or strictly use report_month.
+            for idx in col_map['days']:
+                day_num = int(rows[header_idx][idx].strip())
+                date_cols[idx] = f"{day_num:02d}/{report_month:02d}/{str(report_year)[-2:]}"
         
         # Default mapping fallback (Standard)
         if not header_map and not is_matrix:
@@ -1131,7 +1350,7 @@ class DataProcessor:
             line_str = " ".join(rows[i])
             
             # Format 1: 15 Jan 2026 or 15 JAN 2026 (spaces)
-            match1 = re.search(r'(\d{1,2})\s+([A-Za-z]{3})\s+(\d{4})', line_str)
+            match1 = TEXT_DATE_PATTERN.search(line_str)
             if match1:
                 try:
                     d_day, d_month_str, d_year = match1.groups()
@@ -1141,7 +1360,7 @@ class DataProcessor:
                 except: pass
                 
             # Format 2: 15-Jan-2026 (dashes)
-            match2 = re.search(r'(\d{1,2})-([A-Za-z]{3})-(\d{4})', line_str)
+            match2 = DASH_DATE_PATTERN.search(line_str)
             if match2:
                 try:
                     d_day, d_month_str, d_year = match2.groups()
@@ -1151,7 +1370,7 @@ class DataProcessor:
                 except: pass
 
             # Format 3: 15/01/2026 or 15/01/26 (slashes)
-            match3 = re.search(r'(\d{1,2})/(\d{1,2})/(\d{2,4})', line_str)
+            match3 = SLASH_DATE_PATTERN.search(line_str)
             if match3:
                 try:
                     d_day, d_month, d_year = match3.groups()
@@ -1166,7 +1385,7 @@ class DataProcessor:
              # Search for '15Jan' or '15Jan2026' or '2026-01-15'
              try:
                  # Match 15Jan or 15Jan26
-                 fname_match = re.search(r'(\d{1,2})([A-Za-z]{3})', filename)
+                 fname_match = FILENAME_DATE_PATTERN.search(filename)
                  if fname_match:
                      d_day, d_month_str = fname_match.groups()
                      d_month = datetime.strptime(d_month_str, "%b").month
@@ -1175,8 +1394,12 @@ class DataProcessor:
                      current_report_date = f"{int(d_day):02d}/{d_month:02d}/{d_year}"
              except: pass
         
-        # Process Rows
-        for row in rows[data_start_idx:]:
+        if is_matrix:
+            # MATRIX MODE parsing - column-wise, see _ingest_schedule_matrix
+            self._ingest_schedule_matrix(rows[data_start_idx:], header_map, date_cols)
+        
+        # Process Rows (standard list mode)
+        for row in (rows[data_start_idx:] if not is_matrix else ()):
             if len(row) < 2: continue
             
             # Skip totals/empty key rows
@@ -1195,88 +1418,112 @@ class DataProcessor:
                 crew_base = row[header_map['base']].strip()
             # Extract base from Base/Ac/Pos column like "SGN 320 CP"
             if not crew_base and crew_name:
-                # Try to extract base from combined column
-                for col_val in row:
-                    if any(b in col_val.upper() for b in ['SGN', 'HAN', 'DAD', 'CXR']):
-                        parts = col_val.strip().split()
-                        if parts:
-                            crew_base = parts[0].upper()
-                        break
+                crew_base = find_crew_base(row)
 
-            if is_matrix:
-                # MATRIX MODE parsing - each date column represents a day
-                try:
-                     for col_idx, date_str in date_cols.items():
-                         if col_idx < len(row):
-                             val = row[col_idx].strip().upper()
-                             if not val: continue
-                             
-                             status_type = None
-                             if 'OSBY' in val:
-                                 status_type = 'OSBY'
-                             elif 'SBY' in val:
-                                 status_type = 'SBY'
-                             elif 'CSL' in val:
-                                 status_type = 'CSL'
-                             elif 'SL' in val:
-                                 status_type = 'SL'
-                             
-                             if status_type:
-                                 self.crew_schedule_by_date[date_str][status_type] += 1
-                                 self.crew_schedule['summary'][status_type] += 1
-                                 
-                                 # Store individual record (date is both start and end for single day)
-                                 self.standby_records.append({
-                                     'crew_id': crew_id,
-                                     'name': crew_name,
-                                     'base': crew_base,
-                                     'status_type': status_type,
-                                     'start_date': date_str,
-                                     'end_date': date_str
-                                 })
-                except:
-                    continue
-            else:
-                # STANDARD LIST MODE parsing
-                try:
-                    # Helper to get value
-                    def get_value(key):
-                        if key in header_map and header_map[key] < len(row):
-                            val = row[header_map[key]].strip()
-                            if val.isdigit(): return int(val)
-                        return 0
+            # STANDARD LIST MODE parsing
+            try:
+                # Helper to get value
+                def get_value(key):
+                    if key in header_map and header_map[key] < len(row):
+                        val = row[header_map[key]].strip()
+                        if val.isdigit(): return int(val)
+                    return 0
 
-                    sl_val = get_value('sl')
-                    csl_val = get_value('csl')
-                    sby_val = get_value('sby')
-                    osby_val = get_value('osby')
-                    
-                    # Determine primary status type for this crew member
-                    # Store as individual record with the report date
-                    for status_type, val in [('SL', sl_val), ('CSL', csl_val), ('SBY', sby_val), ('OSBY', osby_val)]:
-                        if val > 0:
-                            self.crew_schedule['summary'][status_type] += val
-                            if current_report_date:
-                                self.crew_schedule_by_date[current_report_date][status_type] += val
-                                
-                                # Store individual record
-                                self.standby_records.append({
-                                    'crew_id': crew_id,
-                                    'name': crew_name,
-                                    'base': crew_base,
-                                    'status_type': status_type,
-                                    'start_date': current_report_date,
-                                    'end_date': current_report_date
-                                })
-                    
-                except Exception:
-                    continue
+                sl_val = get_value('sl')
+                csl_val = get_value('csl')
+                sby_val = get_value('sby')
+                osby_val = get_value('osby')
+                
+                # Determine primary status type for this crew member
+                # Store as individual record with the report date
+                for status_type, val in [('SL', sl_val), ('CSL', csl_val), ('SBY', sby_val), ('OSBY', osby_val)]:
+                    if val > 0:
+                        self.crew_schedule['summary'][status_type] += val
+                        if current_report_date:
+                            self.crew_schedule_by_date[current_report_date][status_type] += val
+                            
+                            # Store individual record
+                            self.standby_records.append({
+                                'crew_id': crew_id,
+                                'name': crew_name,
+                                'base': crew_base,
+                                'status_type': status_type,
+                                'start_date': current_report_date,
+                                'end_date': current_report_date
+                            })
+                
+            except Exception:
+                continue
 
-        # SYNC TO SUPABASE
-        if sync_db and db.is_connected():
+        # SYNC TO STORAGE
+        if sync_db:
+            self._sync_crew_schedule()
+        
+        return sum(self.crew_schedule['summary'].values())
+    
+    def _ingest_schedule_matrix(self, rows, header_map, date_cols):
+        """
+        Crew schedule matrix (crew x day of month) in column-wise passes
+        
+        Each day column is classified through one code lookup table and
+        counted at once; per crew member, consecutive days with the same
+        status become one standby_records range instead of a record per day.
+        """
+        id_idx = header_map['id']
+        name_idx = header_map.get('name')
+        
+        # Skip totals/empty key rows
+        crew_rows = [row for row in rows if len(row) >= 2 and id_idx < len(row) and row[id_idx].strip()[:1].isdigit()]
+        if not crew_rows or not date_cols:
+            return
+        
+        # Day columns in header order; a run breaks where the next column is
+        # not the following calendar day
+        day_positions = sorted(date_cols)
+        day_dates = [date_cols[i] for i in day_positions]
+        day_numbers = [int(d[:2]) for d in day_dates]
+        day_breaks = frozenset(j for j in range(1, len(day_numbers)) if day_numbers[j] != day_numbers[j - 1] + 1)
+        
+        first_day, width = day_positions[0], day_positions[-1] + 1
+        padded = [row if len(row) >= width else row + [''] * (width - len(row)) for row in crew_rows]
+        
+        columns = list(zip(*padded))
+        codes = {'': None}
+        status_columns = []
+        for position in day_positions:
+            statuses = classify_duty_column(codes, columns[position])
+            status_columns.append(statuses)
+            date_str = date_cols[position]
+            for status_type, count in Counter(filter(None, statuses)).items():
+                self.crew_schedule_by_date[date_str][status_type] += count
+                self.crew_schedule['summary'][status_type] += count
+        
+        for row, statuses in zip(crew_rows, zip(*status_columns)):
+            if not any(statuses):
+                continue
+            crew_id = row[id_idx].strip()
+            crew_name = row[name_idx].strip() if name_idx is not None and name_idx < len(row) else ''
+            # Extract base from Base/Ac/Pos column like "SGN 320 CP"
+            # (cells before the first day column, where it normally sits, are tried first)
+            crew_base = (find_crew_base(row[:first_day]) or find_crew_base(row)) if crew_name else ''
+            
+            for status_type, first, last in duty_runs(statuses, day_breaks):
+                self.standby_records.append({
+                    'crew_id': crew_id,
+                    'name': crew_name,
+                    'base': crew_base,
+                    'status_type': status_type,
+                    'start_date': day_dates[first],
+                    'end_date': day_dates[last]
+                })
+    
+    def _sync_crew_schedule(self, backend=None):
+        """Write crew_schedule counts and standby_records to the storage backend"""
+        db = backend or self.db
+        if db.is_connected():
             # Sync legacy crew_schedule table (for backward compatibility)
             if self.crew_schedule_by_date or self.crew_schedule['summary']:
-                print("syncing crew_schedule to supabase...")
+                print(f"syncing crew_schedule to {db.name}...")
                 schedule_data = []
                 for date_str, counts in self.crew_schedule_by_date.items():
                     for status_type in ['SL', 'CSL', 'SBY', 'OSBY']:
@@ -1291,11 +1538,40 @@ class DataProcessor:
             
             # Sync new standby_records table (individual crew with date ranges)
             if self.standby_records:
-                print(f"syncing {len(self.standby_records)} standby_records to supabase...")
+                print(f"syncing {len(self.standby_records)} standby_records to {db.name}...")
                 db.upsert_standby_records(self.standby_records)
 
-        return sum(self.crew_schedule['summary'].values())
+    def export_snapshot(self, root=None):
+        """
+        Archive the processed data into the Parquet snapshot store
 
+        Writes flights, AC utilization, rolling hours, crew schedule and standby
+        records plus per-date REG block minutes / cycles, replacing only the
+        months present in the current data.
+
+        Returns:
+            dict: {'root': store path, 'reg_daily_stats': rows}
+        """
+        from snapshot_store import SnapshotBackend
+
+        snapshot = SnapshotBackend(root)
+        self._sync_flights(backend=snapshot)
+        self._sync_ac_utilization(backend=snapshot)
+        self._sync_rolling_hours(backend=snapshot)
+        self._sync_crew_schedule(backend=snapshot)
+
+        stats = []
+        for date_str, regs in self.reg_flight_hours_by_date.items():
+            for reg, hours in regs.items():
+                stats.append({
+                    'date': date_str,
+                    'reg': reg,
+                    'block_minutes': round(hours * 60),
+                    'cycles': self.reg_flight_count_by_date[date_str][reg]
+                })
+        if stats:
+            snapshot.insert_reg_daily_stats(stats)
+        return {'root': str(snapshot.root), 'reg_daily_stats': len(stats)}
     
     def calculate_metrics(self, filter_date=None):
         """Calculate all dashboard KPIs, optionally filtered by date"""
@@ -1434,7 +1710,7 @@ class DataProcessor:
                     
                     group_flights = []
                     for f in flights:
-                        flight_crew_key = self.get_crew_set_key(f.get('crew', ''))
+                        flight_crew_key = tuple(sorted(cid for _, cid in self._flight_crew(f)))
                         if flight_crew_key == crew_set_key:
                              group_flights.append(f.get('flt', ''))
                     
@@ -1456,7 +1732,7 @@ class DataProcessor:
         operating_crew = []
         
         for f in flights:
-            crew_list = self.extract_crew_ids(f.get('crew', ''), exclude_non_operating=True)
+            crew_list = self._flight_crew(f, exclude_non_operating=True)
             for role, crew_id in crew_list:
                 if crew_id not in counted_crew:
                     role_counts[role] += 1
@@ -1640,12 +1916,22 @@ class DataProcessor:
         """Get all data for dashboard, optionally filtered by date"""
         return self.calculate_metrics(filter_date)
     
-    def export_to_json(self, output_file='dashboard_data.json'):
-        """Export data to JSON file"""
+    def export_to_json(self, output_file='dashboard_data.json', compact=False):
+        """
+        Export data to JSON file
+
+        Args:
+            compact: Minified output streamed to the file (machine consumers);
+                     default is 2-space indented
+        """
         data = self.calculate_metrics()
         output_path = self.data_dir / output_file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        with open(output_path, 'wb') as f:
+            if compact:
+                for chunk in json_codec.iter_encode(data):
+                    f.write(chunk)
+            else:
+                f.write(json_codec.dumpb(data, pretty=True))
         return str(output_path)
     
     # ============================================================
@@ -1766,6 +2052,418 @@ class DataProcessor:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    # ==================== LIVE ETL DELTAS ====================
+    
+    def _aims_flight_key(self, flight_date, flight_no):
+        """
+        Match key between fact_actuals and DayRep flights: calendar date plus the
+        numeric flight number (AIMS sends carrier + number, DayRep only the number)
+        """
+        match = re.search(r'(\d+[A-Z]?)$', (flight_no or '').strip())
+        return (self.normalize_date(flight_date or ''), match.group(1) if match else (flight_no or '').strip())
+    
+    def _flight_from_actual(self, actual):
+        """Build an internal flight dict from a fact_actuals row"""
+        calendar_date = self.normalize_date(actual.get('flight_date', ''))
+        std_time = actual.get('std') or ''
+        return {
+            'date': self.get_operating_date(calendar_date, std_time),
+            'calendar_date': calendar_date,
+            'reg': actual.get('ac_reg') or '',
+            'flt': actual.get('flight_no', ''),
+            'dep': actual.get('departure', ''),
+            'arr': actual.get('arrival', ''),
+            'std': std_time,
+            'sta': actual.get('sta') or '',
+            'crew': '',
+            'atd': actual.get('atd') or '',
+            'ata': actual.get('ata') or '',
+            'status': actual.get('status') or '',
+            'block_minutes': actual.get('block_minutes') or 0,
+            'source': 'AIMS_API',
+            'aims_key': self._aims_flight_key(actual.get('flight_date'), actual.get('flight_no'))
+        }
+    
+    def apply_etl_delta(self, stage, upserted, deleted):
+        """
+        Patch the live indexes with an ETL delta instead of reloading everything
+        
+        Only the operating dates touched by the delta are re-indexed; totals are
+        re-summed from the per-date maps.
+        
+        Args:
+            stage: ETL stage name ('flights' = fact_actuals rows,
+                'leg_members' = fact_leg_members rows)
+            upserted: New/changed rows
+            deleted: Keys removed from the table ((flight_date, flight_no) or
+                (leg_date, flight_no, dep, crew_id))
+            
+        Returns:
+            set: Affected operating dates
+        """
+        if not upserted and not deleted:
+            return set()
+        if stage == 'leg_members':
+            return self._apply_leg_member_delta(upserted, deleted)
+        if stage != 'flights':
+            return set()
+        
+        with self._delta_lock:
+            affected = set()
+            by_key = {}
+            for flight in self.flights:
+                key = flight.get('aims_key') or self._aims_flight_key(
+                    flight.get('calendar_date') or flight.get('date'), flight.get('flt')
+                )
+                by_key[key] = flight
+            
+            deleted_ids = set()
+            for flight_date, flight_no in deleted:
+                flight = by_key.pop(self._aims_flight_key(flight_date, flight_no), None)
+                if flight is not None:
+                    deleted_ids.add(id(flight))
+                    affected.add(flight['date'])
+            
+            new_flights = []
+            replaced = {}  # id(shared flight) -> edited copy
+            fresh = set()  # ids of flight dicts created by this delta (safe to edit)
+            for actual in upserted:
+                new_flight = self._flight_from_actual(actual)
+                existing = by_key.get(new_flight['aims_key'])
+                if existing is None:
+                    by_key[new_flight['aims_key']] = new_flight
+                    new_flights.append(new_flight)
+                    fresh.add(id(new_flight))
+                    affected.add(new_flight['date'])
+                    continue
+                
+                # Same flight already known (e.g. from DayRep): keep its crew, take AIMS values.
+                # Flight dicts are shared with published snapshots - edit a copy.
+                affected.add(existing['date'])
+                if id(existing) not in fresh:
+                    original, existing = existing, dict(existing)
+                    replaced[id(original)] = existing
+                    fresh.add(id(existing))
+                for field in ('reg', 'dep', 'arr', 'std', 'sta', 'atd', 'ata', 'status', 'block_minutes'):
+                    if new_flight[field]:
+                        existing[field] = new_flight[field]
+                existing['aims_key'] = new_flight['aims_key']
+                existing['date'] = self.get_operating_date(existing.get('calendar_date') or existing['date'], existing['std'])
+                by_key[existing['aims_key']] = existing
+                affected.add(existing['date'])
+            
+            # New list objects instead of in-place edits, so readers keep a consistent view
+            flights = [replaced.get(id(f), f) for f in self.flights if id(f) not in deleted_ids] + new_flights
+            grouped = defaultdict(list)
+            for flight in flights:
+                if flight['date'] in affected:
+                    grouped[flight['date']].append(flight)
+            self.flights = flights
+            for date in affected:
+                self.flights_by_date[date] = grouped.get(date, [])
+            
+            self._reindex_dates(affected)
+            return affected
+    
+    def process_leg_members(self, records, replace_dates=None):
+        """
+        Ingest structured leg members (fact_leg_members rows or the legs returned
+        by AIMSSoapClient.fetch_leg_members_per_day) as the crew source of their days
+        
+        crew_to_regs_by_date, crew_roles and crew_group_rotations_by_date are built
+        from these records directly; the DayRep crew string is not parsed for these days.
+        
+        Args:
+            records: fact_leg_members rows, or AIMS legs with a nested 'crew' list
+            replace_dates: Calendar dates (DD/MM/YY) whose existing leg members are
+                dropped first (default: the dates present in `records`)
+            
+        Returns:
+            int: Number of crew assignments ingested
+        """
+        rows = []
+        for record in records:
+            if 'crew' in record and isinstance(record.get('crew'), list):
+                # AIMS client shape: one leg with nested crew
+                for crew in record['crew']:
+                    rows.append({
+                        'leg_date': record.get('date', ''),
+                        'flight_no': record.get('flight_no', ''),
+                        'dep': record.get('dep', ''),
+                        'reg': record.get('reg', ''),
+                        'std': record.get('std', ''),
+                        'crew_id': crew.get('id', ''),
+                        'crew_name': crew.get('name', ''),
+                        'crew_role': crew.get('role', '')
+                    })
+            else:
+                rows.append(record)
+        
+        with self._delta_lock:
+            if replace_dates is None:
+                replace_dates = {row.get('leg_date') for row in rows}
+            wanted = {self.normalize_date(d) for d in replace_dates if d}
+            stale = [
+                (key[0], key[1], key[2], crew_id)
+                for date_legs in self.leg_members_by_date.values()
+                for key, leg in date_legs.items() if key[0] in wanted
+                for crew_id in leg['crew']
+            ]
+            self._apply_leg_member_delta(rows, stale)
+        return len(rows)
+    
+    def _apply_leg_member_delta(self, upserted, deleted):
+        """Patch leg_members_by_date with fact_leg_members changes and re-index their days"""
+        with self._delta_lock:
+            affected = set()
+            copied = set()
+            
+            def editable_leg(date, leg_key, leg):
+                # Leg dicts are shared with published snapshots - edit a copy
+                if leg_key not in copied:
+                    leg = dict(leg, crew=dict(leg['crew']))
+                    self.leg_members_by_date[date][leg_key] = leg
+                    copied.add(leg_key)
+                return leg
+            
+            for leg_date, flight_no, dep, crew_id in deleted:
+                leg_key = self._leg_key(leg_date, flight_no, dep)
+                date = self._leg_dates.get(leg_key)
+                leg = self.leg_members_by_date.get(date, {}).get(leg_key)
+                if leg is None:
+                    continue
+                leg = editable_leg(date, leg_key, leg)
+                leg['crew'].pop(str(crew_id), None)
+                affected.add(date)
+                if not leg['crew']:
+                    del self.leg_members_by_date[date][leg_key]
+                    del self._leg_dates[leg_key]
+            
+            for row in upserted:
+                calendar_date = self._to_short_date(row.get('leg_date', ''))
+                leg_key = self._leg_key(calendar_date, row.get('flight_no', ''), row.get('dep', ''))
+                date = self._leg_dates.get(leg_key)
+                if date is None:
+                    date = self.get_operating_date(calendar_date, row.get('std') or '')
+                    self._leg_dates[leg_key] = date
+                leg = self.leg_members_by_date[date].get(leg_key)
+                if leg is None:
+                    leg = {'reg': '', 'calendar_date': calendar_date, 'crew': {}}
+                    self.leg_members_by_date[date][leg_key] = leg
+                    copied.add(leg_key)
+                else:
+                    leg = editable_leg(date, leg_key, leg)
+                if row.get('reg'):
+                    leg['reg'] = row['reg']
+                crew_id = str(row.get('crew_id') or '').strip()
+                if crew_id:
+                    leg['crew'][crew_id] = ((row.get('crew_role') or '').strip().upper(), row.get('crew_name') or '')
+                    if row.get('crew_name'):
+                        self.crew_name_map.setdefault(crew_id, row['crew_name'])
+                affected.add(date)
+            
+            for date in list(affected):
+                if not self.leg_members_by_date.get(date):
+                    self.leg_members_by_date.pop(date, None)
+            
+            self._reindex_dates(affected)
+            return affected
+    
+    def _leg_key(self, leg_date, flight_no, dep):
+        """A flight number can fly several sectors a day - the departure station tells them apart"""
+        return self._aims_flight_key(self._to_short_date(leg_date), flight_no) + ((dep or '').strip(),)
+    
+    def _flight_leg(self, flight):
+        """AIMS leg members entry of a flight, or None"""
+        leg_key = self._leg_key(flight.get('calendar_date', ''), flight.get('flt', ''), flight.get('dep', ''))
+        return self.leg_members_by_date.get(self._leg_dates.get(leg_key), {}).get(leg_key)
+    
+    def _flight_crew(self, flight, exclude_non_operating=False):
+        """(role, crew_id) pairs of a flight - from its AIMS leg members if known, else the crew string"""
+        leg = self._flight_leg(flight)
+        if leg is None:
+            return self.extract_crew_ids(flight.get('crew', ''), exclude_non_operating)
+        return [
+            (role, crew_id) for crew_id, (role, _) in leg['crew'].items()
+            if not exclude_non_operating or role not in NON_OPERATING_ROLES
+        ]
+    
+    def _to_short_date(self, date_str):
+        """DD/MM/YYYY or DD/MM/YY -> DD/MM/YY"""
+        date_str = self.normalize_date(date_str or '') or ''
+        parts = date_str.split('/')
+        if len(parts) == 3 and len(parts[2]) == 4:
+            return f"{parts[0]}/{parts[1]}/{parts[2][-2:]}"
+        return date_str
+    
+    def _index_leg_crew(self, leg, crew_regs, rotations):
+        """
+        Crew indexes of one AIMS leg - mirrors the DayRep path: operating crew map
+        to the REG, the rotation key is the sorted set of all crew on the leg
+        """
+        reg = leg.get('reg', '')
+        if not reg:
+            return
+        operating = [
+            (role, crew_id) for crew_id, (role, _) in leg['crew'].items()
+            if role not in NON_OPERATING_ROLES
+        ]
+        for role, crew_id in operating:
+            crew_regs[crew_id].add(reg)
+            self.crew_roles[crew_id] = role
+        if operating:
+            rotations[tuple(sorted(leg['crew']))].append(reg)
+    
+    def replace_aims_flights(self, calendar_dates, actuals):
+        """
+        Make the AIMS flights of the given calendar dates match `actuals`
+        (used for cross-process notifications, where only the dates are known)
+        """
+        wanted = set(self.normalize_date(d) for d in calendar_dates)
+        current = set(self._aims_flight_key(a.get('flight_date'), a.get('flight_no')) for a in actuals)
+        deleted = [
+            flight['aims_key'] for flight in self.flights
+            if flight.get('aims_key') and flight['aims_key'][0] in wanted and flight['aims_key'] not in current
+        ]
+        return self.apply_etl_delta('flights', actuals, deleted)
+    
+    def poll_etl_notifications(self, force=False):
+        """
+        Apply ETL deltas announced by other processes (etl_notifications)
+        
+        Throttled to once per NOTIFY_POLL_SECONDS; cheap no-op otherwise.
+        
+        Returns:
+            int: Number of notifications processed
+        """
+        now = time.monotonic()
+        if not force and now - self._last_notify_poll < NOTIFY_POLL_SECONDS:
+            return 0
+        self._last_notify_poll = now
+        
+        if self._notify_cursor is None:
+            self._notify_cursor = datetime.now(timezone.utc).isoformat()
+            return 0
+        return self.apply_etl_notifications(self.pending_etl_notifications())
+    
+    def pending_etl_notifications(self):
+        """
+        etl_notifications rows newer than this dataset (read-only: no state changes)
+        
+        Empty when AIMS is disabled, storage is not connected or the dataset
+        has no notification cursor yet.
+        """
+        if not aims_enabled() or self._notify_cursor is None or not self.db.is_connected():
+            return []
+        return self.db.get_etl_notifications(self._notify_cursor)
+    
+    def apply_etl_notifications(self, notifications):
+        """
+        Apply the deltas announced by pending_etl_notifications rows
+        
+        Rows at or before this dataset's cursor are skipped, so rows read off an
+        older snapshot can be applied to a newer one.
+        
+        Returns:
+            int: Number of notifications processed
+        """
+        cursor = self._notify_cursor or ''
+        notifications = [note for note in notifications if (note.get('created_at') or '') > cursor]
+        if not notifications:
+            return 0
+        self._notify_cursor = notifications[-1].get('created_at') or self._notify_cursor
+        
+        dates = defaultdict(set)
+        for note in notifications:
+            if note.get('origin') == PROCESS_TOKEN:
+                continue  # already pushed in-process
+            dates[note.get('stage')].update(note.get('dates') or [])
+        
+        if dates.get('flights'):
+            flight_dates = sorted(dates['flights'])
+            affected = self.replace_aims_flights(flight_dates, self.db.get_fact_actuals(flight_dates))
+            print(f"Applied ETL flight notifications: {len(affected)} dates refreshed")
+        if dates.get('leg_members'):
+            leg_dates = sorted(dates['leg_members'])
+            self.process_leg_members(self.db.get_fact_leg_members(dates=leg_dates), replace_dates=leg_dates)
+            print(f"Applied ETL leg member notifications: {len(leg_dates)} dates refreshed")
+        return len(notifications)
+    
+    def _reindex_dates(self, dates):
+        """Recompute per-date indexes for `dates`, then the all-dates totals"""
+        for date in dates:
+            flights = self.flights_by_date.get(date, [])
+            legs = self.leg_members_by_date.get(date)
+            if not flights and not legs:
+                for index in (self.flights_by_date, self.reg_flight_hours_by_date, self.reg_flight_count_by_date,
+                              self.crew_to_regs_by_date, self.crew_group_rotations_by_date):
+                    index.pop(date, None)
+                continue
+            
+            hours = defaultdict(float)
+            counts = defaultdict(int)
+            crew_regs = defaultdict(set)
+            rotations = defaultdict(list)
+            for flight in flights:
+                reg = flight.get('reg', '')
+                if not reg:
+                    continue
+                std = self.parse_time(flight.get('std', ''))
+                sta = self.parse_time(flight.get('sta', ''))
+                if std is not None and sta is not None:
+                    duration = sta - std
+                    if duration < 0:
+                        duration += 24 * 60
+                    hours[reg] += duration / 60
+                    counts[reg] += 1
+                
+                # Flights with AIMS leg members take crew from the legs loop below - no string parsing
+                crew_str = flight.get('crew', '') if self._flight_leg(flight) is None else ''
+                if crew_str:
+                    crew_list = self.extract_crew_ids(crew_str, exclude_non_operating=True)
+                    for role, crew_id in crew_list:
+                        crew_regs[crew_id].add(reg)
+                        self.crew_roles[crew_id] = role
+                    if crew_list:
+                        key = self.get_crew_set_key(crew_str)
+                        if key:
+                            rotations[key].append(reg)
+            
+            for leg in (legs or {}).values():
+                self._index_leg_crew(leg, crew_regs, rotations)
+            
+            self.reg_flight_hours_by_date[date] = hours
+            self.reg_flight_count_by_date[date] = counts
+            self.crew_to_regs_by_date[date] = crew_regs
+            self.crew_group_rotations_by_date[date] = rotations
+        
+        # Totals are the sum of the per-date maps
+        reg_flight_hours = defaultdict(float)
+        reg_flight_count = defaultdict(int)
+        crew_to_regs = defaultdict(set)
+        crew_group_rotations = defaultdict(list)
+        for date, hours in self.reg_flight_hours_by_date.items():
+            for reg, value in hours.items():
+                reg_flight_hours[reg] += value
+        for date, counts in self.reg_flight_count_by_date.items():
+            for reg, value in counts.items():
+                reg_flight_count[reg] += value
+        for date, crew_regs in self.crew_to_regs_by_date.items():
+            for crew_id, regs in crew_regs.items():
+                crew_to_regs[crew_id].update(regs)
+        for date, rotations in self.crew_group_rotations_by_date.items():
+            for key, regs in rotations.items():
+                crew_group_rotations[key].extend(regs)
+        
+        self.reg_flight_hours = reg_flight_hours
+        self.reg_flight_count = reg_flight_count
+        self.crew_to_regs = crew_to_regs
+        self.crew_group_rotations = crew_group_rotations
+        self.available_dates = sorted(
+            [d for d, flights in self.flights_by_date.items() if flights],
+            key=lambda d: self._parse_date_for_sort(d)
+        )
+    
     def calculate_rolling_28day_stats(self):
         """
         Calculate rolling 28-day statistics with Alert Matrix
@@ -1812,43 +2510,154 @@ class DataProcessor:
 
 
 
-# Singleton instance for the API
+# Published dataset for the API. Readers take the reference once and keep that
+# snapshot for the whole request without locking; uploads, refreshes and ETL
+# deltas build a fork off to the side and publish it by rebinding _processor.
+# ETL notifications from other processes are polled by a background thread.
 _processor = None
+_publish_lock = threading.Lock()  # serializes writers only
+_dataset_versions = itertools.count(1)  # DataProcessor.version of each published dataset
+_notify_poller = None
 
 def get_processor():
+    """Published dataset snapshot (treat as read-only; write through update_processor)"""
     global _processor
-    if _processor is None:
-        _processor = DataProcessor(Path(__file__).parent)
-        # Load default data
+    processor = _processor
+    if processor is None:
+        with _publish_lock:
+            if _processor is None:
+                processor = DataProcessor(Path(__file__).parent)
+                # Published snapshots are replaced, never patched in place
+                _live_processors.discard(processor)
+                # Load default data
+                try:
+                    if processor.db.is_connected():
+                        print(f"Initial load from {processor.db.name}...")
+                        processor.load_from_storage()
+                    else:
+                        processor.process_reports()
+                except Exception as e:
+                    print(f"Warning: Could not load default data: {e}")
+                if processor._notify_cursor is None:
+                    processor._notify_cursor = datetime.now(timezone.utc).isoformat()
+                processor.version = next(_dataset_versions)
+                _processor = processor
+                _start_notify_poller()
+            processor = _processor
+    return processor
+
+def update_processor(mutate):
+    """
+    Apply a change to the published dataset copy-on-write
+    
+    mutate(draft) runs on a fork of the current snapshot; the draft is published
+    with a single reference swap once it returns. If it raises, nothing is
+    published. Concurrent writers queue; readers are never blocked.
+    
+    Returns:
+        Whatever mutate returns
+    """
+    global _processor
+    get_processor()
+    with _publish_lock:
+        draft = _processor.fork()
+        result = mutate(draft)
+        draft.version = next(_dataset_versions)
+        _processor = draft
+    return result
+
+def _start_notify_poller():
+    """Start the etl_notifications poller once (only when AIMS feeds notifications)"""
+    global _notify_poller
+    if _notify_poller is not None or not aims_enabled():
+        return
+    _notify_poller = threading.Thread(target=_notify_poll_loop, name='etl-notify-poll', daemon=True)
+    _notify_poller.start()
+
+def _notify_poll_loop():
+    while True:
+        time.sleep(NOTIFY_POLL_SECONDS)
         try:
-            if db.is_connected():
-                print("Initial load from Supabase...")
-                _processor.load_from_supabase()
-            else:
-                _processor.process_dayrep_csv()
-                _processor.process_sacutil_csv()
-                _processor.process_rolcrtot_csv()
-                _processor.process_crew_schedule_csv()
+            _poll_published()
         except Exception as e:
-            print(f"Warning: Could not load default data: {e}")
-    return _processor
+            print(f"Warning: Could not apply ETL notifications: {e}")
+
+def _poll_published():
+    """
+    Apply ETL deltas from other processes to the published dataset
+    
+    The query runs without the publish lock; only when rows come back is a
+    fork patched and published through update_processor.
+    
+    Returns:
+        int: Number of notifications applied
+    """
+    notifications = _processor.pending_etl_notifications() if _processor is not None else []
+    if not notifications:
+        return 0
+    return update_processor(lambda draft: draft.apply_etl_notifications(notifications))
+
+def push_etl_delta(stage, upserted, deleted):
+    """
+    Hand an in-process ETL delta to every dataset in this process
+    
+    Standalone processors (live_processors) are patched in place; the published
+    dataset gets it through update_processor.
+    
+    Returns:
+        int: Number of datasets updated
+    """
+    processors = live_processors()
+    for processor in processors:
+        processor.apply_etl_delta(stage, upserted, deleted)
+    if _processor is None:
+        return len(processors)
+    update_processor(lambda draft: draft.apply_etl_delta(stage, upserted, deleted))
+    return len(processors) + 1
 
 def refresh_data():
     """Refresh data from Supabase if available, otherwise from default CSV files"""
-    processor = get_processor()
-    if db.is_connected():
-        print("Refreshing data from Supabase...")
-        processor.load_from_supabase()
-    else:
-        print("Refreshing data from local CSVs...")
-        processor.process_dayrep_csv()
-        processor.process_sacutil_csv()
-        processor.process_rolcrtot_csv()
-        processor.process_crew_schedule_csv()
-    return processor.get_dashboard_data()
+    def reload(draft):
+        if draft.db.is_connected():
+            print(f"Refreshing data from {draft.db.name}...")
+            draft.load_from_storage()
+        else:
+            print("Refreshing data from local CSVs...")
+            draft.process_reports()
+    
+    update_processor(reload)
+    return get_processor().get_dashboard_data()
 
 
 if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Crew dashboard data processor')
+    parser.add_argument('--bulk-dayrep', metavar='PATH',
+                        help='Ingest every DayRep*.csv in a directory or .zip as one dataset')
+    parser.add_argument('--no-sync', action='store_true', help='Do not write to the storage backend')
+    parser.add_argument('--workers', type=int, default=None, help='Parser processes (default: CPU count)')
+    parser.add_argument('--export-snapshot', metavar='DIR', nargs='?', const='',
+                        help='Archive the processed data as Parquet (default dir: SNAPSHOT_DIR or ./snapshots)')
+    args = parser.parse_args()
+    
+    if args.bulk_dayrep:
+        processor = DataProcessor()
+        summary = processor.process_dayrep_bulk(args.bulk_dayrep, sync_db=not args.no_sync,
+                                                max_workers=args.workers)
+        if args.export_snapshot is not None:
+            summary['snapshot'] = processor.export_snapshot(args.export_snapshot or None)
+        print(json.dumps(summary, indent=2))
+        sys.exit(0 if summary['files'] else 1)
+    
+    if args.export_snapshot is not None:
+        processor = DataProcessor()
+        if not processor.flights:
+            # Nothing in storage: archive the reports in uploads/ (or the demo files)
+            processor.process_reports(sync_db=False)
+        print(json.dumps(processor.export_snapshot(args.export_snapshot or None), indent=2))
+        sys.exit(0)
+    
     # Test the processor
     processor = DataProcessor()
     print("Processing DayRepReport...")
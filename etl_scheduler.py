@@ -4,7 +4,15 @@ Chạy job ETL định kỳ để sync dữ liệu từ AIMS vào Supabase
 """
 
 import os
+import json
+import time
+import sys
+import queue
+import hashlib
 import logging
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -15,6 +23,48 @@ logging.basicConfig(
 )
 logger = logging.getLogger('ETLScheduler')
 
+# AIMS operation behind each ETL stage - if the circuit of any stage a run
+# needs is open the run fails fast
+ETL_STAGE_OPERATIONS = {
+    'flights': 'FlightDetailsForPeriod',
+    'crew': 'GetCrewList',
+    'leg_members': 'FetchLegMembersPerDay',
+    'quals': 'FetchCrewQuals',
+}
+ETL_AIMS_OPERATIONS = list(ETL_STAGE_OPERATIONS.values())
+
+# Tiered sync windows: days close to today change most and matter most.
+# 'days' are inclusive offsets from today; None = rest of the optimized window
+# (the past and the far future). Each tier is its own APScheduler job.
+ETL_TIERS = {
+    'near': {
+        'days': (0, 1),
+        'interval_minutes': int(os.getenv('ETL_TIER_NEAR_MINUTES', '5')),
+        'stages': ('flights', 'leg_members')
+    },
+    'week': {
+        'days': (2, 7),
+        'interval_minutes': int(os.getenv('ETL_TIER_WEEK_MINUTES', '60')),
+        'stages': ('flights', 'crew', 'quals')
+    },
+    'rest': {
+        'days': None,
+        'interval_minutes': int(os.getenv('ETL_TIER_REST_MINUTES', '720')),
+        'stages': ('flights',)
+    },
+}
+ALL_STAGES = ('flights', 'crew', 'leg_members', 'quals')
+
+# Cross-process file locking (fcntl on Linux/macOS, msvcrt on Windows)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
 # Try to import APScheduler
 try:
     from apscheduler.schedulers.background import BackgroundScheduler
@@ -25,6 +75,228 @@ except ImportError:
     logger.warning("APScheduler not installed. Run: pip install APScheduler")
 
 
+class ETLRunLock:
+    """
+    Khoá non-blocking đảm bảo chỉ một ETL run của một tier tại một thời điểm
+    
+    Mỗi tier có lock riêng: window của các tier rời nhau nên chạy song song
+    được - run "rest" dài không làm run "near" 5 phút bị bỏ qua.
+    threading.Lock chặn run trùng trong cùng process (scheduler + trigger tay),
+    file lock (flock) chặn giữa các process/worker trên cùng máy. OS tự nhả
+    file lock khi process chết nên không có lock "mồ côi".
+    
+    Supabase chỉ đi qua PostgREST (mỗi request một connection) nên không giữ
+    được pg advisory lock suốt một run - lock file là lựa chọn phù hợp.
+    """
+    
+    def __init__(self, path: str = None, name: str = None):
+        path = path or os.getenv('ETL_LOCK_FILE') or os.path.join(tempfile.gettempdir(), 'aims_etl.lock')
+        if name:
+            # aims_etl.lock -> aims_etl.<name>.lock
+            root, ext = os.path.splitext(path)
+            path = f"{root}.{name}{ext}"
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._file = None
+    
+    def acquire(self) -> bool:
+        """Try to take the lock; False if another run holds it"""
+        if not self._thread_lock.acquire(blocking=False):
+            return False
+        
+        try:
+            lock_file = open(self.path, 'a+')
+        except OSError as e:
+            # Read-only filesystem: fall back to the in-process lock only
+            logger.warning(f"Cannot open ETL lock file {self.path}: {e}")
+            return True
+        
+        try:
+            lock_file.seek(0)
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            elif msvcrt:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            self._thread_lock.release()
+            return False
+        
+        # Holder info for diagnostics only - the OS lock is what matters
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(f"{os.getpid()} {datetime.now().isoformat()}\n")
+        lock_file.flush()
+        self._file = lock_file
+        return True
+    
+    def release(self):
+        if self._file is not None:
+            try:
+                self._file.seek(0)
+                if fcntl:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+                elif msvcrt:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            except OSError as e:
+                logger.warning(f"Error releasing ETL lock: {e}")
+            finally:
+                self._file.close()
+                self._file = None
+        self._thread_lock.release()
+    
+    def holder(self) -> Optional[str]:
+        """'<pid> <start time>' of the last run that took the lock"""
+        try:
+            with open(self.path) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+
+def _date_in_range(value: str, from_date: datetime, to_date: datetime) -> bool:
+    """True if a DD/MM/YY (or DD/MM/YYYY) text date falls within [from_date, to_date]"""
+    for fmt in ('%d/%m/%y', '%d/%m/%Y'):
+        try:
+            day = datetime.strptime(value or '', fmt).date()
+            return from_date.date() <= day <= to_date.date()
+        except ValueError:
+            continue
+    return False
+
+
+class ChangeTracker:
+    """
+    Nhớ content hash của từng record đã ghi thành công, theo key của bảng
+    (vd. (flight_date, flight_no) cho fact_actuals, crew_id cho dim_crew)
+    
+    Hash bỏ qua các cột do ETL tự đóng dấu (synced_at). State nằm trong memory:
+    lần chạy đầu sau khi khởi động process sẽ ghi lại toàn bộ window làm baseline.
+    """
+    
+    IGNORED_FIELDS = ('synced_at',)
+    
+    def __init__(self, key_fields: list):
+        self.key_fields = list(key_fields)
+        self._hashes = {}
+        self._lock = threading.Lock()
+    
+    def key(self, record: dict) -> tuple:
+        return tuple(record.get(k) for k in self.key_fields)
+    
+    def digest(self, record: dict) -> str:
+        content = {k: v for k, v in record.items() if k not in self.IGNORED_FIELDS}
+        payload = json.dumps(content, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+    
+    def get(self, key: tuple) -> Optional[str]:
+        with self._lock:
+            return self._hashes.get(key)
+    
+    def commit(self, entries: list):
+        """Record (key, digest) pairs after their batch was written"""
+        with self._lock:
+            for key, digest in entries:
+                self._hashes[key] = digest
+    
+    def stale_keys(self, seen: set, in_scope=None) -> list:
+        """Known keys not seen in this run (limited to the fetched window)"""
+        with self._lock:
+            return [
+                key for key in self._hashes
+                if key not in seen and (in_scope is None or in_scope(key))
+            ]
+    
+    def forget(self, keys: list):
+        with self._lock:
+            for key in keys:
+                self._hashes.pop(key, None)
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._hashes)
+
+
+class BatchWriter:
+    """
+    Background writer cho một bảng Supabase
+    
+    Stage đẩy từng record vào queue (có giới hạn để tạo backpressure), thread
+    riêng gom thành batch và upsert, nên fetch AIMS và ghi Supabase chạy chồng lên nhau.
+    """
+    
+    _DONE = object()
+    
+    def __init__(
+        self,
+        client,
+        table: str,
+        on_conflict: str,
+        write_fn,
+        batch_size: int = 500,
+        tracker: ChangeTracker = None,
+        collect: bool = False
+    ):
+        self.client = client
+        self.tracker = tracker
+        # Rows written successfully, kept when the stage publishes deltas
+        self.applied = [] if collect else None
+        self.table = table
+        self.on_conflict = on_conflict
+        self.write_fn = write_fn
+        self.batch_size = batch_size
+        self.stats = {'written': 0, 'batches': 0, 'failed_batches': 0, 'write_seconds': 0.0}
+        self._queue = queue.Queue(maxsize=batch_size * 4)
+        self._thread = threading.Thread(target=self._run, name=f'etl-writer-{table}', daemon=True)
+        self._thread.start()
+    
+    def put(self, record: dict, digest: str = None):
+        self._queue.put((record, digest))
+    
+    def close(self) -> dict:
+        """Flush the remaining records and wait for the writer thread"""
+        self._queue.put(self._DONE)
+        self._thread.join()
+        return self.stats
+    
+    def _run(self):
+        batch = []
+        while True:
+            item = self._queue.get()
+            if item is self._DONE:
+                break
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+    
+    def _flush(self, batch: list):
+        if not self.client:
+            return
+        # Postgres rejects an upsert that touches the same key twice - last one wins
+        keys = self.on_conflict.split(',')
+        unique = {tuple(r.get(k) for k in keys): (r, digest) for r, digest in batch}
+        records = [r for r, _ in unique.values()]
+        
+        started = time.perf_counter()
+        ok = self.write_fn(self.client, self.table, records, self.on_conflict)
+        self.stats['write_seconds'] += time.perf_counter() - started
+        self.stats['batches'] += 1
+        if ok:
+            self.stats['written'] += len(records)
+            if self.applied is not None:
+                self.applied.extend(records)
+            # Only rows that actually reached Supabase count as synced
+            if self.tracker is not None:
+                self.tracker.commit([
+                    (key, digest) for key, (_, digest) in unique.items() if digest
+                ])
+        else:
+            self.stats['failed_batches'] += 1
+
+
 class ETLScheduler:
     """
     ETL Scheduler for AIMS Data
@@ -32,20 +304,53 @@ class ETLScheduler:
     - Chạy job định kỳ mỗi 15 phút
     - Tối ưu: chỉ fetch dữ liệu ±30 ngày
     - Sync data vào Supabase staging tables
+    - Các stage (flights, crew, leg members, quals) fetch song song, ghi theo batch
+    - Tiered: hôm nay/ngày mai mỗi 5 phút, tuần tới mỗi giờ, phần còn lại 2 lần/ngày
     """
     
-    def __init__(self, interval_minutes: int = 15):
+    def __init__(
+        self,
+        interval_minutes: int = 15,
+        tiered: bool = None,
+        batch_size: int = 500,
+        leg_member_days_back: int = None,
+        leg_member_days_forward: int = None,
+        leg_member_workers: int = None
+    ):
         """
         Khởi tạo ETL Scheduler
         
         Args:
-            interval_minutes: Khoảng thời gian giữa mỗi lần chạy (default: 15 phút)
+            interval_minutes: Khoảng thời gian giữa mỗi lần chạy khi không chia tier (default: 15 phút)
+            tiered: Chạy theo ETL_TIERS, mỗi tier một job (default: ETL_TIERED=true)
+            batch_size: Số record mỗi lần upsert
+            leg_member_days_back: Số ngày trước hôm nay lấy leg members (default 1)
+            leg_member_days_forward: Số ngày sau hôm nay lấy leg members (default 1)
+            leg_member_workers: Số ngày FetchLegMembersPerDay gọi song song (default 4)
         """
         self.interval_minutes = interval_minutes
+        self.tiered = tiered if tiered is not None else os.getenv('ETL_TIERED', 'true').lower() == 'true'
+        self.batch_size = batch_size
+        self.leg_member_days_back = leg_member_days_back if leg_member_days_back is not None else int(os.getenv('ETL_LEG_MEMBER_DAYS_BACK', '1'))
+        self.leg_member_days_forward = leg_member_days_forward if leg_member_days_forward is not None else int(os.getenv('ETL_LEG_MEMBER_DAYS_FORWARD', '1'))
+        self.leg_member_workers = leg_member_workers or int(os.getenv('ETL_LEG_MEMBER_WORKERS', '4'))
         self.scheduler = None
         self.is_running = False
         self.last_run = None
         self.last_status = None
+        # One lock per tier; a full-window run takes all of them
+        self.run_locks = {name: ETLRunLock(name=name) for name in ETL_TIERS}
+        self.skipped_runs = 0
+        self.last_skipped = None
+        self._history_loaded = False
+        self._persisted_last = None
+        self.tier_status = {
+            name: {'last_run': None, 'last_status': None, 'skipped_runs': 0}
+            for name in ETL_TIERS
+        }
+        # Per-stage content hashes of what is already in Supabase
+        self._trackers = {}
+        self._trackers_lock = threading.Lock()
         
     def _get_aims_client(self):
         """Lazy import AIMS client to avoid circular imports"""
@@ -55,32 +360,87 @@ class ETLScheduler:
             return None
         return get_aims_client()
     
-    def run_etl_job(self) -> dict:
+    def run_etl_job(self, tier: str = None) -> dict:
         """
         Chạy ETL job một lần
         
+        Chỉ một run mỗi tier tại một thời điểm (kể cả giữa các process, qua
+        ETLRunLock của tier); run toàn bộ window giữ lock của mọi tier. Nếu
+        tier đang có run khác thì bỏ qua ngay. Mỗi run được lưu vào etl_log.
+        
+        Args:
+            tier: Tên tier trong ETL_TIERS (None = toàn bộ window, mọi stage)
+        
+        Returns:
+            dict: Job result status ('skipped': True nếu run khác đang chạy)
+        """
+        if tier is not None and tier not in ETL_TIERS:
+            raise ValueError(f"Unknown ETL tier: {tier}")
+        
+        locks = [self.run_locks[tier]] if tier else list(self.run_locks.values())
+        held = []
+        for lock in locks:
+            if not lock.acquire():
+                break
+            held.append(lock)
+        if len(held) < len(locks):
+            for lock in held:
+                lock.release()
+            self.skipped_runs += 1
+            self.last_skipped = datetime.now()
+            if tier:
+                self.tier_status[tier]['skipped_runs'] += 1
+            holder = locks[len(held)].holder()
+            logger.warning(f"ETL run ({tier or 'full'}) skipped, another run is in progress ({holder})")
+            return {
+                'success': False,
+                'skipped': True,
+                'tier': tier,
+                'start_time': self.last_skipped.isoformat(),
+                'errors': [f"Another ETL run is in progress ({holder})"]
+            }
+        
+        try:
+            result = self._execute_etl_run(tier)
+            if tier:
+                self.tier_status[tier]['last_run'] = result['start_time']
+                self.tier_status[tier]['last_status'] = result
+            self._persist_run(result)
+            return result
+        finally:
+            for lock in held:
+                lock.release()
+    
+    def _execute_etl_run(self, tier: str = None) -> dict:
+        """
         Workflow:
-        1. Lấy dữ liệu từ AIMS (±30 ngày)
-        2. Transform và mapping
-        3. Sync vào Supabase staging tables
+        1. Lấy dữ liệu từ AIMS (±30 ngày hoặc window của tier) - các stage chạy song song
+        2. Transform từng record ngay khi nhận được
+        3. Ghi vào Supabase staging tables qua batch writer riêng cho mỗi stage
         
         Returns:
-            dict: Job result status
+            dict: Job result status (kèm thời gian từng stage trong 'stages')
         """
         start_time = datetime.now()
         result = {
             'success': False,
+            'tier': tier,
+            'ranges': [],
             'start_time': start_time.isoformat(),
             'end_time': None,
             'duration_seconds': 0,
             'flights_synced': 0,
             'crew_synced': 0,
+            'leg_members_synced': 0,
+            'quals_synced': 0,
+            'changes': {'inserted': 0, 'changed': 0, 'deleted': 0, 'unchanged': 0},
+            'stages': {},
             'errors': []
         }
         
         try:
             logger.info("=" * 50)
-            logger.info("AIMS ETL Job Started")
+            logger.info(f"AIMS ETL Job Started (tier: {tier or 'full'})")
             logger.info("=" * 50)
             
             # Get AIMS client
@@ -89,37 +449,60 @@ class ETLScheduler:
                 result['errors'].append("AIMS client not available")
                 return result
             
-            # Get optimized date range (±30 days)
-            from_date, to_date = aims_client.get_optimized_date_range()
-            logger.info(f"Fetching data from {from_date.date()} to {to_date.date()}")
-            
-            # 1. Fetch flight details
-            logger.info("Fetching flight details...")
-            flight_result = aims_client.get_flight_details(from_date, to_date)
+            # Fail fast while AIMS is degraded instead of stacking retries
+            from aims_resilience import get_open_circuits
+            stage_names = ETL_TIERS[tier]['stages'] if tier else ALL_STAGES
+            open_circuits = get_open_circuits([ETL_STAGE_OPERATIONS[name] for name in stage_names])
+            if open_circuits:
+                result['errors'].append(f"AIMS degraded, circuit open for: {', '.join(open_circuits)}")
+                logger.warning(f"Skipping ETL run, circuit open for: {open_circuits}")
+                return result
             
-            if flight_result['success']:
-                flights = flight_result['flights']
-                result['flights_synced'] = len(flights)
-                logger.info(f"Fetched {len(flights)} flights")
-                
-                # Sync to Supabase
-                self._sync_flights_to_supabase(flights)
-            else:
-                result['errors'].append(f"Flight fetch error: {flight_result.get('error')}")
+            # Get optimized date range (±30 days), narrowed to the tier's shard
+            from_date, to_date = aims_client.get_optimized_date_range()
+            ranges = self._tier_ranges(tier, from_date, to_date)
+            result['ranges'] = [[start.date().isoformat(), end.date().isoformat()] for start, end in ranges]
+            logger.info(f"Fetching data for {result['ranges']} (window {from_date.date()} to {to_date.date()})")
             
-            # 2. Fetch crew list
-            logger.info("Fetching crew list...")
-            crew_result = aims_client.get_crew_list(from_date, to_date)
+            from supabase_client import get_client, is_connected
+            client = get_client() if is_connected() else None
+            if not client:
+                logger.warning("Supabase not connected, skipping sync")
             
-            if crew_result['success']:
-                crew_list = crew_result['crew_list']
-                result['crew_synced'] = len(crew_list)
-                logger.info(f"Fetched {len(crew_list)} crew members")
-                
-                # Sync to Supabase
-                self._sync_crew_to_supabase(crew_list)
-            else:
-                result['errors'].append(f"Crew fetch error: {crew_result.get('error')}")
+            # Run the AIMS fetches side by side (the shared rate limiter and pooled
+            # transport bound the load on AIMS) and let each stage stream its records
+            # into its own batched writer. A stage with 'after' writes the same table
+            # as another stage and starts only once that one has finished
+            stages = [
+                stage for stage in self._build_stages(aims_client, from_date, to_date, ranges)
+                if stage['name'] in stage_names
+            ]
+            waiting = [stage for stage in stages if stage.get('after') in stage_names]
+            with ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix='etl-stage') as pool:
+                futures = {
+                    pool.submit(self._run_stage, stage, client): stage
+                    for stage in stages if stage not in waiting
+                }
+                while futures:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    future = done.pop()
+                    stage = futures.pop(future)
+                    for dependent in [s for s in waiting if s['after'] == stage['name']]:
+                        waiting.remove(dependent)
+                        futures[pool.submit(self._run_stage, dependent, client)] = dependent
+                    stats = future.result()
+                    result['stages'][stage['name']] = stats
+                    result[f"{stage['name']}_synced"] = stats['fetched']
+                    for change in result['changes']:
+                        result['changes'][change] += stats[change]
+                    if stats['error']:
+                        result['errors'].append(f"{stage['label']} error: {stats['error']}")
+                    logger.info(
+                        f"Stage {stage['name']}: {stats['fetched']} records "
+                        f"(+{stats['inserted']} ~{stats['changed']} -{stats['deleted']}), "
+                        f"fetch {stats['fetch_seconds']:.2f}s, write {stats['write_seconds']:.2f}s, "
+                        f"total {stats['duration_seconds']:.2f}s"
+                    )
             
             # Mark success if no critical errors
             result['success'] = len(result['errors']) == 0
@@ -135,110 +518,414 @@ class ETLScheduler:
             self.last_run = start_time
             self.last_status = result
             
-            logger.info(f"ETL Job completed in {result['duration_seconds']:.2f}s")
-            logger.info(f"Flights: {result['flights_synced']}, Crew: {result['crew_synced']}")
+            logger.info(f"ETL Job ({tier or 'full'}) completed in {result['duration_seconds']:.2f}s")
+            logger.info(
+                f"Flights: {result['flights_synced']}, Crew: {result['crew_synced']}, "
+                f"Leg members: {result['leg_members_synced']}, Quals: {result['quals_synced']}"
+            )
+            logger.info(
+                f"Changes: {result['changes']['inserted']} inserted, {result['changes']['changed']} changed, "
+                f"{result['changes']['deleted']} deleted, {result['changes']['unchanged']} unchanged"
+            )
             
         return result
     
-    def _sync_flights_to_supabase(self, flights: list):
-        """Sync flight data to Supabase fact_actuals table"""
-        if not flights:
-            return
-            
+    def _persist_run(self, result: dict):
+        """Store the run in etl_log so get_etl_logs is the run history"""
         try:
-            # Import supabase client
-            from supabase_client import get_client, is_connected
-            
+            from supabase_client import insert_etl_log, is_connected
             if not is_connected():
-                logger.warning("Supabase not connected, skipping sync")
                 return
             
-            client = get_client()
-            
-            # Transform for Supabase schema
-            records = []
-            for flight in flights:
-                record = {
-                    'flight_date': flight.get('flight_date', ''),
-                    'flight_no': flight.get('flight_no', ''),
-                    'ac_reg': flight.get('ac_reg', ''),
-                    'departure': flight.get('departure', ''),
-                    'arrival': flight.get('arrival', ''),
-                    'std': flight.get('std', ''),
-                    'sta': flight.get('sta', ''),
-                    'atd': flight.get('atd', ''),
-                    'ata': flight.get('ata', ''),
-                    'block_minutes': flight.get('block_minutes', 0),
-                    'status': flight.get('status', ''),
-                    'source': 'AIMS_API',
-                    'synced_at': datetime.now().isoformat()
+            log_data = {
+                'job_name': f"aims_etl:{result['tier']}" if result.get('tier') else 'aims_etl',
+                'start_time': result['start_time'],
+                'end_time': result['end_time'],
+                'duration_seconds': result['duration_seconds'],
+                'flights_synced': result['flights_synced'],
+                'crew_synced': result['crew_synced'],
+                'success': result['success'],
+                'errors': result['errors'],
+                'stats': {
+                    'ranges': result.get('ranges', []),
+                    'leg_members_synced': result['leg_members_synced'],
+                    'quals_synced': result['quals_synced'],
+                    'changes': result['changes'],
+                    'stages': result['stages']
                 }
-                records.append(record)
-            
-            # Upsert to Supabase fact_actuals table
-            if records:
+            }
+            if insert_etl_log(log_data) is None:
+                # etl_log without the stats column (migration not applied yet)
+                log_data.pop('stats')
+                insert_etl_log(log_data)
+        except Exception as e:
+            logger.error(f"Error persisting ETL run: {e}")
+    
+    def get_run_history(self, limit: int = 10) -> list:
+        """Recent runs from etl_log (newest first)"""
+        try:
+            from supabase_client import get_etl_logs
+            return get_etl_logs(limit)
+        except Exception as e:
+            logger.error(f"Error loading ETL history: {e}")
+            return []
+    
+    def _tier_ranges(self, tier: Optional[str], from_date: datetime, to_date: datetime) -> list:
+        """
+        (start, end) day ranges covered by a tier, clipped to the optimized window.
+        The 'rest' tier is everything not covered by the day-offset tiers.
+        """
+        if tier is None:
+            return [(from_date, to_date)]
+        
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        window_start = from_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        window_end = to_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        days = ETL_TIERS[tier]['days']
+        if days is not None:
+            candidates = [(today + timedelta(days=days[0]), today + timedelta(days=days[1]))]
+        else:
+            offsets = [t['days'] for t in ETL_TIERS.values() if t['days'] is not None]
+            first = min(lo for lo, _ in offsets)
+            last = max(hi for _, hi in offsets)
+            candidates = [
+                (window_start, today + timedelta(days=first - 1)),
+                (today + timedelta(days=last + 1), window_end),
+            ]
+        
+        ranges = []
+        for start, end in candidates:
+            start, end = max(start, window_start), min(end, window_end)
+            if start <= end:
+                ranges.append((start, end))
+        return ranges
+    
+    def _build_stages(self, aims_client, from_date: datetime, to_date: datetime, ranges: list) -> list:
+        """
+        Describe the fetch -> transform -> write pipeline of each ETL stage.
+        Flights cover the given day ranges; crew lists always use the full window.
+        """
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        leg_days = [
+            today + timedelta(days=offset)
+            for offset in range(-self.leg_member_days_back, self.leg_member_days_forward + 1)
+        ]
+        
+        return [
+            {
+                'name': 'flights',
+                'label': 'Flight fetch',
+                'fetch': lambda: self._fetch_flights(aims_client, ranges),
+                'transform': self._transform_flight,
+                'table': 'fact_actuals',
+                'on_conflict': 'flight_date,flight_no',
+                'publish': True,
+                # Flights that vanished from the fetched window were cancelled/removed in AIMS
+                'delete_scope': lambda key: any(_date_in_range(key[0], start, end) for start, end in ranges)
+            },
+            {
+                'name': 'crew',
+                'label': 'Crew fetch',
+                'fetch': lambda: self._fetch_result_items(
+                    aims_client.get_crew_list(from_date, to_date), 'crew_list'
+                ),
+                'transform': self._transform_crew,
+                'table': 'dim_crew',
+                'on_conflict': 'crew_id'
+            },
+            {
+                'name': 'leg_members',
+                'label': 'Leg members fetch',
+                'fetch': lambda: self._fetch_leg_members(aims_client, leg_days),
+                'transform': self._transform_leg_member,
+                'table': 'fact_leg_members',
+                'on_conflict': 'leg_date,flight_no,dep,crew_id',
+                'publish': True,
+                'delete_scope': lambda key: _date_in_range(key[0], leg_days[0], leg_days[-1])
+            },
+            {
+                'name': 'quals',
+                'label': 'Crew quals fetch',
+                'fetch': lambda: self._fetch_result_items(aims_client.fetch_crew_quals(0), 'crew'),
+                'transform': self._transform_crew_qual,
+                'table': 'dim_crew',
+                'on_conflict': 'crew_id',
+                # Same dim_crew rows as the crew stage: update them once crew has written
+                'after': 'crew'
+            },
+        ]
+    
+    def _run_stage(self, stage: dict, client) -> dict:
+        """
+        Run one stage: pull items from its fetch iterable, transform them and
+        hand only new/changed records to a BatchWriter that upserts in the background.
+        Keys that disappeared from a complete fetch are deleted (stages with delete_scope).
+        
+        Returns:
+            dict: fetched/written counts, inserted/changed/deleted/unchanged counts
+                and fetch/write/total seconds
+        """
+        stats = {
+            'fetched': 0,
+            'inserted': 0,
+            'changed': 0,
+            'deleted': 0,
+            'unchanged': 0,
+            'written': 0,
+            'batches': 0,
+            'failed_batches': 0,
+            'fetch_seconds': 0.0,
+            'write_seconds': 0.0,
+            'duration_seconds': 0.0,
+            'error': None
+        }
+        started = time.perf_counter()
+        tracker = self._get_tracker(stage)
+        writer = BatchWriter(
+            client, stage['table'], stage['on_conflict'],
+            self._upsert_records, batch_size=self.batch_size, tracker=tracker,
+            collect=stage.get('publish', False)
+        )
+        seen = set()
+        
+        try:
+            fetch_started = time.perf_counter()
+            items = iter(stage['fetch']())
+            stats['fetch_seconds'] += time.perf_counter() - fetch_started
+            while True:
+                # Only time spent waiting on AIMS/parsing counts as fetch time
+                fetch_started = time.perf_counter()
                 try:
-                    client.table('fact_actuals').upsert(
-                        records, 
-                        on_conflict='flight_date,flight_no'
-                    ).execute()
-                    logger.info(f"Synced {len(records)} flight records to Supabase")
-                except Exception as upsert_error:
-                    logger.warning(f"Upsert failed, trying insert: {upsert_error}")
-                    # Fallback to insert if table doesn't support upsert
-                    for batch_start in range(0, len(records), 100):
-                        batch = records[batch_start:batch_start+100]
-                        client.table('fact_actuals').insert(batch).execute()
-            
+                    item = next(items)
+                except StopIteration:
+                    break
+                finally:
+                    stats['fetch_seconds'] += time.perf_counter() - fetch_started
+                stats['fetched'] += 1
+                
+                record = stage['transform'](item)
+                key = tracker.key(record)
+                digest = tracker.digest(record)
+                seen.add(key)
+                previous = tracker.get(key)
+                if previous == digest:
+                    stats['unchanged'] += 1
+                    continue
+                stats['inserted' if previous is None else 'changed'] += 1
+                writer.put(record, digest)
         except Exception as e:
-            logger.error(f"Error syncing flights to Supabase: {e}")
+            logger.error(f"Stage {stage['name']} failed: {e}")
+            stats['error'] = str(e)
+        finally:
+            stats.update(writer.close())
+        
+        # A partial fetch says nothing about missing rows - only diff deletes on success
+        deleted = []
+        if client and not stats['error'] and stage.get('delete_scope'):
+            stale = tracker.stale_keys(seen, stage['delete_scope'])
+            if stale:
+                delete_started = time.perf_counter()
+                if self._delete_records(client, stage['table'], tracker.key_fields, stale):
+                    tracker.forget(stale)
+                    stats['deleted'] = len(stale)
+                    deleted = stale
+                stats['write_seconds'] += time.perf_counter() - delete_started
+        
+        if stage.get('publish'):
+            self._publish_delta(stage['name'], tracker.key_fields[0], writer.applied, deleted, client)
+        stats['duration_seconds'] = time.perf_counter() - started
+        
+        for key in ('fetch_seconds', 'write_seconds', 'duration_seconds'):
+            stats[key] = round(stats[key], 3)
+        return stats
     
-    def _sync_crew_to_supabase(self, crew_list: list):
-        """Sync crew data to Supabase dim_crew table"""
-        if not crew_list:
+    def _publish_delta(self, stage_name: str, date_field: str, upserted: list, deleted: list, client):
+        """
+        Hand a stage's delta to the dashboard without a full reload:
+        - same process: the published dataset is swapped for a patched copy,
+          other live DataProcessors are patched directly
+        - other processes: one etl_notifications row with the affected dates
+        """
+        if not upserted and not deleted:
             return
-            
-        try:
-            from supabase_client import get_client, is_connected
-            
-            if not is_connected():
-                logger.warning("Supabase not connected, skipping sync")
-                return
-            
-            client = get_client()
-            
-            # Transform for Supabase schema
-            records = []
-            for crew in crew_list:
-                record = {
-                    'crew_id': crew.get('crew_id', ''),
-                    'name': crew.get('name', ''),
-                    'short_name': crew.get('short_name', ''),
-                    'qualifications': crew.get('qualifications', ''),
-                    'email': crew.get('email', ''),
-                    'location': crew.get('location', ''),
-                    'source': 'AIMS_API',
-                    'synced_at': datetime.now().isoformat()
-                }
-                records.append(record)
-            
-            # Upsert to Supabase dim_crew table
-            if records:
+        
+        origin = None
+        data_processor = sys.modules.get('data_processor')
+        if data_processor is not None:
+            try:
+                if data_processor.push_etl_delta(stage_name, upserted, deleted):
+                    origin = data_processor.PROCESS_TOKEN
+            except Exception as e:
+                logger.error(f"Error pushing {stage_name} delta to processor: {e}")
+        
+        if client:
+            from supabase_client import insert_etl_notification
+            dates = {r.get(date_field) for r in upserted} | {key[0] for key in deleted}
+            insert_etl_notification({
+                'stage': stage_name,
+                'dates': sorted(d for d in dates if d),
+                'upserted': len(upserted),
+                'deleted': len(deleted),
+                'origin': origin
+            })
+    
+    def _get_tracker(self, stage: dict) -> ChangeTracker:
+        # Tiers run concurrently and share the trackers of their common stages
+        with self._trackers_lock:
+            tracker = self._trackers.get(stage['name'])
+            if tracker is None:
+                tracker = ChangeTracker(stage['on_conflict'].split(','))
+                self._trackers[stage['name']] = tracker
+            return tracker
+    
+    def _fetch_flights(self, aims_client, ranges: list):
+        """Flight source: streamed parse when enabled, otherwise the zeep result list"""
+        for from_date, to_date in ranges:
+            if getattr(aims_client, 'stream_flights', False):
+                # Raw-response mode: records reach the writer while AIMS is still sending
+                response = aims_client.get_flight_details_stream(from_date, to_date)
+            else:
+                response = aims_client.get_flight_details(from_date, to_date)
+            yield from self._fetch_result_items(response, 'flights')
+    
+    def _fetch_result_items(self, response: dict, key: str) -> list:
+        """Unwrap a {'success', 'error', key: [...]} AIMS client result"""
+        if not response.get('success'):
+            raise RuntimeError(response.get('error') or 'unknown error')
+        return response.get(key) or []
+    
+    def _fetch_leg_members(self, aims_client, days: list):
+        """
+        Yield (leg, crew) pairs for each day; days are fetched concurrently and
+        yielded as soon as each one completes. A failed day does not stop the others.
+        """
+        failed = []
+        with ThreadPoolExecutor(max_workers=self.leg_member_workers, thread_name_prefix='etl-legs') as pool:
+            futures = {pool.submit(aims_client.fetch_leg_members_per_day, day): day for day in days}
+            for future in as_completed(futures):
+                day = futures[future]
                 try:
-                    client.table('dim_crew').upsert(
-                        records, 
-                        on_conflict='crew_id'
-                    ).execute()
-                    logger.info(f"Synced {len(records)} crew records to Supabase")
-                except Exception as upsert_error:
-                    logger.warning(f"Upsert failed, trying insert: {upsert_error}")
-                    # Fallback to insert if table doesn't support upsert
-                    for batch_start in range(0, len(records), 100):
-                        batch = records[batch_start:batch_start+100]
-                        client.table('dim_crew').insert(batch).execute()
-            
+                    response = future.result()
+                    legs = self._fetch_result_items(response, 'legs')
+                except Exception as e:
+                    failed.append(f"{day.strftime('%d/%m/%Y')}: {e}")
+                    continue
+                for leg in legs:
+                    for crew in leg.get('crew', []):
+                        yield leg, crew
+        
+        if failed:
+            raise RuntimeError(f"{len(failed)}/{len(days)} days failed ({'; '.join(failed)})")
+    
+    @staticmethod
+    def _transform_flight(flight: dict) -> dict:
+        """Map an AIMS flight to a fact_actuals row"""
+        return {
+            'flight_date': flight.get('flight_date', ''),
+            'flight_no': flight.get('flight_no', ''),
+            'ac_reg': flight.get('ac_reg', ''),
+            'departure': flight.get('departure', ''),
+            'arrival': flight.get('arrival', ''),
+            'std': flight.get('std', ''),
+            'sta': flight.get('sta', ''),
+            'atd': flight.get('atd', ''),
+            'ata': flight.get('ata', ''),
+            'block_minutes': flight.get('block_minutes', 0),
+            'status': flight.get('status', ''),
+            'source': 'AIMS_API',
+            'synced_at': datetime.now().isoformat()
+        }
+    
+    @staticmethod
+    def _transform_crew(crew: dict) -> dict:
+        """Map an AIMS crew member to a dim_crew row (qualifications come from the quals stage)"""
+        return {
+            'crew_id': crew.get('crew_id', ''),
+            'name': crew.get('name', ''),
+            'short_name': crew.get('short_name', ''),
+            'email': crew.get('email', ''),
+            'location': crew.get('location', ''),
+            'source': 'AIMS_API',
+            'synced_at': datetime.now().isoformat()
+        }
+    
+    @staticmethod
+    def _transform_crew_qual(crew: dict) -> dict:
+        """
+        FetchCrewQuals owns the qualifications column of dim_crew (the crew stage
+        leaves it alone); name is carried so crew missing from GetCrewList are not nameless
+        """
+        return {
+            'crew_id': crew.get('crew_id', ''),
+            'name': crew.get('name', ''),
+            'qualifications': crew.get('qualifications', ''),
+            'source': 'AIMS_API',
+            'synced_at': datetime.now().isoformat()
+        }
+    
+    @staticmethod
+    def _transform_leg_member(item: tuple) -> dict:
+        """Map one (leg, crew) pair to a fact_leg_members row"""
+        leg, crew = item
+        leg_date = leg.get('date', '')
+        try:
+            # Same DD/MM/YY text as flights.date / fact_actuals
+            leg_date = datetime.strptime(leg_date, '%d/%m/%Y').strftime('%d/%m/%y')
+        except ValueError:
+            pass
+        return {
+            'leg_date': leg_date,
+            'flight_no': leg.get('flight_no', ''),
+            'reg': leg.get('reg', ''),
+            'dep': leg.get('dep', ''),
+            'arr': leg.get('arr', ''),
+            'std': leg.get('std', ''),
+            'sta': leg.get('sta', ''),
+            'crew_id': crew.get('id', ''),
+            'crew_name': crew.get('name', ''),
+            'crew_role': crew.get('role', ''),
+            'source': 'AIMS_API',
+            'synced_at': datetime.now().isoformat()
+        }
+    
+    def _upsert_records(self, client, table: str, records: list, on_conflict: str) -> bool:
+        """Upsert one batch, falling back to plain inserts"""
+        try:
+            try:
+                client.table(table).upsert(
+                    records, 
+                    on_conflict=on_conflict
+                ).execute()
+            except Exception as upsert_error:
+                logger.warning(f"Upsert failed, trying insert: {upsert_error}")
+                # Fallback to insert if table doesn't support upsert
+                for batch_start in range(0, len(records), 100):
+                    batch = records[batch_start:batch_start+100]
+                    client.table(table).insert(batch).execute()
+            return True
         except Exception as e:
-            logger.error(f"Error syncing crew to Supabase: {e}")
+            logger.error(f"Error syncing {table} to Supabase: {e}")
+            return False
+    
+    def _delete_records(self, client, table: str, key_fields: list, keys: list) -> bool:
+        """Delete rows by composite key, one request per leading-key group"""
+        groups = {}
+        for key in keys:
+            groups.setdefault(key[:-1], []).append(key[-1])
+        
+        try:
+            for prefix, last_values in groups.items():
+                for batch_start in range(0, len(last_values), 100):
+                    query = client.table(table).delete()
+                    for field, value in zip(key_fields[:-1], prefix):
+                        query = query.eq(field, value)
+                    query.in_(key_fields[-1], last_values[batch_start:batch_start+100]).execute()
+            logger.info(f"Deleted {len(keys)} stale rows from {table}")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting stale {table} rows: {e}")
+            return False
     
     def start(self):
         """Start the scheduler with background jobs"""
@@ -252,18 +939,45 @@ class ETLScheduler:
         
         self.scheduler = BackgroundScheduler()
         
-        # Add job to run every interval_minutes
-        self.scheduler.add_job(
-            self.run_etl_job,
-            trigger=IntervalTrigger(minutes=self.interval_minutes),
-            id='aims_etl_job',
-            name='AIMS ETL Sync Job',
-            replace_existing=True
-        )
+        # - max_instances=1: a slow run never overlaps the next trigger
+        # - coalesce: triggers missed while busy/asleep collapse into one run
+        # - misfire_grace_time: a late trigger still runs within one interval
+        if self.tiered:
+            now = datetime.now()
+            for index, (name, tier) in enumerate(ETL_TIERS.items()):
+                # First run of every tier right after start, staggered so they do not collide on the lock
+                self.scheduler.add_job(
+                    self.run_etl_job,
+                    trigger=IntervalTrigger(minutes=tier['interval_minutes']),
+                    args=[name],
+                    id=f'aims_etl_{name}',
+                    name=f'AIMS ETL Sync Job ({name})',
+                    replace_existing=True,
+                    max_instances=1,
+                    coalesce=True,
+                    misfire_grace_time=tier['interval_minutes'] * 60,
+                    next_run_time=now + timedelta(minutes=index * 2)
+                )
+        else:
+            # Add job to run every interval_minutes
+            self.scheduler.add_job(
+                self.run_etl_job,
+                trigger=IntervalTrigger(minutes=self.interval_minutes),
+                id='aims_etl_job',
+                name='AIMS ETL Sync Job',
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+                misfire_grace_time=self.interval_minutes * 60
+            )
         
         self.scheduler.start()
         self.is_running = True
-        logger.info(f"ETL Scheduler started. Running every {self.interval_minutes} minutes.")
+        if self.tiered:
+            intervals = ', '.join(f"{name} every {tier['interval_minutes']}m" for name, tier in ETL_TIERS.items())
+            logger.info(f"ETL Scheduler started. Tiers: {intervals}.")
+        else:
+            logger.info(f"ETL Scheduler started. Running every {self.interval_minutes} minutes.")
         
         return True
     
@@ -276,12 +990,53 @@ class ETLScheduler:
     
     def get_status(self) -> dict:
         """Get current scheduler status"""
+        last_run = self.last_run.isoformat() if self.last_run else None
+        last_status = self.last_status
+        
+        # After a restart, fall back to the last persisted run
+        if last_status is None and not self._history_loaded:
+            self._history_loaded = True
+            history = self.get_run_history(1)
+            if history:
+                self._persisted_last = history[0]
+        if last_status is None and self._persisted_last:
+            last_status = self._persisted_last
+            last_run = last_status.get('start_time')
+        
         return {
             'is_running': self.is_running,
             'interval_minutes': self.interval_minutes,
-            'last_run': self.last_run.isoformat() if self.last_run else None,
-            'last_status': self.last_status
+            'tiered': self.tiered,
+            'tiers': self._get_tier_status() if self.tiered else {},
+            'last_run': last_run,
+            'last_status': last_status,
+            'skipped_runs': self.skipped_runs,
+            'last_skipped': self.last_skipped.isoformat() if self.last_skipped else None,
+            'lock_files': {name: lock.path for name, lock in self.run_locks.items()}
         }
+    
+    def _get_tier_status(self) -> dict:
+        """Per-tier schedule and outcome of the latest run"""
+        tiers = {}
+        for name, tier in ETL_TIERS.items():
+            status = self.tier_status[name]
+            last = status['last_status'] or {}
+            job = self.scheduler.get_job(f'aims_etl_{name}') if self.scheduler and self.is_running else None
+            next_run = getattr(job, 'next_run_time', None)
+            tiers[name] = {
+                'interval_minutes': tier['interval_minutes'],
+                'days': tier['days'],
+                'stages': list(tier['stages']),
+                'next_run': next_run.isoformat() if next_run else None,
+                'last_run': status['last_run'],
+                'success': last.get('success'),
+                'duration_seconds': last.get('duration_seconds'),
+                'ranges': last.get('ranges'),
+                'changes': last.get('changes'),
+                'errors': last.get('errors'),
+                'skipped_runs': status['skipped_runs']
+            }
+        return tiers
 
 
 # Singleton instance
@@ -298,8 +1053,6 @@ def get_scheduler() -> ETLScheduler:
 
 # CLI for testing
 if __name__ == '__main__':
-    import sys
-    
     print("=" * 60)
     print("AIMS ETL Scheduler")
     print("=" * 60)
@@ -307,14 +1060,33 @@ if __name__ == '__main__':
     scheduler = get_scheduler()
     
     if '--run-once' in sys.argv:
-        print("\nRunning ETL job once...")
-        result = scheduler.run_etl_job()
+        tier = sys.argv[sys.argv.index('--tier') + 1] if '--tier' in sys.argv else None
+        print(f"\nRunning ETL job once ({tier or 'full window'})...")
+        result = scheduler.run_etl_job(tier)
+        
+        if result.get('skipped'):
+            print(f"\nSkipped: {result['errors'][0]}")
+            sys.exit(2)
         
         print(f"\nJob completed:")
         print(f"  Success: {result['success']}")
         print(f"  Duration: {result['duration_seconds']:.2f}s")
         print(f"  Flights synced: {result['flights_synced']}")
         print(f"  Crew synced: {result['crew_synced']}")
+        print(f"  Leg members synced: {result['leg_members_synced']}")
+        print(f"  Quals synced: {result['quals_synced']}")
+        print(
+            f"  Changes: +{result['changes']['inserted']} ~{result['changes']['changed']} "
+            f"-{result['changes']['deleted']} ={result['changes']['unchanged']}"
+        )
+        
+        if result['stages']:
+            print(f"  Stages:")
+            for name, stats in result['stages'].items():
+                print(
+                    f"    - {name}: {stats['fetched']} records, fetch {stats['fetch_seconds']:.2f}s, "
+                    f"write {stats['write_seconds']:.2f}s, total {stats['duration_seconds']:.2f}s"
+                )
         
         if result['errors']:
             print(f"  Errors:")
@@ -330,7 +1102,6 @@ if __name__ == '__main__':
         print("Scheduler running. Press Ctrl+C to stop.")
         try:
             # Keep main thread alive
-            import time
             while True:
                 time.sleep(60)
         except KeyboardInterrupt:
@@ -340,4 +1111,5 @@ if __name__ == '__main__':
     else:
         print("\nUsage:")
         print("  python etl_scheduler.py --run-once  # Run ETL job once")
+        print("  python etl_scheduler.py --run-once --tier near  # Run one tier (near/week/rest)")
         print("  python etl_scheduler.py --start     # Start background scheduler")
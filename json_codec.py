@@ -0,0 +1,167 @@
+"""
+JSON Codec Module
+Serializer dùng chung cho export, JSON API và dữ liệu nhúng trong template:
+orjson khi có cài (nhanh hơn nhiều lần stdlib), output compact cho máy đọc,
+và encode từng phần (streaming) cho các list lớn như compliance_28d_all
+
+Environment:
+    JSON_BACKEND: 'auto' (default: orjson if installed), 'orjson' or 'stdlib'
+"""
+
+import json
+import os
+from datetime import date, datetime
+from typing import Any, Iterator
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Lists longer than this are encoded in batches of this many items by iter_encode
+STREAM_CHUNK_ITEMS = 500
+
+
+def _default(obj):
+    """Types the dashboard payload may carry besides plain JSON"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _select_backend() -> str:
+    backend = os.getenv('JSON_BACKEND', 'auto').lower()
+    if backend == 'auto':
+        return 'orjson' if ORJSON_AVAILABLE else 'stdlib'
+    if backend == 'orjson' and not ORJSON_AVAILABLE:
+        raise ImportError("orjson not installed. Run: pip install orjson")
+    if backend not in ('orjson', 'stdlib'):
+        raise ValueError(f"Unknown JSON_BACKEND: {backend} (expected 'auto', 'orjson' or 'stdlib')")
+    return backend
+
+
+BACKEND = _select_backend()
+
+
+def dumpb(obj: Any, pretty: bool = False, sort_keys: bool = False) -> bytes:
+    """
+    Encode to UTF-8 JSON bytes
+
+    Args:
+        pretty: 2-space indented output (exports meant for people); compact otherwise
+        sort_keys: Sort object keys (stable output for diffs and caches)
+    """
+    if BACKEND == 'orjson':
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option)
+    return dumps(obj, pretty=pretty, sort_keys=sort_keys).encode('utf-8')
+
+
+def dumps(obj: Any, pretty: bool = False, sort_keys: bool = False) -> str:
+    """Encode to a JSON string (see dumpb)"""
+    if BACKEND == 'orjson':
+        return dumpb(obj, pretty=pretty, sort_keys=sort_keys).decode('utf-8')
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False, sort_keys=sort_keys, default=_default)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, sort_keys=sort_keys, default=_default)
+
+
+def loads(data):
+    """Decode JSON from str or bytes"""
+    if BACKEND == 'orjson':
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def iter_encode(obj: Any, chunk_items: int = STREAM_CHUNK_ITEMS) -> Iterator[bytes]:
+    """
+    Yield the compact encoding of obj in pieces
+
+    Objects are walked key by key and long lists are encoded chunk_items
+    elements per call, so a response or file can start going out before
+    the whole payload is encoded and no single buffer holds all of it.
+    Joined, the pieces equal dumpb(obj).
+    """
+    if isinstance(obj, dict):
+        yield b'{'
+        for i, (key, value) in enumerate(obj.items()):
+            # Encoded as a one-key object so non-str keys convert like dumpb does
+            key_bytes = dumpb(key) if isinstance(key, str) else dumpb({key: None})[1:-len(b':null}')]
+            yield (b',' if i else b'') + key_bytes + b':'
+            yield from iter_encode(value, chunk_items)
+        yield b'}'
+    elif isinstance(obj, list) and len(obj) > chunk_items:
+        yield b'['
+        for start in range(0, len(obj), chunk_items):
+            # Encode the batch as a list and drop its brackets
+            batch = dumpb(obj[start:start + chunk_items])[1:-1]
+            yield (b',' if start else b'') + batch
+        yield b']'
+    else:
+        yield dumpb(obj)
+
+
+def install_flask_json(app):
+    """
+    Route Flask's JSON (jsonify, dict returns and the tojson template
+    filter) through this codec; responses are compact
+    """
+    from flask.json.provider import JSONProvider
+
+    class CodecJSONProvider(JSONProvider):
+        def dumps(self, obj, **kwargs):
+            return dumps(obj, sort_keys=kwargs.get('sort_keys', False))
+
+        def loads(self, s, **kwargs):
+            return loads(s)
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(dumpb(obj), mimetype='application/json')
+
+    app.json = CodecJSONProvider(app)
+    # The tojson filter binds the provider's dumps when the Jinja env is built
+    app.jinja_env.policies['json.dumps_function'] = app.json.dumps
+    return app
+
+
+if __name__ == '__main__':
+    # Benchmark the backends on a payload: python json_codec.py [dashboard_data.json]
+    import sys
+    import time
+
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'rb') as f:
+            payload = json.loads(f.read())
+    else:
+        from data_processor import DataProcessor
+        payload = DataProcessor().calculate_metrics()
+
+    def best_of(fn, repeat=20):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings) * 1000
+
+    rows = [
+        ('stdlib indent=2', lambda: json.dumps(payload, indent=2, ensure_ascii=False)),
+        ('stdlib compact', lambda: json.dumps(payload, separators=(',', ':'), ensure_ascii=False)),
+    ]
+    if ORJSON_AVAILABLE:
+        rows += [
+            ('orjson indent=2', lambda: orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2)),
+            ('orjson compact', lambda: orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)),
+        ]
+    rows.append((f'{BACKEND} streamed', lambda: b''.join(iter_encode(payload))))
+    for label, fn in rows:
+        size = len(fn() if not label.startswith('stdlib') else fn().encode('utf-8'))
+        print(f"{label:18} {best_of(fn):8.2f} ms {size:>10,} bytes")
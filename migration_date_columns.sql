@@ -0,0 +1,58 @@
+-- =====================================================
+-- MIGRATION: Native DATE columns for range filters
+-- Adds generated DATE columns next to the DD/MM/YY text columns
+-- (text columns stay for compatibility) plus composite indexes
+-- Run this SQL in Supabase SQL Editor, then re-run supabase_views.sql
+-- =====================================================
+
+-- Text dates (DD/MM/YY, DD/MM/YYYY or YYYY-MM-DD) -> DATE, NULL if unparseable
+CREATE OR REPLACE FUNCTION parse_dashboard_date(t TEXT)
+RETURNS DATE
+LANGUAGE plpgsql
+IMMUTABLE
+AS $$
+DECLARE
+    m TEXT[];
+BEGIN
+    m := regexp_match(trim(t), '^(\d{1,2})/(\d{1,2})/(\d{2}|\d{4})$');
+    IF m IS NOT NULL THEN
+        RETURN make_date(
+            CASE WHEN length(m[3]) = 2 THEN 2000 + m[3]::INTEGER ELSE m[3]::INTEGER END,
+            m[2]::INTEGER,
+            m[1]::INTEGER
+        );
+    END IF;
+    m := regexp_match(trim(t), '^(\d{4})-(\d{2})-(\d{2})');
+    IF m IS NOT NULL THEN
+        RETURN make_date(m[1]::INTEGER, m[2]::INTEGER, m[3]::INTEGER);
+    END IF;
+    RETURN NULL;
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END
+$$;
+
+-- Generated columns are filled for existing rows when added
+ALTER TABLE flights
+ADD COLUMN IF NOT EXISTS op_date DATE GENERATED ALWAYS AS (parse_dashboard_date(date)) STORED;
+
+ALTER TABLE ac_utilization
+ADD COLUMN IF NOT EXISTS util_date DATE GENERATED ALWAYS AS (parse_dashboard_date(date)) STORED;
+
+ALTER TABLE standby_records
+ADD COLUMN IF NOT EXISTS start_day DATE GENERATED ALWAYS AS (parse_dashboard_date(start_date)) STORED;
+
+ALTER TABLE standby_records
+ADD COLUMN IF NOT EXISTS end_day DATE GENERATED ALWAYS AS (parse_dashboard_date(end_date)) STORED;
+
+-- Composite indexes for date + key lookups and range predicates
+CREATE INDEX IF NOT EXISTS idx_flights_op_date_reg ON flights(op_date, reg);
+CREATE INDEX IF NOT EXISTS idx_ac_util_date_type ON ac_utilization(util_date, ac_type);
+CREATE INDEX IF NOT EXISTS idx_standby_day_range ON standby_records(start_day, end_day);
+
+-- Verify columns added
+SELECT table_name, column_name, data_type
+FROM information_schema.columns
+WHERE table_name IN ('flights', 'ac_utilization', 'standby_records')
+AND data_type = 'date'
+ORDER BY table_name, ordinal_position;
@@ -0,0 +1,15 @@
+-- =====================================================
+-- MIGRATION: Add stats column to etl_log
+-- Stores per-stage timings and change counts of each ETL run
+-- Run this SQL in Supabase SQL Editor to add missing columns
+-- =====================================================
+
+-- Add stats column if not exists
+ALTER TABLE etl_log 
+ADD COLUMN IF NOT EXISTS stats JSONB;
+
+-- Verify columns added
+SELECT column_name, data_type 
+FROM information_schema.columns 
+WHERE table_name = 'etl_log'
+ORDER BY ordinal_position;
@@ -0,0 +1,32 @@
+-- =====================================================
+-- MIGRATION: ETL change notifications
+-- ETL writes one row per stage delta; dashboard processes poll it and
+-- patch only the affected dates instead of reloading every table
+-- Run this SQL in Supabase SQL Editor
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS etl_notifications (
+    id BIGSERIAL PRIMARY KEY,
+    stage TEXT NOT NULL,
+    dates JSONB,
+    upserted INTEGER DEFAULT 0,
+    deleted INTEGER DEFAULT 0,
+    origin TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_etl_notifications_time ON etl_notifications(created_at);
+
+ALTER TABLE etl_notifications ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Allow all etl_notifications" ON etl_notifications;
+CREATE POLICY "Allow all etl_notifications" ON etl_notifications FOR ALL USING (true) WITH CHECK (true);
+
+-- Old notifications are only needed for a few minutes; prune periodically:
+-- DELETE FROM etl_notifications WHERE created_at < NOW() - INTERVAL '1 day';
+
+-- Verify table created
+SELECT column_name, data_type 
+FROM information_schema.columns 
+WHERE table_name = 'etl_notifications'
+ORDER BY ordinal_position;
@@ -0,0 +1,31 @@
+-- =====================================================
+-- MIGRATION: Unique key for fact_leg_members
+-- ETL now upserts leg members every run (on_conflict leg_date,flight_no,dep,crew_id)
+-- Run this SQL in Supabase SQL Editor before enabling the leg members stage
+-- =====================================================
+
+-- Remove duplicates left by earlier plain inserts (keep the latest sync)
+DELETE FROM fact_leg_members a
+USING fact_leg_members b
+WHERE a.leg_date = b.leg_date
+  AND a.flight_no IS NOT DISTINCT FROM b.flight_no
+  AND a.dep IS NOT DISTINCT FROM b.dep
+  AND a.crew_id IS NOT DISTINCT FROM b.crew_id
+  AND (a.synced_at, a.id) < (b.synced_at, b.id);
+
+-- Add unique constraint used by the upsert
+-- (dep included: one flight number can fly several sectors a day)
+ALTER TABLE fact_leg_members
+DROP CONSTRAINT IF EXISTS fact_leg_members_leg_date_flight_no_crew_id_key;
+
+ALTER TABLE fact_leg_members
+DROP CONSTRAINT IF EXISTS fact_leg_members_leg_date_flight_no_dep_crew_id_key;
+
+ALTER TABLE fact_leg_members
+ADD CONSTRAINT fact_leg_members_leg_date_flight_no_dep_crew_id_key
+UNIQUE (leg_date, flight_no, dep, crew_id);
+
+-- Verify constraint added
+SELECT conname
+FROM pg_constraint
+WHERE conrelid = 'fact_leg_members'::regclass;
@@ -0,0 +1,351 @@
+"""
+Report Formats Module
+Registry khai báo định dạng các báo cáo AIMS (DayRep, Sacutil, RolCrTot,
+Crew schedule): header signature + column pattern được compile một lần,
+parser chỉ nhận col_map đã resolve thay vì tự dò header từng file
+"""
+
+import re
+from itertools import compress, islice
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Report date / period patterns shared by the parsers
+YEAR_PATTERN = re.compile(r'20(\d{2})')
+TEXT_DATE_PATTERN = re.compile(r'(\d{1,2})\s+([A-Za-z]{3})\s+(\d{4})')      # 15 Jan 2026
+DASH_DATE_PATTERN = re.compile(r'(\d{1,2})-([A-Za-z]{3})-(\d{4})')          # 15-Jan-2026
+SLASH_DATE_PATTERN = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{2,4})')           # 15/01/2026
+PERIOD_PATTERN = re.compile(r'Period.*(\d{1,2})/(\d{1,2})/(\d{4})')
+FILENAME_DATE_PATTERN = re.compile(r'(\d{1,2})([A-Za-z]{3})')               # 15Jan
+
+
+def normalize_header(cell) -> str:
+    """Lower-case header cell with inner whitespace/newlines collapsed"""
+    return ' '.join(str(cell).split()).lower()
+
+
+def hhmm_to_minutes(time_str: str) -> int:
+    """'HH:MM' (hours may exceed 24) -> minutes, 0 if unparseable"""
+    try:
+        if ':' in time_str:
+            h, m = time_str.split(':')
+            return int(h) * 60 + int(m)
+        return 0
+    except (ValueError, TypeError):
+        return 0
+
+
+def hhmm_to_hours(time_str: str) -> float:
+    """'HH:MM' -> decimal hours, 0.0 if unparseable"""
+    try:
+        if ':' in time_str:
+            h, m = time_str.split(':')
+            return float(h) + float(m) / 60
+        return 0.0
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def minutes_to_hhmm(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def to_int(value) -> int:
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return 0
+
+
+# Matrix duty cells -> status, checked in this order ('OSBY' contains 'SBY', 'CSL' contains 'SL')
+DUTY_STATUSES = ('OSBY', 'SBY', 'CSL', 'SL')
+
+
+def classify_duty_code(cell: str) -> Optional[str]:
+    """Tracked status of one matrix cell, None if the duty is not tracked"""
+    code = cell.strip().upper()
+    return next((s for s in DUTY_STATUSES if s in code), None)
+
+
+def classify_duty_column(codes: Dict[str, Optional[str]], column: Sequence[str]) -> List[Optional[str]]:
+    """
+    Statuses for a whole day column at once
+
+    Only codes not yet in the lookup table are classified (a roster has a
+    few dozen distinct codes); the column is then mapped through the table.
+    """
+    for cell in set(column).difference(codes):
+        codes[cell] = classify_duty_code(cell)
+    return list(map(codes.get, column))
+
+
+def duty_runs(statuses: Sequence[Optional[str]], breaks=frozenset()):
+    """
+    Run-length encode one crew member's day statuses
+
+    Args:
+        statuses: Status per day column (None = no tracked duty)
+        breaks: Column positions that do not follow the previous column's day
+
+    Yields:
+        (status, first position, last position) per run of consecutive days
+    """
+    # Only tracked days are visited; most roster cells are empty
+    start = prev = None
+    for j in compress(range(len(statuses)), statuses):
+        if prev is not None and j == prev + 1 and statuses[j] == statuses[prev] and j not in breaks:
+            prev = j
+            continue
+        if start is not None:
+            yield statuses[start], start, prev
+        start = prev = j
+    if start is not None:
+        yield statuses[start], start, prev
+
+
+# Crew bases; the first cell of a crew row mentioning one holds "BASE AC POS"
+BASE_CODE_PATTERN = re.compile('SGN|HAN|DAD|CXR')
+_CELL_SEPARATOR = '\x1f'
+
+
+def find_crew_base(row: Sequence[str]) -> str:
+    """Base code from the first cell of the row that mentions a known base"""
+    joined = _CELL_SEPARATOR.join(row).upper()
+    match = BASE_CODE_PATTERN.search(joined)
+    if not match:
+        return ''
+    start = joined.rfind(_CELL_SEPARATOR, 0, match.start()) + 1
+    end = joined.find(_CELL_SEPARATOR, match.end())
+    parts = joined[start:end if end != -1 else None].split()
+    return parts[0] if parts else ''
+
+
+class ReportFormat:
+    """
+    Declarative layout of one report type
+
+    Args:
+        name: Format name (unique in the registry)
+        report: Report key the format feeds (see data_processor.REPORT_PARSERS)
+        columns: field -> regex, full-matched against normalized header cells;
+            the first matching cell wins, so 'sta' no longer matches 'status'
+        signature: Groups of fields; the header (with its header_depth rows)
+            must match one field of every group
+        defaults: Column indices used when a field is not in the header
+        repeated: field -> regex collecting every matching cell (e.g. day columns)
+        accept: Extra check on the resolved col_map
+        scan_rows: How many leading rows may hold the header
+        header_depth: Extra rows below the header searched for unresolved
+            fields (multi-row headers)
+        min_cells: Minimum cells in a header row
+    """
+
+    def __init__(
+        self,
+        name: str,
+        report: str,
+        columns: Dict[str, str],
+        signature: Sequence[Sequence[str]],
+        defaults: Dict[str, int] = None,
+        repeated: Dict[str, str] = None,
+        accept: Callable[[Dict], bool] = None,
+        scan_rows: int = 5,
+        header_depth: int = 0,
+        min_cells: int = 0
+    ):
+        self.name = name
+        self.report = report
+        self.columns = {field: re.compile(pattern) for field, pattern in columns.items()}
+        self.signature = [tuple(group) for group in signature]
+        self.defaults = dict(defaults or {})
+        self.repeated = {field: re.compile(pattern) for field, pattern in (repeated or {}).items()}
+        self.accept = accept
+        self.scan_rows = scan_rows
+        self.header_depth = header_depth
+        self.min_cells = min_cells
+
+    def _map_cells(self, cells: List[str], col_map: Dict, fields: Iterable[str]):
+        for field in fields:
+            if field in col_map:
+                continue
+            pattern = self.columns[field]
+            for idx, cell in enumerate(cells):
+                if pattern.fullmatch(cell):
+                    col_map[field] = idx
+                    break
+
+    def match_header(self, row: Sequence[str], rows: Sequence[Sequence[str]] = (), index: int = 0) -> Optional[Dict]:
+        """Resolved col_map if row is this format's header, else None"""
+        if len(row) < self.min_cells:
+            return None
+        cells = [normalize_header(c) for c in row]
+        found = {}
+        self._map_cells(cells, found, self.columns)
+        for sub_row in rows[index + 1:index + 1 + self.header_depth]:
+            self._map_cells([normalize_header(c) for c in sub_row], found, self.columns)
+
+        for group in self.signature:
+            if not any(field in found for field in group):
+                return None
+        for field, pattern in self.repeated.items():
+            found[field] = [idx for idx, cell in enumerate(cells) if pattern.fullmatch(cell)]
+        if self.accept and not self.accept(found):
+            return None
+
+        col_map = dict(self.defaults)
+        col_map.update(found)
+        col_map['found'] = set(found)
+        return col_map
+
+    def find_header(self, rows: Sequence[Sequence[str]]) -> Tuple[Optional[int], Optional[Dict]]:
+        """(header row index, col_map) or (None, None) if no header in the scan window"""
+        for i, row in enumerate(rows[:self.scan_rows]):
+            col_map = self.match_header(row, rows, i)
+            if col_map is not None:
+                return i, col_map
+        return None, None
+
+
+REPORT_FORMATS: Dict[str, ReportFormat] = {}
+
+
+def register_format(report_format: ReportFormat) -> ReportFormat:
+    """Add a layout to the registry (later registrations are tried last)"""
+    REPORT_FORMATS[report_format.name] = report_format
+    return report_format
+
+
+def formats_for(report: str) -> List[ReportFormat]:
+    return [fmt for fmt in REPORT_FORMATS.values() if fmt.report == report]
+
+
+def find_report_header(report: str, rows: Sequence[Sequence[str]]) -> Tuple[Optional[ReportFormat], Optional[int], Optional[Dict]]:
+    """
+    Header of a known report type
+
+    Formats of the report are tried row by row in registry order, so a
+    layout registered first wins when two match the same row.
+
+    Returns:
+        (format, header row index, col_map), all None if no layout matched
+    """
+    candidates = formats_for(report)
+    window = max((fmt.scan_rows for fmt in candidates), default=0)
+    for i, row in enumerate(rows[:window]):
+        for fmt in candidates:
+            if i < fmt.scan_rows:
+                col_map = fmt.match_header(row, rows, i)
+                if col_map is not None:
+                    return fmt, i, col_map
+    return None, None, None
+
+
+def detect_report(rows: Iterable[Sequence[str]]) -> Optional[str]:
+    """
+    Report key of an unlabelled CSV (first header match), None if unknown
+
+    Only the scan window is consumed, so rows may be a lazy csv.reader.
+    """
+    window = max((fmt.scan_rows for fmt in REPORT_FORMATS.values()), default=0)
+    depth = max((fmt.header_depth for fmt in REPORT_FORMATS.values()), default=0)
+    rows = list(islice(rows, window + depth))
+    for i, row in enumerate(rows[:window]):
+        for fmt in REPORT_FORMATS.values():
+            if i < fmt.scan_rows and fmt.match_header(row, rows, i) is not None:
+                return fmt.report
+    return None
+
+
+# ==================== BUILT-IN AIMS LAYOUTS ====================
+
+register_format(ReportFormat(
+    name='dayrep',
+    report='dayrep',
+    # DATE,REG,FLT,DEP,ARR,STD,STA,ETD,ETA,TKof,TDwn,ATD,ATA,Crew #,Crew
+    columns={
+        'date': r'date',
+        'reg': r'reg|registration|a/c reg',
+        'ac': r'ac|a/c|(ac |a/c )?type',
+        'flt': r'(flt|flight)( no\.?)?',
+        'dep': r'dep',
+        'arr': r'arr',
+        'std': r'std',
+        'sta': r'sta',
+        'crew': r'crew',
+    },
+    signature=[('date',), ('reg', 'flt')],
+    defaults={'date': 0, 'reg': 1, 'flt': 2, 'dep': 3, 'arr': 4, 'std': 5, 'sta': 6, 'crew': 14, 'ac': -1},
+    min_cells=6,
+))
+
+register_format(ReportFormat(
+    name='sacutil',
+    report='sacutil',
+    # Date,AC,Dom Block,Int Block,Total Block,Dom Cycles,Int Cycles,Total Cycles,...,Average Util
+    columns={
+        'date': r'date',
+        'ac': r'ac|actype|aircraft',
+        'dom_block': r'dom block',
+        'int_block': r'int block',
+        'total_block': r'total block',
+        'dom_cycles': r'dom cycles',
+        'int_cycles': r'int cycles',
+        'total_cycles': r'total cycles',
+        'avg_util': r'average util|avg util',
+    },
+    signature=[('date',), ('ac',)],
+    defaults={
+        'date': 0, 'ac': 1, 'dom_block': 2, 'int_block': 3, 'total_block': 4,
+        'dom_cycles': 5, 'int_cycles': 6, 'total_cycles': 7, 'avg_util': 11
+    },
+))
+
+register_format(ReportFormat(
+    name='rolcrtot',
+    report='rolcrtot',
+    # ID,Name,Seniority,Last,Last / ,,,28-Day(s),12-Month(s) / ,,,Block Time,Block Time
+    columns={
+        'id': r'id',
+        'name': r'(crew )?name',
+        'seniority': r'.*seniority.*',
+        'block_28day': r'.*28-day.*',
+        'block_12month': r'.*12-month.*',
+    },
+    # 'Name' alone also heads the crew schedule matrix
+    signature=[('name',), ('seniority', 'block_28day', 'block_12month')],
+    defaults={'id': 0, 'name': 1, 'seniority': 2, 'block_28day': 3, 'block_12month': 4},
+    scan_rows=20,
+    header_depth=3,
+))
+
+# Matrix layout: one column per day of month, cell holds the duty code
+register_format(ReportFormat(
+    name='crew_schedule_matrix',
+    report='crew_schedule',
+    columns={
+        'id': r'id',
+        'name': r'.*nam.*',
+    },
+    signature=[('id',)],
+    repeated={'days': r'0*([1-9]|[12]\d|3[01])'},
+    accept=lambda col_map: len(col_map['days']) > 3,
+    scan_rows=10,
+))
+
+# List layout: one row per crew member with SL/CSL/SBY/OSBY day counts
+register_format(ReportFormat(
+    name='crew_schedule',
+    report='crew_schedule',
+    columns={
+        'id': r'id',
+        'name': r'.*nam.*',
+        'base': r'.*base.*',
+        'sl': r'sl',
+        'csl': r'csl',
+        'sby': r'sby',
+        'osby': r'osby',
+        'fdut': r'fdut',
+        'crew': r'.*crew.*',
+    },
+    signature=[('id',), ('sl', 'sby', 'fdut', 'crew')],
+    scan_rows=10,
+))
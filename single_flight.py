@@ -0,0 +1,87 @@
+"""
+Single Flight Module
+Gộp các request đồng thời cùng key thành một lần tính: caller đầu tiên tính,
+các caller còn lại chờ và dùng chung kết quả (hoặc exception) - giờ đổi ca
+nhiều người mở dashboard cùng lúc không nhân tải lên backend / Supabase
+
+Keys are usually (operation, data version, filter date); results are shared
+between callers, so treat them as read-only.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+# How long a waiting caller blocks on another caller's computation
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_TIMEOUT_SECONDS', '30'))
+
+
+class SingleFlightTimeout(TimeoutError):
+    """A waiting caller gave up on the in-flight computation"""
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one execution
+
+    Only calls that overlap are merged; once the computation finishes the key
+    is released and the next call computes again (no caching).
+
+    Args:
+        timeout: Default seconds a waiter blocks (SINGLE_FLIGHT_TIMEOUT_SECONDS, 30)
+    """
+
+    def __init__(self, timeout: float = None):
+        self.timeout = SINGLE_FLIGHT_TIMEOUT if timeout is None else timeout
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.stats = {'executed': 0, 'shared': 0, 'timeouts': 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: float = None) -> Any:
+        """
+        Return fn() - computed by this caller, or by the caller already running `key`
+
+        Raises:
+            SingleFlightTimeout: Waited longer than timeout for another caller
+            Exception: Whatever fn raised, re-raised in every caller that shared it
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats['executed'] += 1
+            else:
+                self.stats['shared'] += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        elif not call.done.wait(self.timeout if timeout is None else timeout):
+            with self._lock:
+                self.stats['timeouts'] += 1
+            raise SingleFlightTimeout(f"Timed out waiting for in-flight {key!r}")
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self) -> int:
+        """Number of keys currently being computed"""
+        with self._lock:
+            return len(self._calls)
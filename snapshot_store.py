@@ -0,0 +1,373 @@
+"""
+Snapshot Store Module
+Lưu dữ liệu đã xử lý (flights, aggregate theo ngày, rolling hours, standby)
+dạng Parquet nén theo cột, phân vùng theo tháng - phân tích lịch sử một năm
+chỉ đọc đúng tháng / cột cần, không parse lại CSV
+
+Layout (hive partitioning, readable by pandas / pyarrow.dataset / DuckDB):
+    <root>/<table>/month=YYYY-MM/part.parquet
+
+    import pandas as pd
+    pd.read_parquet('snapshots/flights', columns=['date', 'reg', 'std', 'sta'],
+                    filters=[('month', 'in', ['2026-01', '2026-02'])])
+
+Requires pyarrow (requirements.txt); imported only by snapshot exports and STORAGE_BACKEND=snapshot.
+"""
+
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import supabase_client
+from supabase_client import to_iso_date
+from storage_backend import StorageBackend
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Partition for rows whose date does not parse
+UNDATED_PARTITION = 'undated'
+
+SNAPSHOT_COMPRESSION = os.getenv('SNAPSHOT_COMPRESSION', 'zstd')
+
+# table -> (columns in write order, column holding the DD/MM/YY date or None, numeric column types)
+# Every dated table also gets a native 'day' DATE column for row filters.
+SNAPSHOT_TABLES = {
+    'flights': (
+        supabase_client.FLIGHT_COLUMNS.split(','), 'date', {}
+    ),
+    'ac_utilization': (
+        supabase_client.AC_UTILIZATION_COLUMNS.split(','), 'date',
+        {'dom_cycles': 'int64', 'int_cycles': 'int64', 'total_cycles': 'int64'}
+    ),
+    'crew_schedule': (
+        supabase_client.CREW_SCHEDULE_COLUMNS.split(','), 'date', {}
+    ),
+    'standby_records': (
+        supabase_client.STANDBY_COLUMNS.split(','), 'start_date', {}
+    ),
+    'reg_daily_stats': (
+        ['date', 'reg', 'block_minutes', 'cycles'], 'date',
+        {'block_minutes': 'int64', 'cycles': 'int64'}
+    ),
+    # Rolling totals are undated: each snapshot is stamped with the day it was taken
+    'rolling_hours': (
+        supabase_client.ROLLING_HOURS_COLUMNS.split(',') + ['as_of'], 'as_of',
+        {'hours_28day': 'float64', 'hours_12month': 'float64',
+         'percentage': 'float64', 'percentage_12m': 'float64'}
+    ),
+}
+
+# Range tables: column holding the DD/MM/YY end of the range, stored again as
+# a native 'end_day' DATE column so range reads prune on it
+SNAPSHOT_RANGE_ENDS = {
+    'standby_records': 'end_date',
+}
+
+# Native date columns added by the store (not part of the row shapes)
+DERIVED_COLUMNS = ('day', 'end_day')
+
+DEFAULT_COLUMNS = {
+    'flights': supabase_client.FLIGHT_COLUMNS,
+    'ac_utilization': supabase_client.AC_UTILIZATION_COLUMNS,
+    'crew_schedule': supabase_client.CREW_SCHEDULE_COLUMNS,
+    'standby_records': supabase_client.STANDBY_COLUMNS,
+    'reg_daily_stats': 'date,reg,block_minutes,cycles',
+    'rolling_hours': supabase_client.ROLLING_HOURS_COLUMNS,
+}
+
+_MONTH = re.compile(r'^\d{4}-\d{2}$')
+
+
+def _require_pyarrow():
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow not installed. Run: pip install pyarrow")
+
+
+def month_of(date_str: str) -> str:
+    """Partition of a DD/MM/YY (or ISO) date: 'YYYY-MM'"""
+    iso_date = to_iso_date(date_str)
+    return iso_date[:7] if iso_date else UNDATED_PARTITION
+
+
+def _schema(table: str) -> 'pa.Schema':
+    columns, date_column, types = SNAPSHOT_TABLES[table]
+    fields = [pa.field(col, getattr(pa, types.get(col, 'string'))()) for col in columns]
+    if date_column:
+        fields.append(pa.field('day', pa.date32()))
+    if table in SNAPSHOT_RANGE_ENDS:
+        fields.append(pa.field('end_day', pa.date32()))
+    return pa.schema(fields)
+
+
+def _to_day(date_str: str):
+    iso_date = to_iso_date(date_str or '')
+    return datetime.strptime(iso_date, '%Y-%m-%d').date() if iso_date else None
+
+
+def _cast(value, kind: str):
+    if value is None or value == '':
+        return None
+    try:
+        return int(value) if kind == 'int64' else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def write_table(root: Path, table: str, records: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Write records into month partitions
+
+    Months present in records are replaced (atomically, per file); other
+    months already in the store are kept, so the store accumulates history.
+
+    Returns:
+        dict: month -> rows written
+    """
+    _require_pyarrow()
+    columns, date_column, types = SNAPSHOT_TABLES[table]
+    end_column = SNAPSHOT_RANGE_ENDS.get(table)
+    schema = _schema(table)
+
+    by_month = {}
+    for record in records:
+        row = {}
+        for col in columns:
+            value = record.get(col)
+            row[col] = _cast(value, types[col]) if col in types else (None if value is None else str(value))
+        iso_date = to_iso_date(record.get(date_column) or '')
+        row['day'] = datetime.strptime(iso_date, '%Y-%m-%d').date() if iso_date else None
+        if end_column:
+            row['end_day'] = _to_day(record.get(end_column))
+        by_month.setdefault(iso_date[:7] if iso_date else UNDATED_PARTITION, []).append(row)
+
+    written = {}
+    for month, rows in by_month.items():
+        directory = Path(root) / table / f"month={month}"
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / 'part.parquet'
+        tmp = directory / f".part.{os.getpid()}.tmp"
+        pq.write_table(pa.Table.from_pylist(rows, schema=schema), tmp, compression=SNAPSHOT_COMPRESSION)
+        os.replace(tmp, target)
+        written[month] = len(rows)
+    return written
+
+
+def list_months(root: Path, table: str) -> List[str]:
+    """Months stored for a table, chronological ('undated' last)"""
+    directory = Path(root) / table
+    if not directory.exists():
+        return []
+    months = [p.name.split('=', 1)[1] for p in directory.glob('month=*') if (p / 'part.parquet').exists()]
+    return sorted(months, key=lambda m: (m == UNDATED_PARTITION, m))
+
+
+def read_table(root: Path, table: str, columns: Optional[Iterable[str]] = None,
+               months: Optional[Iterable[str]] = None, filters=None) -> 'pa.Table':
+    """
+    Read a table from the store as a pyarrow Table
+
+    Args:
+        columns: Columns to read (only these column chunks are decoded)
+        months: 'YYYY-MM' partitions to read (default: all)
+        filters: pyarrow row filters, e.g. [('day', '=', date(2026, 1, 15))]
+
+    Rows come back in month order, then in the order they were written.
+    """
+    _require_pyarrow()
+    schema = _schema(table)
+    columns = list(columns) if columns else [name for name in schema.names if name not in DERIVED_COLUMNS]
+    unknown = [col for col in columns if col not in schema.names]
+    if unknown:
+        raise ValueError(f"Unknown columns for {table}: {', '.join(unknown)}")
+
+    wanted = set(months) if months is not None else None
+    parts = []
+    for month in list_months(root, table):
+        if wanted is not None and month not in wanted:
+            continue
+        path = Path(root) / table / f"month={month}" / 'part.parquet'
+        parts.append(pq.read_table(path, columns=columns, filters=filters, schema=schema))
+    if not parts:
+        return schema.empty_table().select(columns)
+    return pa.concat_tables(parts)
+
+
+class SnapshotBackend(StorageBackend):
+    """
+    StorageBackend over the Parquet snapshot store
+
+    DataProcessor(storage=SnapshotBackend(months=[...])) loads a slice of
+    history through load_from_storage; used as the processor's backend (or
+    via DataProcessor.export_snapshot) each ingest lands in its month
+    partitions. AIMS staging tables are not archived.
+
+    Args:
+        root: Store directory (default: SNAPSHOT_DIR env or ./snapshots)
+        months: Restrict reads to these 'YYYY-MM' partitions (default: all)
+    """
+
+    name = 'snapshot'
+
+    def __init__(self, root: str = None, months: Iterable[str] = None):
+        _require_pyarrow()
+        self.root = Path(root or os.getenv('SNAPSHOT_DIR', Path(__file__).parent / 'snapshots'))
+        self.months = sorted(months) if months is not None else None
+        if self.months and not all(_MONTH.match(m) or m == UNDATED_PARTITION for m in self.months):
+            raise ValueError(f"Months must be 'YYYY-MM': {self.months}")
+
+    def is_connected(self) -> bool:
+        return True
+
+    # ---- helpers ----
+
+    def _columns(self, table: str, columns: Optional[str]) -> List[str]:
+        columns = columns or DEFAULT_COLUMNS[table]
+        if columns.strip() == '*':
+            return [name for name in _schema(table).names if name not in DERIVED_COLUMNS]
+        return [c.strip() for c in columns.split(',')]
+
+    def _months_for(self, date_str: str = None) -> Optional[List[str]]:
+        """Partitions a read touches: one month for a date filter, else the configured slice"""
+        if date_str is None:
+            return self.months
+        month = month_of(date_str)
+        return [month] if self.months is None or month in self.months else []
+
+    def _read(self, table: str, columns: Optional[str], filter_date: str = None) -> List[Dict[str, Any]]:
+        if not filter_date:
+            return read_table(self.root, table, self._columns(table, columns), self.months).to_pylist()
+        iso_date = to_iso_date(filter_date)
+        if not iso_date:
+            return []
+        day = datetime.strptime(iso_date, '%Y-%m-%d').date()
+        return read_table(
+            self.root, table, self._columns(table, columns), self._months_for(filter_date),
+            filters=[('day', '=', day)]
+        ).to_pylist()
+
+    # ---- CSV tables ----
+
+    def insert_flights(self, flights_data):
+        return write_table(self.root, 'flights', flights_data)
+
+    def get_flights(self, filter_date=None, columns=None):
+        return self._read('flights', columns, filter_date)
+
+    def get_flights_range(self, date_from, date_to, columns=None):
+        iso_from, iso_to = to_iso_date(date_from), to_iso_date(date_to)
+        if not iso_from or not iso_to:
+            print(f"Invalid flight date range: {date_from} - {date_to}")
+            return []
+        months = [m for m in list_months(self.root, 'flights')
+                  if iso_from[:7] <= m <= iso_to[:7] and (self.months is None or m in self.months)]
+        day_from = datetime.strptime(iso_from, '%Y-%m-%d').date()
+        day_to = datetime.strptime(iso_to, '%Y-%m-%d').date()
+        rows = read_table(
+            self.root, 'flights', self._columns('flights', columns) + ['day'], months,
+            filters=[('day', '>=', day_from), ('day', '<=', day_to)]
+        ).to_pylist()
+        rows.sort(key=lambda row: row.pop('day'))
+        return rows
+
+    def get_available_dates(self):
+        table = read_table(self.root, 'flights', ['date', 'day'], self.months)
+        first_day = {}
+        for date_str, day in zip(table.column('date').to_pylist(), table.column('day').to_pylist()):
+            if date_str not in first_day:
+                first_day[date_str] = day
+        return sorted(first_day, key=lambda d: (first_day[d] is None, first_day[d] or '', d))
+
+    def insert_ac_utilization(self, util_data):
+        return write_table(self.root, 'ac_utilization', util_data)
+
+    def get_ac_utilization(self, filter_date=None, columns=None):
+        return self._read('ac_utilization', columns, filter_date)
+
+    def insert_rolling_hours(self, hours_data):
+        as_of = datetime.now(timezone.utc).strftime('%d/%m/%y')
+        return write_table(self.root, 'rolling_hours', [dict(row, as_of=as_of) for row in hours_data])
+
+    def get_rolling_hours(self, columns=None):
+        """Latest snapshot of the rolling totals (in the configured months), hours_28day descending"""
+        months = [m for m in list_months(self.root, 'rolling_hours') if self.months is None or m in self.months]
+        if not months:
+            return []
+        table = read_table(self.root, 'rolling_hours', None, months[-1:])
+        latest = max(table.column('as_of').to_pylist(), key=lambda d: to_iso_date(d) or '')
+        rows = read_table(
+            self.root, 'rolling_hours', self._columns('rolling_hours', columns) + ['hours_28day'], months[-1:],
+            filters=[('as_of', '=', latest)]
+        ).to_pylist()
+        rows.sort(key=lambda row: row['hours_28day'] or 0, reverse=True)
+        return rows
+
+    def insert_crew_schedule(self, schedule_data):
+        return write_table(self.root, 'crew_schedule', schedule_data)
+
+    def get_crew_schedule(self, filter_date=None, columns=None):
+        return self._read('crew_schedule', columns, filter_date)
+
+    def upsert_standby_records(self, records):
+        if not records:
+            return None
+        return write_table(self.root, 'standby_records', records)
+
+    def get_standby_records(self, filter_date=None, columns=None):
+        if not filter_date:
+            return self._read('standby_records', columns)
+        iso_date = to_iso_date(filter_date)
+        if not iso_date:
+            return []
+        # A duty range is stored under its start month, which may be any earlier
+        # month: start_day <= target <= end_day prunes row groups on their stats
+        day = datetime.strptime(iso_date, '%Y-%m-%d').date()
+        return read_table(
+            self.root, 'standby_records', self._columns('standby_records', columns),
+            [m for m in list_months(self.root, 'standby_records')
+             if m <= iso_date[:7] and (self.months is None or m in self.months)],
+            filters=[('day', '<=', day), ('end_day', '>=', day)]
+        ).to_pylist()
+
+    def insert_reg_daily_stats(self, stats):
+        return write_table(self.root, 'reg_daily_stats', stats)
+
+    def get_reg_daily_stats(self, filter_date=None, columns=None):
+        return self._read('reg_daily_stats', columns, filter_date)
+
+    # ---- AIMS staging tables (not archived) ----
+
+    def get_fact_actuals(self, dates=None, columns=None):
+        return []
+
+    def get_fact_leg_members(self, filter_date=None, dates=None, columns=None):
+        return []
+
+    def get_etl_notifications(self, since=None, limit=200, columns=None):
+        return []
+
+    def upsert_fact_actuals(self, records):
+        return None
+
+    def insert_fact_leg_members(self, records):
+        return None
+
+    def insert_etl_notification(self, notification):
+        return None
+
+    def clear_all_data(self):
+        """Delete the configured month partitions (all months if unrestricted)"""
+        for table in SNAPSHOT_TABLES:
+            for month in list_months(self.root, table):
+                if self.months is None or month in self.months:
+                    directory = self.root / table / f"month={month}"
+                    for path in directory.iterdir():
+                        path.unlink()
+                    directory.rmdir()
+        return True
@@ -0,0 +1,250 @@
+"""
+Static Site Module
+Build tĩnh cho deploy_static: một file JSON + một trang cho mỗi ngày có dữ
+liệu, cộng view tất cả các ngày. Ngày nào input không đổi (theo content
+hash) thì bỏ qua; mọi file được ghi atomic - CDN phục vụ toàn bộ lịch sử
+mà không cần server
+
+Output layout:
+    index.html               all-dates page (the template itself)
+    <YYYY-MM-DD>/index.html  per-date page (template + <base> and static-date meta)
+    data/all.json            all-dates view
+    data/<YYYY-MM-DD>.json   per-date view
+    data/shared.json         date-independent sections (compliance lists, available dates)
+    dashboard_data.json      full all-dates payload (legacy export_to_json file)
+    build_manifest.json      input digests and output hashes of the last build
+
+Usage:
+    python static_site.py [--out DIR] [--force]
+"""
+
+import hashlib
+import os
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict
+
+import json_codec
+from supabase_client import to_iso_date
+
+DEFAULT_OUT_DIR = Path(__file__).parent / 'deploy_static'
+MANIFEST_NAME = 'build_manifest.json'
+MANIFEST_VERSION = 1
+
+# Sections identical for every date: served once from data/shared.json
+SHARED_KEYS = (
+    'available_dates', 'compliance_28d_all', 'compliance_28d_top20', 'compliance_12m_all',
+    'compliance_12m_top20', 'rolling_stats', 'rolling_stats_12m'
+)
+
+# Processor state indexed by operating date: a date's view reads only its own entry
+DATE_INPUT_ATTRS = (
+    'flights_by_date', 'crew_to_regs_by_date', 'reg_flight_hours_by_date', 'reg_flight_count_by_date',
+    'crew_group_rotations_by_date', 'ac_utilization_by_date', 'crew_schedule_by_date', 'leg_members_by_date'
+)
+
+# Date-independent state a per-date view still reads (names, types, standby ranges, util fallback)
+CONTEXT_ATTRS = (
+    'crew_roles', 'reg_types', 'crew_name_map', 'crew_schedule', 'standby_records', 'ac_utilization'
+)
+
+
+def _canonical(value):
+    """Order-independent form of processor state (sets and dict order vary between runs)"""
+    if isinstance(value, dict):
+        return sorted((repr(_canonical(key)), _canonical(inner)) for key, inner in value.items())
+    if isinstance(value, (set, frozenset)):
+        return sorted(repr(_canonical(item)) for item in value)
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    return value
+
+
+def input_digest(*parts) -> str:
+    """sha256 of the canonical form of parts"""
+    return hashlib.sha256(repr(_canonical(parts)).encode('utf-8')).hexdigest()
+
+
+def _content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def write_atomic(path: Path, data: bytes):
+    """Write via a temp file in the same directory + os.replace (readers never see a partial file)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def date_page(template: str, date_str: str) -> str:
+    """Per-date page: relative URLs resolve against the site root, the date comes from a meta tag"""
+    head = template.index('<head>') + len('<head>')
+    return (template[:head] +
+            f'\n    <base href="../">\n    <meta name="static-date" content="{date_str}">' +
+            template[head:])
+
+
+class StaticSiteBuilder:
+    """
+    Incremental static build of the dashboard
+
+    Args:
+        processor: Loaded DataProcessor
+        out_dir: Output directory (default: deploy_static)
+        template: Page template (default: <out_dir>/index.html, else deploy_static/index.html)
+    """
+
+    def __init__(self, processor, out_dir=None, template=None):
+        self.processor = processor
+        self.out_dir = Path(out_dir) if out_dir else DEFAULT_OUT_DIR
+        template_path = Path(template) if template else self.out_dir / 'index.html'
+        if not template_path.exists():
+            template_path = DEFAULT_OUT_DIR / 'index.html'
+        self.template = template_path.read_text(encoding='utf-8')
+        self.manifest = self._load_manifest()
+        self.files = dict(self.manifest.get('files', {}))
+        self.written = []
+        self.force = False
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        path = self.out_dir / MANIFEST_NAME
+        try:
+            manifest = json_codec.loads(path.read_bytes())
+            if manifest.get('version') == MANIFEST_VERSION:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {'version': MANIFEST_VERSION, 'files': {}, 'inputs': {}}
+
+    def _write(self, rel_path: str, data: bytes, hash_data: bytes = None):
+        """Write a file unless its content (hash_data if given) matches the last build"""
+        digest = _content_hash(data if hash_data is None else hash_data)
+        path = self.out_dir / rel_path
+        if not self.force and self.files.get(rel_path) == digest and path.exists():
+            return
+        write_atomic(path, data)
+        self.files[rel_path] = digest
+        self.written.append(rel_path)
+
+    def _write_view(self, rel_path: str, payload: Dict[str, Any]):
+        # last_updated changes on every render: the file is rewritten only when the data changes
+        stable = {key: value for key, value in payload.items() if key != 'last_updated'}
+        self._write(rel_path, json_codec.dumpb(payload), json_codec.dumpb(stable))
+
+    def _date_digest(self, date_str: str, context: str) -> str:
+        processor = self.processor
+        day = datetime.strptime(date_str, '%d/%m/%y')
+        yesterday = (day - timedelta(days=1)).strftime('%d/%m/%y')
+        # .get: the date-indexed state is mostly defaultdicts, which would grow on []
+        entries = [getattr(processor, attr).get(date_str) for attr in DATE_INPUT_ATTRS]
+        # Flight trend compares against the previous day's flight count
+        yesterday_flights = len(processor.flights_by_date.get(yesterday, ()))
+        return input_digest(context, date_str, entries, yesterday_flights)
+
+    def build(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Render the views whose inputs changed and write the files whose content changed
+
+        Returns:
+            dict: built / skipped dates, written and removed files
+        """
+        processor = self.processor
+        self.force = force
+        inputs = {} if force else dict(self.manifest.get('inputs', {}))
+        context = input_digest([getattr(processor, attr) for attr in CONTEXT_ATTRS])
+
+        full = processor.calculate_metrics()
+        shared = {key: full[key] for key in SHARED_KEYS if key in full}
+        self._write('dashboard_data.json', json_codec.dumpb(full, pretty=True),
+                    json_codec.dumpb({key: value for key, value in full.items() if key != 'last_updated'}))
+        self._write('data/shared.json', json_codec.dumpb(shared))
+        self._write_view('data/all.json', {key: value for key, value in full.items() if key not in shared})
+        self._write('index.html', self.template.encode('utf-8'))
+
+        built, skipped, keys = [], [], set()
+        for date_str in processor.available_dates:
+            key = to_iso_date(date_str)
+            if not key:
+                continue
+            keys.add(key)
+            try:
+                digest = self._date_digest(date_str, context)
+            except ValueError:
+                digest = None
+            json_path, page_path = f'data/{key}.json', f'{key}/index.html'
+            self._write(page_path, date_page(self.template, date_str).encode('utf-8'))
+            if (digest and inputs.get(key) == digest and
+                    (self.out_dir / json_path).exists() and json_path in self.files):
+                skipped.append(date_str)
+                continue
+            payload = processor.calculate_metrics(date_str)
+            self._write_view(json_path, {k: v for k, v in payload.items() if k not in SHARED_KEYS})
+            inputs[key] = digest
+            built.append(date_str)
+
+        removed = self._remove_stale(keys)
+        for key in list(inputs):
+            if key not in keys:
+                del inputs[key]
+
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'built_at': datetime.now().isoformat(),
+            'files': self.files,
+            'inputs': inputs
+        }
+        write_atomic(self.out_dir / MANIFEST_NAME, json_codec.dumpb(manifest, pretty=True, sort_keys=True))
+        print(f"Static build: {len(built)} dates rendered, {len(skipped)} unchanged, "
+              f"{len(self.written)} files written, {len(removed)} removed")
+        return {
+            'out_dir': str(self.out_dir),
+            'built_dates': built,
+            'skipped_dates': skipped,
+            'written': self.written,
+            'removed': removed
+        }
+
+    def _remove_stale(self, keys) -> list:
+        """Delete per-date files of dates that are no longer available"""
+        removed = []
+        for rel_path in list(self.files):
+            parts = rel_path.split('/')
+            key = parts[0] if parts[-1] == 'index.html' and len(parts) == 2 else (
+                parts[1][:-len('.json')] if parts[0] == 'data' else None)
+            if key is None or key in ('all', 'shared') or key in keys:
+                continue
+            path = self.out_dir / rel_path
+            if path.exists():
+                path.unlink()
+            if path.parent != self.out_dir and path.parent.exists() and not any(path.parent.iterdir()):
+                path.parent.rmdir()
+            del self.files[rel_path]
+            removed.append(rel_path)
+        return removed
+
+
+def build_static_site(processor, out_dir=None, force: bool = False, template=None) -> Dict[str, Any]:
+    """Build (or update) the static dashboard; see StaticSiteBuilder.build"""
+    return StaticSiteBuilder(processor, out_dir, template).build(force=force)
+
+
+if __name__ == '__main__':
+    import argparse
+    from data_processor import get_processor
+
+    parser = argparse.ArgumentParser(description='Build the static dashboard site')
+    parser.add_argument('--out', default=None, help=f'Output directory (default: {DEFAULT_OUT_DIR})')
+    parser.add_argument('--force', action='store_true', help='Rebuild every date')
+    args = parser.parse_args()
+
+    summary = build_static_site(get_processor(), args.out, force=args.force)
+    print(json_codec.dumps({key: len(value) if isinstance(value, list) else value
+                            for key, value in summary.items()}, pretty=True))
@@ -0,0 +1,602 @@
+"""
+Storage Backend Module
+Giao diện lưu trữ chung cho DataProcessor: Supabase (PostgREST) hoặc SQLite nhúng
+cho triển khai single-node, test và benchmark không cần network service
+"""
+
+import os
+import re
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import supabase_client
+from supabase_client import to_iso_date
+
+
+class StorageBackend(ABC):
+    """
+    Storage interface used by DataProcessor
+
+    Method names and row shapes follow supabase_client: writes of the CSV
+    tables are full refreshes, getters return lists of dicts and accept an
+    optional comma-separated column projection (None = the loader defaults).
+    """
+
+    name = None
+
+    @abstractmethod
+    def is_connected(self) -> bool:
+        raise NotImplementedError
+
+    # ---- DayRep / SacutilReport / RolCrTotReport / Crew schedule ----
+
+    @abstractmethod
+    def insert_flights(self, flights_data: list):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_flights(self, filter_date: str = None, columns: str = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_flights_range(self, date_from: str, date_to: str, columns: str = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_available_dates(self) -> List[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def insert_ac_utilization(self, util_data: list):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_ac_utilization(self, filter_date: str = None, columns: str = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def insert_rolling_hours(self, hours_data: list):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_rolling_hours(self, columns: str = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def insert_crew_schedule(self, schedule_data: list):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_crew_schedule(self, filter_date: str = None, columns: str = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def upsert_standby_records(self, records: list):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_standby_records(self, filter_date: str = None, columns: str = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    # ---- AIMS staging tables ----
+
+    @abstractmethod
+    def upsert_fact_actuals(self, records: list):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_fact_actuals(self, dates: list = None, columns: str = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def insert_fact_leg_members(self, records: list):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_fact_leg_members(self, filter_date: str = None, dates: list = None,
+                             columns: str = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def insert_etl_notification(self, notification: dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_etl_notifications(self, since: str = None, limit: int = 200,
+                              columns: str = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear_all_data(self) -> bool:
+        raise NotImplementedError
+
+
+class NullBackend(StorageBackend):
+    """
+    Storage-less backend: never connected, writes are dropped and reads are
+    empty. Used by processors that only parse (process-pool workers)
+    """
+
+    name = 'none'
+
+    def is_connected(self) -> bool:
+        return False
+
+    def insert_flights(self, flights_data):
+        return None
+
+    def get_flights(self, filter_date=None, columns=None):
+        return []
+
+    def get_flights_range(self, date_from, date_to, columns=None):
+        return []
+
+    def get_available_dates(self):
+        return []
+
+    def insert_ac_utilization(self, util_data):
+        return None
+
+    def get_ac_utilization(self, filter_date=None, columns=None):
+        return []
+
+    def insert_rolling_hours(self, hours_data):
+        return None
+
+    def get_rolling_hours(self, columns=None):
+        return []
+
+    def insert_crew_schedule(self, schedule_data):
+        return None
+
+    def get_crew_schedule(self, filter_date=None, columns=None):
+        return []
+
+    def upsert_standby_records(self, records):
+        return None
+
+    def get_standby_records(self, filter_date=None, columns=None):
+        return []
+
+    def upsert_fact_actuals(self, records):
+        return None
+
+    def get_fact_actuals(self, dates=None, columns=None):
+        return []
+
+    def insert_fact_leg_members(self, records):
+        return None
+
+    def get_fact_leg_members(self, filter_date=None, dates=None, columns=None):
+        return []
+
+    def insert_etl_notification(self, notification):
+        return None
+
+    def get_etl_notifications(self, since=None, limit=200, columns=None):
+        return []
+
+    def clear_all_data(self):
+        return False
+
+
+class SupabaseBackend(StorageBackend):
+    """StorageBackend over the module-level functions of supabase_client"""
+
+    name = 'supabase'
+
+    @staticmethod
+    def _projection(columns: Optional[str]) -> Dict[str, str]:
+        return {'columns': columns} if columns else {}
+
+    def is_connected(self) -> bool:
+        return supabase_client.is_connected()
+
+    def insert_flights(self, flights_data: list):
+        return supabase_client.insert_flights(flights_data)
+
+    def get_flights(self, filter_date=None, columns=None):
+        return supabase_client.get_flights(filter_date, **self._projection(columns))
+
+    def get_flights_range(self, date_from, date_to, columns=None):
+        return supabase_client.get_flights_range(date_from, date_to, **self._projection(columns))
+
+    def get_available_dates(self):
+        return supabase_client.get_available_dates()
+
+    def insert_ac_utilization(self, util_data):
+        return supabase_client.insert_ac_utilization(util_data)
+
+    def get_ac_utilization(self, filter_date=None, columns=None):
+        return supabase_client.get_ac_utilization(filter_date, **self._projection(columns))
+
+    def insert_rolling_hours(self, hours_data):
+        return supabase_client.insert_rolling_hours(hours_data)
+
+    def get_rolling_hours(self, columns=None):
+        return supabase_client.get_rolling_hours(**self._projection(columns))
+
+    def insert_crew_schedule(self, schedule_data):
+        return supabase_client.insert_crew_schedule(schedule_data)
+
+    def get_crew_schedule(self, filter_date=None, columns=None):
+        return supabase_client.get_crew_schedule(filter_date, **self._projection(columns))
+
+    def upsert_standby_records(self, records):
+        return supabase_client.upsert_standby_records(records)
+
+    def get_standby_records(self, filter_date=None, columns=None):
+        return supabase_client.get_standby_records(filter_date, **self._projection(columns))
+
+    def upsert_fact_actuals(self, records):
+        return supabase_client.upsert_fact_actuals(records)
+
+    def get_fact_actuals(self, dates=None, columns=None):
+        return supabase_client.get_fact_actuals(dates, **self._projection(columns))
+
+    def insert_fact_leg_members(self, records):
+        return supabase_client.insert_fact_leg_members(records)
+
+    def get_fact_leg_members(self, filter_date=None, dates=None, columns=None):
+        return supabase_client.get_fact_leg_members(filter_date, dates, **self._projection(columns))
+
+    def insert_etl_notification(self, notification):
+        return supabase_client.insert_etl_notification(notification)
+
+    def get_etl_notifications(self, since=None, limit=200, columns=None):
+        return supabase_client.get_etl_notifications(since, limit, **self._projection(columns))
+
+    def clear_all_data(self):
+        return supabase_client.clear_all_data()
+
+
+# SQLite tables: (columns in write order, derived ISO date columns -> source column)
+# The ISO columns play the role of the generated DATE columns in Postgres
+# (migration_date_columns.sql) and back every date filter / range read.
+SQLITE_TABLES = {
+    'flights': (
+        ['date', 'calendar_date', 'reg', 'flt', 'dep', 'arr', 'std', 'sta', 'crew'],
+        {'op_date': 'date'}
+    ),
+    'ac_utilization': (
+        ['date', 'ac_type', 'dom_block', 'int_block', 'total_block',
+         'dom_cycles', 'int_cycles', 'total_cycles', 'avg_util'],
+        {'util_date': 'date'}
+    ),
+    'rolling_hours': (
+        ['crew_id', 'name', 'seniority', 'block_28day', 'block_12month', 'hours_28day',
+         'hours_12month', 'percentage', 'percentage_12m', 'status', 'status_12m'],
+        {}
+    ),
+    'crew_schedule': (
+        ['date', 'crew_id', 'status_type'],
+        {'schedule_date': 'date'}
+    ),
+    'standby_records': (
+        ['crew_id', 'name', 'base', 'status_type', 'start_date', 'end_date'],
+        {'start_day': 'start_date', 'end_day': 'end_date'}
+    ),
+    'fact_actuals': (
+        ['flight_date', 'flight_no', 'ac_reg', 'departure', 'arrival', 'std', 'sta',
+         'atd', 'ata', 'block_minutes', 'status', 'source', 'synced_at'],
+        {'flight_day': 'flight_date'}
+    ),
+    'fact_leg_members': (
+        ['leg_date', 'flight_no', 'reg', 'dep', 'arr', 'std', 'sta',
+         'crew_id', 'crew_name', 'crew_role', 'source', 'synced_at'],
+        {'leg_day': 'leg_date'}
+    ),
+    'etl_notifications': (
+        ['stage', 'dates', 'upserted', 'deleted', 'origin', 'created_at'],
+        {}
+    ),
+}
+
+SQLITE_COLUMN_TYPES = {
+    'dom_cycles': 'INTEGER', 'int_cycles': 'INTEGER', 'total_cycles': 'INTEGER',
+    'hours_28day': 'REAL', 'hours_12month': 'REAL', 'percentage': 'REAL', 'percentage_12m': 'REAL',
+    'block_minutes': 'INTEGER', 'upserted': 'INTEGER', 'deleted': 'INTEGER',
+}
+
+SQLITE_CONSTRAINTS = {
+    'standby_records': 'UNIQUE(crew_id, status_type, start_date)',
+    'fact_actuals': 'UNIQUE(flight_date, flight_no)',
+    'fact_leg_members': 'UNIQUE(leg_date, flight_no, dep, crew_id)',
+}
+
+SQLITE_INDEXES = [
+    ('idx_flights_op_date_reg', 'flights', 'op_date, reg'),
+    ('idx_flights_date', 'flights', 'date'),
+    ('idx_flights_reg', 'flights', 'reg'),
+    ('idx_ac_util_date_type', 'ac_utilization', 'util_date, ac_type'),
+    ('idx_ac_util_date', 'ac_utilization', 'date'),
+    ('idx_rolling_crew', 'rolling_hours', 'crew_id'),
+    ('idx_crew_sched_date', 'crew_schedule', 'date'),
+    ('idx_crew_sched_crew', 'crew_schedule', 'crew_id'),
+    ('idx_standby_day_range', 'standby_records', 'start_day, end_day'),
+    ('idx_standby_crew', 'standby_records', 'crew_id'),
+    ('idx_fact_actuals_date', 'fact_actuals', 'flight_date'),
+    ('idx_fact_actuals_day', 'fact_actuals', 'flight_day'),
+    ('idx_fact_leg_date', 'fact_leg_members', 'leg_date'),
+    ('idx_fact_leg_day', 'fact_leg_members', 'leg_day'),
+    ('idx_fact_leg_crew', 'fact_leg_members', 'crew_id'),
+    ('idx_etl_notifications_time', 'etl_notifications', 'created_at'),
+]
+
+_COLUMN_LIST = re.compile(r'^\s*[a-z0-9_]+(\s*,\s*[a-z0-9_]+)*\s*$')
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Embedded SQLite storage (one file, WAL journal)
+
+    - Bulk ingest: full refresh = DELETE + executemany in one transaction
+      (readers never see a half-written table)
+    - Date filters and ranges use ISO date columns with composite indexes,
+      so they are chronological and index-backed
+
+    Args:
+        path: Database file (':memory:' for tests/benchmarks)
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: str = None):
+        self.path = str(path or os.getenv('SQLITE_PATH', Path(__file__).parent / 'crew_dashboard.db'))
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if self.path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            for table, (columns, derived) in SQLITE_TABLES.items():
+                defs = ['id INTEGER PRIMARY KEY AUTOINCREMENT']
+                defs += [f"{col} {SQLITE_COLUMN_TYPES.get(col, 'TEXT')}" for col in columns]
+                defs += [f"{col} TEXT" for col in derived]
+                if table in SQLITE_CONSTRAINTS:
+                    defs.append(SQLITE_CONSTRAINTS[table])
+                self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(defs)})")
+            for index, table, columns in SQLITE_INDEXES:
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table}({columns})")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def is_connected(self) -> bool:
+        return True
+
+    # ---- helpers ----
+
+    def _select_list(self, table: str, columns: Optional[str], default: str) -> str:
+        """Validated column projection (never interpolate caller text unchecked)"""
+        columns = columns or default
+        if columns.strip() == '*':
+            table_columns, derived = SQLITE_TABLES[table]
+            return ', '.join(table_columns + list(derived))
+        if not _COLUMN_LIST.match(columns):
+            raise ValueError(f"Invalid column list for {table}: {columns}")
+        known = set(SQLITE_TABLES[table][0]) | set(SQLITE_TABLES[table][1])
+        names = [c.strip() for c in columns.split(',')]
+        unknown = [c for c in names if c not in known]
+        if unknown:
+            raise ValueError(f"Unknown columns for {table}: {', '.join(unknown)}")
+        return ', '.join(names)
+
+    def _row_values(self, table: str, record: dict) -> tuple:
+        columns, derived = SQLITE_TABLES[table]
+        values = [record.get(col) for col in columns]
+        values += [to_iso_date(record.get(source) or '') for source in derived.values()]
+        return tuple(values)
+
+    def _write(self, table: str, records: list, replace: bool = False, conflict: str = None) -> int:
+        """
+        Bulk write in one transaction
+
+        replace: delete every existing row first (full refresh, like supabase_client)
+        conflict: unique-key columns -> upsert (INSERT ... ON CONFLICT DO UPDATE)
+        """
+        columns, derived = SQLITE_TABLES[table]
+        all_columns = columns + list(derived)
+        sql = (
+            f"INSERT INTO {table} ({', '.join(all_columns)}) "
+            f"VALUES ({', '.join('?' for _ in all_columns)})"
+        )
+        if conflict:
+            keys = [c.strip() for c in conflict.split(',')]
+            updates = ', '.join(f"{c} = excluded.{c}" for c in all_columns if c not in keys)
+            sql += f" ON CONFLICT({', '.join(keys)}) DO UPDATE SET {updates}"
+        rows = [self._row_values(table, record) for record in records]
+        with self._lock, self._conn:
+            if replace:
+                self._conn.execute(f"DELETE FROM {table}")
+            self._conn.executemany(sql, rows)
+        return len(rows)
+
+    def _read(self, table: str, select: str, where: str = '', params: tuple = (),
+              order: str = '', limit: int = None) -> List[Dict[str, Any]]:
+        sql = f"SELECT {select} FROM {table}"
+        if where:
+            sql += f" WHERE {where}"
+        if order:
+            sql += f" ORDER BY {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def _date_filter(self, iso_column: str, text_column: str, filter_date: str):
+        """WHERE clause for one date: ISO column if the date parses, else exact text match"""
+        iso_date = to_iso_date(filter_date)
+        if iso_date:
+            return f"{iso_column} = ?", (iso_date,)
+        return f"{text_column} = ?", (filter_date,)
+
+    def _in_dates(self, iso_column: str, text_column: str, dates: list):
+        iso_dates = [to_iso_date(d) for d in dates]
+        if all(iso_dates):
+            return f"{iso_column} IN ({', '.join('?' for _ in dates)})", tuple(iso_dates)
+        return f"{text_column} IN ({', '.join('?' for _ in dates)})", tuple(dates)
+
+    # ---- CSV tables ----
+
+    def insert_flights(self, flights_data):
+        return self._write('flights', flights_data, replace=True)
+
+    def get_flights(self, filter_date=None, columns=None):
+        select = self._select_list('flights', columns, supabase_client.FLIGHT_COLUMNS)
+        if not filter_date:
+            return self._read('flights', select, order='id')
+        where, params = self._date_filter('op_date', 'date', filter_date)
+        return self._read('flights', select, where, params, order='id')
+
+    def get_flights_range(self, date_from, date_to, columns=None):
+        iso_from, iso_to = to_iso_date(date_from), to_iso_date(date_to)
+        if not iso_from or not iso_to:
+            print(f"Invalid flight date range: {date_from} - {date_to}")
+            return []
+        select = self._select_list('flights', columns, supabase_client.FLIGHT_COLUMNS)
+        return self._read('flights', select, 'op_date BETWEEN ? AND ?', (iso_from, iso_to), order='op_date, id')
+
+    def get_available_dates(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, MIN(op_date) AS sort_key FROM flights GROUP BY date "
+                "ORDER BY sort_key IS NULL, sort_key, date"
+            ).fetchall()
+        return [row['date'] for row in rows]
+
+    def insert_ac_utilization(self, util_data):
+        return self._write('ac_utilization', util_data, replace=True)
+
+    def get_ac_utilization(self, filter_date=None, columns=None):
+        select = self._select_list('ac_utilization', columns, supabase_client.AC_UTILIZATION_COLUMNS)
+        if not filter_date:
+            return self._read('ac_utilization', select)
+        where, params = self._date_filter('util_date', 'date', filter_date)
+        return self._read('ac_utilization', select, where, params)
+
+    def insert_rolling_hours(self, hours_data):
+        return self._write('rolling_hours', hours_data, replace=True)
+
+    def get_rolling_hours(self, columns=None):
+        select = self._select_list('rolling_hours', columns, supabase_client.ROLLING_HOURS_COLUMNS)
+        return self._read('rolling_hours', select, order='hours_28day DESC')
+
+    def insert_crew_schedule(self, schedule_data):
+        return self._write('crew_schedule', schedule_data, replace=True)
+
+    def get_crew_schedule(self, filter_date=None, columns=None):
+        select = self._select_list('crew_schedule', columns, supabase_client.CREW_SCHEDULE_COLUMNS)
+        if not filter_date:
+            return self._read('crew_schedule', select)
+        where, params = self._date_filter('schedule_date', 'date', filter_date)
+        return self._read('crew_schedule', select, where, params)
+
+    def upsert_standby_records(self, records):
+        if not records:
+            return None
+        # Full refresh like supabase_client; the upsert key absorbs duplicates in one file
+        return self._write('standby_records', records, replace=True, conflict='crew_id,status_type,start_date')
+
+    def get_standby_records(self, filter_date=None, columns=None):
+        select = self._select_list('standby_records', columns, supabase_client.STANDBY_COLUMNS)
+        if not filter_date:
+            return self._read('standby_records', select)
+        iso_date = to_iso_date(filter_date)
+        if not iso_date:
+            return []
+        # Multi-day duties appear on every day they cover
+        return self._read('standby_records', select, 'start_day <= ? AND end_day >= ?', (iso_date, iso_date))
+
+    # ---- AIMS staging tables ----
+
+    def upsert_fact_actuals(self, records):
+        if not records:
+            return None
+        return self._write('fact_actuals', records, conflict='flight_date,flight_no')
+
+    def get_fact_actuals(self, dates=None, columns=None):
+        select = self._select_list('fact_actuals', columns, supabase_client.FACT_ACTUALS_COLUMNS)
+        if not dates:
+            return self._read('fact_actuals', select)
+        where, params = self._in_dates('flight_day', 'flight_date', dates)
+        return self._read('fact_actuals', select, where, params)
+
+    def insert_fact_leg_members(self, records):
+        if not records:
+            return None
+        return self._write('fact_leg_members', records, conflict='leg_date,flight_no,dep,crew_id')
+
+    def get_fact_leg_members(self, filter_date=None, dates=None, columns=None):
+        select = self._select_list('fact_leg_members', columns, supabase_client.LEG_MEMBER_COLUMNS)
+        if dates:
+            where, params = self._in_dates('leg_day', 'leg_date', dates)
+            return self._read('fact_leg_members', select, where, params)
+        if filter_date:
+            where, params = self._date_filter('leg_day', 'leg_date', filter_date)
+            return self._read('fact_leg_members', select, where, params)
+        return self._read('fact_leg_members', select)
+
+    def insert_etl_notification(self, notification):
+        record = dict(notification)
+        record['dates'] = json.dumps(record.get('dates') or [])
+        record.setdefault('created_at', datetime.now(timezone.utc).isoformat())
+        self._write('etl_notifications', [record])
+        return [notification]
+
+    def get_etl_notifications(self, since=None, limit=200, columns=None):
+        select = self._select_list('etl_notifications', columns, supabase_client.ETL_NOTIFICATION_COLUMNS)
+        where, params = ('created_at > ?', (since,)) if since else ('', ())
+        rows = self._read('etl_notifications', select, where, params, order='created_at', limit=limit)
+        for row in rows:
+            if 'dates' in row:
+                row['dates'] = json.loads(row['dates'] or '[]')
+        return rows
+
+    def clear_all_data(self):
+        with self._lock, self._conn:
+            for table in ('flights', 'ac_utilization', 'rolling_hours', 'crew_schedule'):
+                self._conn.execute(f"DELETE FROM {table}")
+        return True
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> StorageBackend:
+    """
+    Get the process-wide storage backend
+
+    Environment:
+        STORAGE_BACKEND: 'supabase' (default), 'sqlite' or 'snapshot'
+        SQLITE_PATH: SQLite database file (default crew_dashboard.db next to this module)
+        SNAPSHOT_DIR: Parquet snapshot store for 'snapshot' (default ./snapshots)
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                kind = os.getenv('STORAGE_BACKEND', 'supabase').lower()
+                if kind == 'sqlite':
+                    _backend = SQLiteBackend()
+                elif kind == 'supabase':
+                    _backend = SupabaseBackend()
+                elif kind == 'snapshot':
+                    from snapshot_store import SnapshotBackend
+                    _backend = SnapshotBackend()
+                else:
+                    raise ValueError(
+                        f"Unknown STORAGE_BACKEND: {kind} (expected 'supabase', 'sqlite' or 'snapshot')"
+                    )
+    return _backend
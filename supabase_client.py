@@ -5,6 +5,8 @@ Works with both local development and Vercel deployment
 """
 
 import os
+import time
+from datetime import datetime
 
 # Try to load dotenv for local development, skip if not available (Vercel)
 try:
@@ -28,6 +30,27 @@ SUPABASE_KEY = os.environ.get("SUPABASE_KEY") or os.getenv("SUPABASE_KEY")
 supabase: Client = None
 _init_error = None
 
+# Flight dates cache - dropped on upload/clear; the TTL covers uploads made
+# through another instance (serverless workers do not share memory)
+DATES_CACHE_TTL = float(os.getenv('DATES_CACHE_TTL_SECONDS', '300'))
+_dates_cache = None
+_dates_cached_at = 0.0
+
+# Default column projections - exactly what DataProcessor.load_from_storage reads
+# (no UUIDs / created_at). Pass columns='*' to a getter for full rows.
+FLIGHT_COLUMNS = 'date,calendar_date,reg,flt,dep,arr,std,sta,crew'
+AC_UTILIZATION_COLUMNS = 'date,ac_type,dom_block,int_block,total_block,dom_cycles,int_cycles,total_cycles,avg_util'
+ROLLING_HOURS_COLUMNS = (
+    'crew_id,name,seniority,block_28day,block_12month,hours_28day,hours_12month,'
+    'percentage,percentage_12m,status,status_12m'
+)
+CREW_SCHEDULE_COLUMNS = 'date,crew_id,status_type'
+STANDBY_COLUMNS = 'crew_id,name,base,status_type,start_date,end_date'
+FACT_ACTUALS_COLUMNS = 'flight_date,flight_no,ac_reg,departure,arrival,std,sta,atd,ata,block_minutes,status'
+LEG_MEMBER_COLUMNS = 'leg_date,flight_no,dep,reg,std,crew_id,crew_name,crew_role'
+ETL_NOTIFICATION_COLUMNS = 'stage,dates,origin,created_at'
+FLIGHT_DATES_COLUMNS = 'date'
+
 def init_supabase():
     """Initialize Supabase client with proper error handling"""
     global supabase, _init_error
@@ -84,12 +107,14 @@ def insert_flights(flights_data: list):
             batch = flights_data[i:i+batch_size]
             client.table('flights').insert(batch).execute()
         
+        refresh_flight_dates()
         return len(flights_data)
     except Exception as e:
         print(f"Error inserting flights: {e}")
+        invalidate_dates_cache()
         return None
 
-def _fetch_all(query):
+def _fetch_all(query, raise_errors=False):
     """Fetch all records using pagination to bypass 1000-row limit"""
     all_data = []
     limit = 1000
@@ -108,36 +133,109 @@ def _fetch_all(query):
                 
             start += limit
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Error in pagination: {e}")
             break
             
     return all_data
 
-def get_flights(filter_date: str = None):
+def to_iso_date(date_str: str):
+    """DD/MM/YY, DD/MM/YYYY or YYYY-MM-DD -> YYYY-MM-DD (None if unparseable)"""
+    for fmt in ('%d/%m/%y', '%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime((date_str or '').strip(), fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+def _fetch_by_date(table: str, date_column: str, text_column: str, filter_date: str = None, columns: str = '*'):
+    """
+    Fetch rows of a table, optionally for one date
+    
+    Filters on the native DATE column (migration_date_columns.sql); databases
+    without it fall back to an exact match on the DD/MM/YY text column.
+    """
+    client = get_client()
+    query = client.table(table).select(columns)
+    if not filter_date:
+        return _fetch_all(query)
+    
+    iso_date = to_iso_date(filter_date)
+    if iso_date:
+        try:
+            return _fetch_all(client.table(table).select(columns).eq(date_column, iso_date), raise_errors=True)
+        except Exception as e:
+            print(f"{table}.{date_column} unavailable, filtering on {text_column}: {e}")
+    return _fetch_all(query.eq(text_column, filter_date))
+
+def get_flights(filter_date: str = None, columns: str = FLIGHT_COLUMNS):
     """Get flights, optionally filtered by date"""
     client = get_client()
     if not client:
         return []
     
     try:
-        query = client.table('flights').select('*')
-        if filter_date:
-            query = query.eq('date', filter_date)
-        
-        # Use pagination helper
-        return _fetch_all(query)
+        return _fetch_by_date('flights', 'op_date', 'date', filter_date, columns)
     except Exception as e:
         print(f"Error getting flights: {e}")
         return []
 
+def invalidate_dates_cache():
+    """Forget cached flight dates (next get_available_dates re-queries)"""
+    global _dates_cache
+    _dates_cache = None
+
+def refresh_flight_dates():
+    """Rebuild the flight_dates catalog after flights changed and drop the local cache"""
+    invalidate_dates_cache()
+    client = get_client()
+    if not client:
+        return False
+    
+    try:
+        client.rpc('refresh_flight_dates').execute()
+        return True
+    except Exception as e:
+        print(f"Error refreshing flight_dates catalog: {e}")
+        return False
+
+def get_flights_range(date_from: str, date_to: str, columns: str = FLIGHT_COLUMNS):
+    """Get flights whose operating date is within [date_from, date_to] (index-backed on op_date)"""
+    client = get_client()
+    if not client:
+        return []
+    
+    iso_from, iso_to = to_iso_date(date_from), to_iso_date(date_to)
+    if not iso_from or not iso_to:
+        print(f"Invalid flight date range: {date_from} - {date_to}")
+        return []
+    
+    try:
+        query = client.table('flights').select(columns).gte('op_date', iso_from).lte('op_date', iso_to).order('op_date')
+        return _fetch_all(query)
+    except Exception as e:
+        print(f"Error getting flights range: {e}")
+        return []
+
 def get_available_dates():
-    """Get list of unique dates from flights"""
+    """Get list of unique dates from flights (cached until the next upload)"""
+    global _dates_cache, _dates_cached_at
     client = get_client()
     if not client:
         return []
     
+    if _dates_cache is not None and time.monotonic() - _dates_cached_at < DATES_CACHE_TTL:
+        return list(_dates_cache)
+    
+    # Distinct dates from the catalog (supabase_views.sql)
+    dates = get_flight_dates()
+    if dates is not None:
+        _dates_cache, _dates_cached_at = dates, time.monotonic()
+        return list(dates)
+    
     try:
-        # Increase limit to check all dates
+        # Fallback: scan the date column of every flight row
         query = client.table('flights').select('date')
         all_data = _fetch_all(query)
         
@@ -155,6 +253,26 @@ def get_available_dates():
         return []
 
 
+# ==================== FLIGHT DATES CATALOG (supabase_views.sql) ====================
+
+def get_flight_dates(columns: str = FLIGHT_DATES_COLUMNS):
+    """
+    Distinct flight dates in chronological order from the flight_dates catalog
+    
+    Returns None (not []) if the catalog is missing so callers can fall back.
+    """
+    client = get_client()
+    if not client:
+        return None
+    
+    try:
+        query = client.table('flight_dates').select(columns).order('sort_key')
+        return [r['date'] for r in _fetch_all(query, raise_errors=True)]
+    except Exception as e:
+        print(f"flight_dates unavailable, falling back to flights scan: {e}")
+        return None
+
+
 # ==================== AC UTILIZATION TABLE ====================
 
 def insert_ac_utilization(util_data: list):
@@ -178,18 +296,14 @@ def insert_ac_utilization(util_data: list):
         print(f"Error inserting AC utilization: {e}")
         return None
 
-def get_ac_utilization(filter_date: str = None):
+def get_ac_utilization(filter_date: str = None, columns: str = AC_UTILIZATION_COLUMNS):
     """Get AC utilization, optionally filtered by date"""
     client = get_client()
     if not client:
         return []
     
     try:
-        query = client.table('ac_utilization').select('*')
-        if filter_date:
-            query = query.eq('date', filter_date)
-        
-        return _fetch_all(query)
+        return _fetch_by_date('ac_utilization', 'util_date', 'date', filter_date, columns)
     except Exception as e:
         print(f"Error getting AC utilization: {e}")
         return []
@@ -218,14 +332,14 @@ def insert_rolling_hours(hours_data: list):
         print(f"Error inserting rolling hours: {e}")
         return None
 
-def get_rolling_hours():
+def get_rolling_hours(columns: str = ROLLING_HOURS_COLUMNS):
     """Get all rolling hours data"""
     client = get_client()
     if not client:
         return []
     
     try:
-        query = client.table('rolling_hours').select('*').order('hours_28day', desc=True)
+        query = client.table('rolling_hours').select(columns).order('hours_28day', desc=True)
         return _fetch_all(query)
     except Exception as e:
         print(f"Error getting rolling hours: {e}")
@@ -255,14 +369,14 @@ def insert_crew_schedule(schedule_data: list):
         print(f"Error inserting crew schedule: {e}")
         return None
 
-def get_crew_schedule(filter_date: str = None):
+def get_crew_schedule(filter_date: str = None, columns: str = CREW_SCHEDULE_COLUMNS):
     """Get crew schedule, optionally filtered by date"""
     client = get_client()
     if not client:
         return []
     
     try:
-        query = client.table('crew_schedule').select('*')
+        query = client.table('crew_schedule').select(columns)
         if filter_date:
             query = query.eq('date', filter_date)
         
@@ -273,7 +387,7 @@ def get_crew_schedule(filter_date: str = None):
 
 def get_crew_schedule_summary(filter_date: str = None):
     """Get summary counts of crew schedule statuses"""
-    data = get_crew_schedule(filter_date)
+    data = get_crew_schedule(filter_date, columns='status_type')
     summary = {'SL': 0, 'CSL': 0, 'SBY': 0, 'OSBY': 0}
     for record in data:
         status = record.get('status_type', '')
@@ -307,7 +421,7 @@ def upsert_standby_records(records: list):
         print(f"Error upserting standby records: {e}")
         return None
 
-def get_standby_records(filter_date: str = None):
+def get_standby_records(filter_date: str = None, columns: str = STANDBY_COLUMNS):
     """Get standby records, filtered by date range
     
     Filter logic: filter_date >= start_date AND filter_date <= end_date
@@ -318,12 +432,21 @@ def get_standby_records(filter_date: str = None):
         return []
     
     try:
-        query = client.table('standby_records').select('*')
+        query = client.table('standby_records').select(columns)
+        if not filter_date:
+            return _fetch_all(query)
         
-        if filter_date:
-            # Filter: start_date <= filter_date AND end_date >= filter_date
-            query = query.lte('start_date', filter_date).gte('end_date', filter_date)
+        # Filter: start_day <= filter_date AND end_day >= filter_date on native
+        # DATE columns (text comparison of DD/MM/YY is lexicographic, not chronological)
+        iso_date = to_iso_date(filter_date)
+        if iso_date:
+            try:
+                ranged = client.table('standby_records').select(columns).lte('start_day', iso_date).gte('end_day', iso_date)
+                return _fetch_all(ranged, raise_errors=True)
+            except Exception as e:
+                print(f"standby_records date columns unavailable, filtering on text: {e}")
         
+        query = query.lte('start_date', filter_date).gte('end_date', filter_date)
         return _fetch_all(query)
     except Exception as e:
         print(f"Error getting standby records: {e}")
@@ -331,7 +454,7 @@ def get_standby_records(filter_date: str = None):
 
 def get_standby_summary(filter_date: str = None):
     """Get summary counts of standby statuses filtered by date range"""
-    data = get_standby_records(filter_date)
+    data = get_standby_records(filter_date, columns='status_type')
     summary = {'SL': 0, 'CSL': 0, 'SBY': 0, 'OSBY': 0}
     for record in data:
         status = record.get('status_type', '')
@@ -379,6 +502,7 @@ def clear_all_data():
             client.table(table).delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
         except:
             pass
+    refresh_flight_dates()
     return True
 
 
@@ -408,6 +532,25 @@ def upsert_fact_actuals(records: list):
         except:
             return None
 
+def get_fact_actuals(dates: list = None, columns: str = FACT_ACTUALS_COLUMNS):
+    """Get flight actuals, optionally limited to a list of flight dates (DD/MM/YY)"""
+    client = get_client()
+    if not client:
+        return []
+    
+    try:
+        if not dates:
+            return _fetch_all(client.table('fact_actuals').select(columns))
+        
+        records = []
+        for i in range(0, len(dates), 50):
+            query = client.table('fact_actuals').select(columns).in_('flight_date', dates[i:i+50])
+            records.extend(_fetch_all(query))
+        return records
+    except Exception as e:
+        print(f"Error getting fact_actuals: {e}")
+        return []
+
 def upsert_dim_crew(records: list):
     """Upsert crew master data from AIMS API"""
     client = get_client()
@@ -440,14 +583,21 @@ def insert_fact_leg_members(records: list):
         print(f"Error inserting fact_leg_members: {e}")
         return None
 
-def get_fact_leg_members(filter_date: str = None):
-    """Get leg members, optionally filtered by date"""
+def get_fact_leg_members(filter_date: str = None, dates: list = None, columns: str = LEG_MEMBER_COLUMNS):
+    """Get leg members, optionally filtered by date or a list of leg dates"""
     client = get_client()
     if not client:
         return []
     
     try:
-        query = client.table('fact_leg_members').select('*')
+        if dates:
+            records = []
+            for i in range(0, len(dates), 50):
+                query = client.table('fact_leg_members').select(columns).in_('leg_date', dates[i:i+50])
+                records.extend(_fetch_all(query))
+            return records
+        
+        query = client.table('fact_leg_members').select(columns)
         if filter_date:
             query = query.eq('leg_date', filter_date)
         
@@ -482,3 +632,34 @@ def get_etl_logs(limit: int = 10):
         print(f"Error getting etl_logs: {e}")
         return []
 
+
+# ==================== ETL NOTIFICATIONS ====================
+
+def insert_etl_notification(notification: dict):
+    """Announce an ETL delta (stage + affected dates) to other processes"""
+    client = get_client()
+    if not client:
+        return None
+    
+    try:
+        result = client.table('etl_notifications').insert(notification).execute()
+        return result.data
+    except Exception as e:
+        print(f"Error inserting etl_notification: {e}")
+        return None
+
+def get_etl_notifications(since: str = None, limit: int = 200, columns: str = ETL_NOTIFICATION_COLUMNS):
+    """Get ETL notifications created after `since` (ISO timestamp), oldest first"""
+    client = get_client()
+    if not client:
+        return []
+    
+    try:
+        query = client.table('etl_notifications').select(columns).order('created_at')
+        if since:
+            query = query.gt('created_at', since)
+        result = query.limit(limit).execute()
+        return result.data if result.data else []
+    except Exception as e:
+        print(f"Error getting etl_notifications: {e}")
+        return []
@@ -4,6 +4,35 @@
 -- Dashboard -> SQL Editor -> New Query -> Paste & Run
 -- =====================================================
 
+-- 0. DATE HELPER
+-- Text dates (DD/MM/YY, DD/MM/YYYY or YYYY-MM-DD) -> DATE, NULL if unparseable.
+-- IMMUTABLE so it can back generated columns and indexes.
+CREATE OR REPLACE FUNCTION parse_dashboard_date(t TEXT)
+RETURNS DATE
+LANGUAGE plpgsql
+IMMUTABLE
+AS $$
+DECLARE
+    m TEXT[];
+BEGIN
+    m := regexp_match(trim(t), '^(\d{1,2})/(\d{1,2})/(\d{2}|\d{4})$');
+    IF m IS NOT NULL THEN
+        RETURN make_date(
+            CASE WHEN length(m[3]) = 2 THEN 2000 + m[3]::INTEGER ELSE m[3]::INTEGER END,
+            m[2]::INTEGER,
+            m[1]::INTEGER
+        );
+    END IF;
+    m := regexp_match(trim(t), '^(\d{4})-(\d{2})-(\d{2})');
+    IF m IS NOT NULL THEN
+        RETURN make_date(m[1]::INTEGER, m[2]::INTEGER, m[3]::INTEGER);
+    END IF;
+    RETURN NULL;
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END
+$$;
+
 -- 1. FLIGHTS TABLE (from DayRepReport CSV)
 CREATE TABLE IF NOT EXISTS flights (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
@@ -16,12 +45,14 @@ CREATE TABLE IF NOT EXISTS flights (
     std TEXT,
     sta TEXT,
     crew TEXT,
+    op_date DATE GENERATED ALWAYS AS (parse_dashboard_date(date)) STORED,
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
 -- Create index for date filtering
 CREATE INDEX IF NOT EXISTS idx_flights_date ON flights(date);
 CREATE INDEX IF NOT EXISTS idx_flights_reg ON flights(reg);
+CREATE INDEX IF NOT EXISTS idx_flights_op_date_reg ON flights(op_date, reg);
 
 -- 2. AC UTILIZATION TABLE (from SacutilReport CSV)
 CREATE TABLE IF NOT EXISTS ac_utilization (
@@ -35,11 +66,13 @@ CREATE TABLE IF NOT EXISTS ac_utilization (
     int_cycles INTEGER DEFAULT 0,
     total_cycles INTEGER DEFAULT 0,
     avg_util TEXT,
+    util_date DATE GENERATED ALWAYS AS (parse_dashboard_date(date)) STORED,
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
 CREATE INDEX IF NOT EXISTS idx_ac_util_date ON ac_utilization(date);
 CREATE INDEX IF NOT EXISTS idx_ac_util_type ON ac_utilization(ac_type);
+CREATE INDEX IF NOT EXISTS idx_ac_util_date_type ON ac_utilization(util_date, ac_type);
 
 -- 3. ROLLING HOURS TABLE (from RolCrTotReport CSV)
 CREATE TABLE IF NOT EXISTS rolling_hours (
@@ -82,6 +115,8 @@ CREATE TABLE IF NOT EXISTS standby_records (
     status_type TEXT NOT NULL,
     start_date TEXT NOT NULL,
     end_date TEXT NOT NULL,
+    start_day DATE GENERATED ALWAYS AS (parse_dashboard_date(start_date)) STORED,
+    end_day DATE GENERATED ALWAYS AS (parse_dashboard_date(end_date)) STORED,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     UNIQUE(crew_id, status_type, start_date)
 );
@@ -90,6 +125,7 @@ CREATE INDEX IF NOT EXISTS idx_standby_crew ON standby_records(crew_id);
 CREATE INDEX IF NOT EXISTS idx_standby_start ON standby_records(start_date);
 CREATE INDEX IF NOT EXISTS idx_standby_end ON standby_records(end_date);
 CREATE INDEX IF NOT EXISTS idx_standby_status ON standby_records(status_type);
+CREATE INDEX IF NOT EXISTS idx_standby_day_range ON standby_records(start_day, end_day);
 
 -- =====================================================
 -- ENABLE ROW LEVEL SECURITY (RLS) - Set to allow all for now
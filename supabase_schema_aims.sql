@@ -73,7 +73,8 @@ CREATE TABLE IF NOT EXISTS fact_leg_members (
     crew_role TEXT,
     source TEXT DEFAULT 'AIMS_API',
     synced_at TIMESTAMPTZ DEFAULT NOW(),
-    created_at TIMESTAMPTZ DEFAULT NOW()
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE(leg_date, flight_no, dep, crew_id)
 );
 
 -- 5. ETL_LOG: Track ETL job runs
@@ -87,6 +88,18 @@ CREATE TABLE IF NOT EXISTS etl_log (
     crew_synced INTEGER DEFAULT 0,
     success BOOLEAN DEFAULT FALSE,
     errors JSONB,
+    stats JSONB,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- 6. ETL_NOTIFICATIONS: Lightweight change feed for dashboard processes
+CREATE TABLE IF NOT EXISTS etl_notifications (
+    id BIGSERIAL PRIMARY KEY,
+    stage TEXT NOT NULL,
+    dates JSONB,
+    upserted INTEGER DEFAULT 0,
+    deleted INTEGER DEFAULT 0,
+    origin TEXT,
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
@@ -100,6 +113,7 @@ CREATE INDEX IF NOT EXISTS idx_fact_roster_crew ON fact_roster(crew_id);
 CREATE INDEX IF NOT EXISTS idx_fact_roster_start ON fact_roster(start_dt);
 CREATE INDEX IF NOT EXISTS idx_fact_leg_date ON fact_leg_members(leg_date);
 CREATE INDEX IF NOT EXISTS idx_etl_log_time ON etl_log(start_time);
+CREATE INDEX IF NOT EXISTS idx_etl_notifications_time ON etl_notifications(created_at);
 
 -- =====================================================
 -- ENABLE ROW LEVEL SECURITY
@@ -109,6 +123,7 @@ ALTER TABLE fact_actuals ENABLE ROW LEVEL SECURITY;
 ALTER TABLE fact_roster ENABLE ROW LEVEL SECURITY;
 ALTER TABLE fact_leg_members ENABLE ROW LEVEL SECURITY;
 ALTER TABLE etl_log ENABLE ROW LEVEL SECURITY;
+ALTER TABLE etl_notifications ENABLE ROW LEVEL SECURITY;
 
 -- RLS Policies (allow all for dashboard)
 DROP POLICY IF EXISTS "Allow all dim_crew" ON dim_crew;
@@ -126,9 +141,12 @@ CREATE POLICY "Allow all fact_leg_members" ON fact_leg_members FOR ALL USING (tr
 DROP POLICY IF EXISTS "Allow all etl_log" ON etl_log;
 CREATE POLICY "Allow all etl_log" ON etl_log FOR ALL USING (true) WITH CHECK (true);
 
+DROP POLICY IF EXISTS "Allow all etl_notifications" ON etl_notifications;
+CREATE POLICY "Allow all etl_notifications" ON etl_notifications FOR ALL USING (true) WITH CHECK (true);
+
 -- =====================================================
 -- VERIFY TABLES CREATED
 -- =====================================================
 SELECT table_name FROM information_schema.tables 
 WHERE table_schema = 'public' 
-AND table_name IN ('dim_crew', 'fact_actuals', 'fact_roster', 'fact_leg_members', 'etl_log');
+AND table_name IN ('dim_crew', 'fact_actuals', 'fact_roster', 'fact_leg_members', 'etl_log', 'etl_notifications');
@@ -0,0 +1,51 @@
+-- =====================================================
+-- SUPABASE VIEWS FOR CREW DASHBOARD
+-- Run after supabase_schema.sql (or migration_date_columns.sql)
+-- in Supabase SQL Editor
+-- Dashboard -> SQL Editor -> New Query -> Paste & Run
+--
+-- Distinct flight dates catalog so the date picker reads a few
+-- hundred rows instead of scanning every flight row.
+-- =====================================================
+
+-- Earlier versions also created per-date aggregate views; nothing reads
+-- them (the dashboard needs per-flight rows for crew and rotation indexes)
+DROP VIEW IF EXISTS v_reg_daily_stats;
+DROP VIEW IF EXISTS v_crew_daily_roles;
+DROP FUNCTION IF EXISTS hhmm_to_minutes(TEXT);
+
+-- FLIGHT DATES CATALOG (distinct dates, chronological sort key)
+-- Materialized so the date picker reads a few hundred rows; refreshed on
+-- ingest by supabase_client.insert_flights via refresh_flight_dates().
+DROP VIEW IF EXISTS v_flight_dates;
+DROP MATERIALIZED VIEW IF EXISTS flight_dates;
+CREATE MATERIALIZED VIEW flight_dates AS
+SELECT
+    date,
+    op_date AS sort_key,
+    COUNT(*)::INTEGER AS flight_count
+FROM flights
+GROUP BY date, op_date;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_flight_dates_date ON flight_dates(date);
+
+CREATE OR REPLACE FUNCTION refresh_flight_dates()
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    REFRESH MATERIALIZED VIEW flight_dates;
+$$;
+
+-- =====================================================
+-- GRANTS
+-- =====================================================
+
+GRANT SELECT ON flight_dates TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION refresh_flight_dates() TO anon, authenticated;
+
+-- =====================================================
+-- VERIFY CATALOG CREATED
+-- =====================================================
+SELECT matviewname FROM pg_matviews WHERE matviewname = 'flight_dates';
@@ -0,0 +1,133 @@
+"""
+Test the AIMS circuit breaker / token bucket state machine and resilient_call
+"""
+
+import sys
+import time
+sys.path.insert(0, '.')
+
+import aims_resilience
+from aims_resilience import CircuitBreaker, CircuitOpenError, TokenBucket, resilient_call
+
+
+def expect_open(breaker):
+    try:
+        breaker.before_call()
+    except CircuitOpenError:
+        return
+    raise AssertionError(f"{breaker.operation}: call was not rejected")
+
+
+def test_breaker_state_machine():
+    print("Testing circuit breaker transitions...")
+    breaker = CircuitBreaker('TestOp', failure_threshold=3, recovery_timeout=0.2)
+
+    # closed: failures below the threshold keep it closed, a success resets the count
+    breaker.record_failure(TimeoutError('t1'))
+    breaker.record_failure(TimeoutError('t2'))
+    assert breaker.get_state()['state'] == CircuitBreaker.CLOSED
+    breaker.record_success()
+    assert breaker.get_state()['consecutive_failures'] == 0
+
+    # closed -> open on the threshold, calls are rejected while open
+    for i in range(3):
+        breaker.record_failure(TimeoutError(f't{i}'))
+    assert breaker.is_open()
+    expect_open(breaker)
+    assert breaker.get_state()['total_rejected'] == 1
+
+    # open -> half_open after recovery_timeout: exactly one probe goes through
+    time.sleep(0.25)
+    breaker.before_call()
+    assert breaker.get_state()['state'] == CircuitBreaker.HALF_OPEN
+    expect_open(breaker)
+
+    # failed probe -> open again
+    breaker.record_failure(TimeoutError('probe'))
+    assert breaker.is_open()
+
+    # cancelled probe frees the slot without changing state
+    time.sleep(0.25)
+    breaker.before_call()
+    breaker.cancel_probe()
+    breaker.before_call()
+
+    # successful probe -> closed
+    breaker.record_success()
+    assert breaker.get_state()['state'] == CircuitBreaker.CLOSED
+    breaker.before_call()
+    print("SUCCESS: closed -> open -> half_open -> open/closed")
+
+
+def test_token_bucket():
+    print("Testing token bucket...")
+    bucket = TokenBucket(rate_per_sec=20, capacity=3)
+
+    # the burst is served immediately
+    start = time.monotonic()
+    for _ in range(3):
+        assert bucket.acquire(timeout=0)
+    assert time.monotonic() - start < 0.05
+
+    # empty bucket: a zero timeout fails, a long enough one waits for the refill
+    assert not bucket.acquire(timeout=0)
+    start = time.monotonic()
+    assert bucket.acquire(timeout=1)
+    waited = time.monotonic() - start
+    assert 0.02 <= waited < 0.5, f"waited {waited:.3f}s"
+
+    state = bucket.get_state()
+    assert state['total_acquired'] == 4
+    assert state['available_tokens'] <= 3
+    print("SUCCESS: burst, timeout and refill behave")
+
+
+def test_resilient_call():
+    print("Testing resilient_call...")
+    aims_resilience._rate_limiter = TokenBucket(rate_per_sec=1000, capacity=100)
+    calls = []
+
+    @resilient_call('TestRetry', max_retries=3, base_delay=0.001, max_delay=0.01)
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise TimeoutError('timeout')
+        return 'ok'
+
+    # retryable errors are retried until success
+    assert flaky() == 'ok'
+    assert len(calls) == 3
+    assert aims_resilience.get_circuit_breaker('TestRetry').get_state()['state'] == CircuitBreaker.CLOSED
+
+    # a local fatal error is not retried and does not count as liveness
+    breaker = aims_resilience.get_circuit_breaker('TestFatal')
+    breaker.recovery_timeout = 0.05
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(TimeoutError('down'))
+    time.sleep(0.1)
+    fatal_calls = []
+
+    @resilient_call('TestFatal', max_retries=3)
+    def broken():
+        fatal_calls.append(1)
+        raise ValueError('cannot parse response')
+
+    try:
+        broken()
+        raise AssertionError("ValueError not raised")
+    except ValueError:
+        pass
+    assert len(fatal_calls) == 1
+    state = breaker.get_state()
+    assert state['state'] == CircuitBreaker.HALF_OPEN, state
+    assert state['consecutive_failures'] == breaker.failure_threshold
+    # the probe slot was released
+    breaker.before_call()
+    breaker.cancel_probe()
+    print("SUCCESS: retries retryable errors, fatal errors leave the breaker alone")
+
+
+if __name__ == "__main__":
+    test_breaker_state_machine()
+    test_token_bucket()
+    test_resilient_call()
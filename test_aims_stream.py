@@ -0,0 +1,116 @@
+"""
+Test the streamed FlightDetailsForPeriod parser against the zeep path,
+using the local AIMS stub server
+"""
+
+import io
+import sys
+from datetime import datetime, timedelta
+sys.path.insert(0, '.')
+
+import aims_resilience
+from aims_resilience import TokenBucket
+from aims_soap_client import AIMSSoapClient
+from aims_stub_server import start_stub_server
+
+
+def make_client(server):
+    aims_resilience._rate_limiter = TokenBucket(rate_per_sec=1000, capacity=100)
+    return AIMSSoapClient(wsdl_url=server.url + '?singlewsdl', username='test', password='test')
+
+
+def test_stream_matches_zeep():
+    print("Testing streamed flights against get_flight_details...")
+    server = start_stub_server(aircraft=3, crew=60)
+    try:
+        client = make_client(server)
+        from_date = datetime.now() - timedelta(days=2)
+        to_date = datetime.now() + timedelta(days=1)
+
+        expected = client.get_flight_details(from_date, to_date)
+        streamed = client.get_flight_details_stream(from_date, to_date)
+        assert expected['success'] and streamed['success']
+        flights = list(streamed['flights'])
+        assert expected['count'] > 0
+        assert flights == expected['flights'], (flights[:1], expected['flights'][:1])
+
+        # the stub types FlightDD/MM/YY as int: both paths must coerce them the same way
+        elements = client._get_flight_item_elements()
+        assert elements['FlightDD'].type.name == 'int'
+        print(f"SUCCESS: {len(flights)} streamed flights identical to zeep output")
+    finally:
+        server.shutdown()
+
+
+def test_stream_fault_matches_zeep():
+    print("Testing SOAP Fault handling...")
+    server = start_stub_server(aircraft=1, crew=6)
+    try:
+        client = make_client(server)
+        server.config.update({'fault_rate': '1'})
+        day = datetime.now()
+
+        expected = client.get_flight_details(day, day)
+        streamed = client.get_flight_details_stream(day, day)
+        assert expected['success'] is False and streamed['success'] is False
+        assert streamed['error'] == expected['error']
+        assert list(streamed['flights']) == []
+        print("SUCCESS: both paths return success=False with the fault string")
+    finally:
+        server.shutdown()
+
+
+class TruncatedResponse:
+    """Stand-in for a requests response whose body stops mid-envelope"""
+
+    def __init__(self, body: bytes):
+        self.raw = io.BytesIO(body)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_mid_stream_failure_counts_on_breaker():
+    print("Testing mid-stream failure accounting...")
+    server = start_stub_server(aircraft=1, crew=6)
+    try:
+        client = make_client(server)
+        client._init_client()
+        breaker = aims_resilience.get_circuit_breaker('FlightDetailsForPeriod')
+        breaker.record_success()
+
+        body = (
+            '<?xml version="1.0" encoding="utf-8"?>'
+            '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+            '<FlightDetailsForPeriodResponse xmlns="http://tempuri.org/"><FlightDetailsForPeriodResult>'
+            '<FlightList><TAIMSFlight><FlightDD>01</FlightDD><FlightMM>02</FlightMM><FlightYY>26</FlightYY>'
+            '<FlightNo>100</FlightNo></TAIMSFlight><TAIMSFlight><FlightDD>0'
+        ).encode('utf-8')
+        response = TruncatedResponse(body)
+        day = datetime.now()
+
+        received = []
+        try:
+            for flight in client._stream_flights(response, day, day):
+                received.append(flight)
+            raise AssertionError("truncated body did not raise")
+        except AssertionError:
+            raise
+        except Exception:
+            pass
+
+        assert len(received) == 1
+        assert received[0]['flight_date'] == '1/2/26'
+        assert response.closed
+        assert breaker.get_state()['consecutive_failures'] == 1
+        breaker.record_success()
+        print("SUCCESS: a body cut off mid-way is recorded as a breaker failure")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_stream_matches_zeep()
+    test_stream_fault_matches_zeep()
+    test_mid_stream_failure_counts_on_breaker()
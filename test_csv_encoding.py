@@ -0,0 +1,64 @@
+"""
+Test encoding detection and single-pass decoding of AIMS CSV exports
+"""
+
+import codecs
+import sys
+sys.path.insert(0, '.')
+
+from csv_encoding import SNIFF_BYTES, decode_bytes, detect_encoding, read_text
+
+TEXT = "ID,Name,Séniority\n1234,NGUYỄN VĂN A,0\n"
+
+
+def test_boms():
+    print("Testing BOM detection...")
+    for codec, bom in (('utf-8', codecs.BOM_UTF8), ('utf-16-le', codecs.BOM_UTF16_LE),
+                       ('utf-16-be', codecs.BOM_UTF16_BE), ('utf-32-le', codecs.BOM_UTF32_LE),
+                       ('utf-32-be', codecs.BOM_UTF32_BE)):
+        data = bom + TEXT.encode(codec)
+        assert detect_encoding(data) == (codec, len(bom)), (codec, detect_encoding(data))
+        assert decode_bytes(data) == TEXT, codec
+    print("SUCCESS: BOMs detected (utf-32-le not taken for utf-16-le) and stripped")
+
+
+def test_plain_encodings():
+    print("Testing utf-8 / cp1252 without BOM...")
+    assert detect_encoding(TEXT.encode('utf-8')) == ('utf-8', 0)
+    assert decode_bytes(TEXT.encode('utf-8')) == TEXT
+
+    latin = "ID,Name,Séniority\n1234,TEST PILOT,0\n"
+    assert detect_encoding(latin.encode('cp1252')) == ('cp1252', 0)
+    assert decode_bytes(latin.encode('cp1252')) == latin
+    assert decode_bytes(latin) == latin
+    print("SUCCESS: utf-8 and cp1252 decoded")
+
+
+def test_stray_byte_after_sample():
+    print("Testing stray cp1252 byte past the sniffed prefix...")
+    data = b'a' * SNIFF_BYTES + 'é'.encode('cp1252') + 'ñ'.encode('utf-8')
+    assert detect_encoding(data) == ('utf-8', 0)
+    text = decode_bytes(data)
+    assert text.endswith('éñ'), text[-5:]
+
+    # utf-8 character cut by the sample boundary is still utf-8
+    data = b'a' * (SNIFF_BYTES - 1) + 'ễ'.encode('utf-8')
+    assert detect_encoding(data) == ('utf-8', 0)
+    assert decode_bytes(data).endswith('ễ')
+    print("SUCCESS: no second decode pass needed")
+
+
+def test_read_text():
+    print("Testing read_text...")
+    assert read_text(None) is None
+    assert read_text('does-not-exist.csv') is None
+    text = read_text('RolCrTotReport.csv')
+    assert text and not text.startswith('﻿')
+    print("SUCCESS: read_text handles missing files and strips BOM")
+
+
+if __name__ == "__main__":
+    test_boms()
+    test_plain_encodings()
+    test_stray_byte_after_sample()
+    test_read_text()
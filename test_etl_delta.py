@@ -0,0 +1,110 @@
+"""
+Test that ETL deltas (apply_etl_delta) reach the flight and leg-member indexes
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from data_processor import DataProcessor
+
+DAY = '15/01/26'
+
+
+def make_processor():
+    """Processor holding one DayRep flight (crew from the crew string)"""
+    processor = DataProcessor()
+    flight = {
+        'date': DAY, 'calendar_date': DAY, 'reg': 'VN-A500', 'flt': '100',
+        'dep': 'SGN', 'arr': 'HAN', 'std': '08:00', 'sta': '10:00',
+        'crew': '-NGUYEN AN(CP) 1001 -TRAN BINH(FO) 1002'
+    }
+    processor.flights = [flight]
+    processor.flights_by_date = {DAY: [flight]}
+    processor._reindex_dates({DAY})
+    return processor
+
+
+def actual(flight_no, reg, std, sta, flight_date=DAY):
+    return {
+        'flight_date': flight_date, 'flight_no': flight_no, 'ac_reg': reg,
+        'departure': 'SGN', 'arrival': 'DAD', 'std': std, 'sta': sta
+    }
+
+
+def test_flight_upserts_and_deletes():
+    print("Testing fact_actuals deltas...")
+    processor = make_processor()
+    old_flights = processor.flights
+    assert processor.reg_flight_hours['VN-A500'] == 2.0
+
+    # changed AIMS row for the DayRep flight: AIMS values win, the crew is kept
+    affected = processor.apply_etl_delta('flights', [actual('VJ100', 'VN-A500', '08:00', '11:00')], [])
+    assert affected == {DAY}
+    flight = processor.flights_by_date[DAY][0]
+    assert flight['sta'] == '11:00' and '1001' in flight['crew']
+    assert processor.reg_flight_hours['VN-A500'] == 3.0
+    assert processor.crew_to_regs['1001'] == {'VN-A500'}
+    # published flight dicts are not edited in place
+    assert old_flights[0]['sta'] == '10:00' and processor.flights is not old_flights
+
+    # new flight, one departing after midnight belongs to the previous operating day
+    processor.apply_etl_delta('flights', [
+        actual('VJ200', 'VN-A501', '12:00', '13:30'),
+        actual('VJ300', 'VN-A502', '01:00', '02:00', flight_date='16/01/26'),
+    ], [])
+    assert sorted(f['flt'] for f in processor.flights_by_date[DAY]) == ['100', 'VJ200', 'VJ300']
+    assert processor.reg_flight_count['VN-A501'] == 1
+    assert processor.reg_flight_hours_by_date[DAY]['VN-A502'] == 1.0
+
+    # deletes drop the flight and everything indexed from it
+    affected = processor.apply_etl_delta('flights', [], [(DAY, 'VJ100'), ('16/01/26', 'VJ300')])
+    assert affected == {DAY}
+    assert [f['flt'] for f in processor.flights_by_date[DAY]] == ['VJ200']
+    assert 'VN-A500' not in processor.reg_flight_hours and 'VN-A502' not in processor.reg_flight_count
+    assert '1001' not in processor.crew_to_regs
+    assert processor.available_dates == [DAY]
+
+    processor.apply_etl_delta('flights', [], [(DAY, 'VJ200')])
+    assert DAY not in processor.available_dates and not processor.flights
+    print("SUCCESS: flight upserts and deletes update flights_by_date and the totals")
+
+
+def leg_row(crew_id, role, flight_no='VJ100', reg='VN-A500'):
+    return {
+        'leg_date': DAY, 'flight_no': flight_no, 'dep': 'SGN', 'reg': reg, 'std': '08:00',
+        'crew_id': crew_id, 'crew_role': role, 'crew_name': f"CREW {crew_id}"
+    }
+
+
+def test_leg_member_upserts_and_deletes():
+    print("Testing fact_leg_members deltas...")
+    processor = make_processor()
+
+    # leg members replace the crew string of their flight
+    affected = processor.apply_etl_delta('leg_members', [leg_row('2001', 'CP'), leg_row('2002', 'FO')], [])
+    assert affected == {DAY}
+    flight = processor.flights_by_date[DAY][0]
+    assert sorted(processor._flight_crew(flight)) == [('CP', '2001'), ('FO', '2002')]
+    assert sorted(processor.crew_to_regs_by_date[DAY]) == ['2001', '2002']
+    assert processor.crew_roles['2002'] == 'FO'
+    assert processor.crew_name_map['2001'] == 'CREW 2001'
+
+    # a leg without a matching DayRep flight still indexes its crew on the REG
+    processor.apply_etl_delta('leg_members', [leg_row('3001', 'CP', flight_no='VJ900', reg='VN-A509')], [])
+    assert processor.crew_to_regs['3001'] == {'VN-A509'}
+
+    # deleting a crew member removes them; deleting the last one drops the leg
+    processor.apply_etl_delta('leg_members', [], [(DAY, 'VJ100', 'SGN', '2002')])
+    assert processor._flight_crew(flight) == [('CP', '2001')]
+    assert '2002' not in processor.crew_to_regs
+    processor.apply_etl_delta('leg_members', [], [(DAY, 'VJ100', 'SGN', '2001')])
+    assert processor._flight_leg(flight) is None
+
+    # without leg members the flight falls back to its crew string
+    assert sorted(processor.crew_to_regs_by_date[DAY]) == ['1001', '1002', '3001']
+    print("SUCCESS: leg member upserts and deletes update the crew indexes")
+
+
+if __name__ == "__main__":
+    test_flight_upserts_and_deletes()
+    test_leg_member_upserts_and_deletes()
@@ -0,0 +1,276 @@
+"""
+Test the ETL stage pipeline, BatchWriter and stage ordering with fake
+AIMS and Supabase clients
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+from datetime import datetime, timedelta
+sys.path.insert(0, '.')
+
+import supabase_client
+from etl_scheduler import ETL_TIERS, BatchWriter, ChangeTracker, ETLRunLock, ETLScheduler
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.filters = []
+
+    def upsert(self, records, on_conflict=None):
+        self.client.log('upsert', self.table, [dict(r) for r in records])
+        return self
+
+    def insert(self, records):
+        self.client.log('insert', self.table, records)
+        return self
+
+    def delete(self):
+        self.op = 'delete'
+        return self
+
+    def eq(self, field, value):
+        self.filters.append((field, [value]))
+        return self
+
+    def in_(self, field, values):
+        self.filters.append((field, list(values)))
+        return self
+
+    def execute(self):
+        if getattr(self, 'op', None) == 'delete':
+            self.client.log('delete', self.table, self.filters)
+        return self
+
+
+class FakeSupabase:
+    """Records every write as (op, table, payload) in call order"""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def log(self, op, table, payload):
+        with self._lock:
+            self.calls.append((op, table, payload))
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rows(self, op, table):
+        return [row for o, t, payload in self.calls if o == op and t == table for row in payload]
+
+
+def day_text(offset, fmt='%d/%m/%y'):
+    return (datetime.now() + timedelta(days=offset)).strftime(fmt)
+
+
+class FakeAIMS:
+    """AIMS client returning fixed data; crew_delay slows GetCrewList down"""
+
+    stream_flights = False
+
+    def __init__(self, flights=None, crew_delay=0.0):
+        self.flights = flights if flights is not None else [
+            {'flight_date': day_text(0), 'flight_no': 'VJ100', 'ac_reg': 'VN-A500',
+             'departure': 'SGN', 'arrival': 'HAN', 'std': '08:00', 'sta': '10:00'},
+            {'flight_date': day_text(1), 'flight_no': 'VJ200', 'ac_reg': 'VN-A501',
+             'departure': 'HAN', 'arrival': 'DAD', 'std': '09:00', 'sta': '10:20'},
+        ]
+        self.crew_delay = crew_delay
+
+    def get_optimized_date_range(self):
+        now = datetime.now()
+        return now - timedelta(days=30), now + timedelta(days=30)
+
+    def get_flight_details(self, from_date, to_date):
+        return {'success': True, 'flights': list(self.flights), 'error': None}
+
+    def get_crew_list(self, from_date, to_date):
+        time.sleep(self.crew_delay)
+        return {'success': True, 'crew_list': [
+            {'crew_id': '1001', 'name': 'NGUYEN AN', 'short_name': 'AN'},
+            {'crew_id': '1002', 'name': 'TRAN BINH', 'short_name': 'BINH'},
+        ]}
+
+    def fetch_crew_quals(self, crew_id):
+        return {'success': True, 'crew': [
+            {'crew_id': '1001', 'name': 'NGUYEN AN', 'qualifications': 'A320'},
+            {'crew_id': '1002', 'name': 'TRAN BINH', 'qualifications': 'A321'},
+        ]}
+
+    def fetch_leg_members_per_day(self, day):
+        if day.date() != datetime.now().date():
+            return {'success': True, 'legs': []}
+        return {'success': True, 'legs': [{
+            'date': day.strftime('%d/%m/%Y'), 'flight_no': 'VJ100', 'reg': 'VN-A500',
+            'dep': 'SGN', 'arr': 'HAN', 'std': '08:00', 'sta': '10:00',
+            'crew': [{'id': '1001', 'name': 'NGUYEN AN', 'role': 'CP'}],
+        }]}
+
+
+def make_scheduler(aims):
+    scheduler = ETLScheduler(tiered=False, batch_size=2, leg_member_workers=2)
+    scheduler._get_aims_client = lambda: aims
+    return scheduler
+
+
+def run_with_fake_supabase(scheduler, tier=None):
+    fake = FakeSupabase()
+    supabase_client.supabase = fake
+    try:
+        return scheduler._execute_etl_run(tier), fake
+    finally:
+        supabase_client.supabase = None
+
+
+def test_stage_pipeline():
+    print("Testing fetch -> transform -> write of every stage...")
+    aims = FakeAIMS()
+    scheduler = make_scheduler(aims)
+
+    result, fake = run_with_fake_supabase(scheduler)
+    assert result['success'], result['errors']
+    assert set(result['stages']) == {'flights', 'crew', 'leg_members', 'quals'}
+    assert result['flights_synced'] == 2 and result['leg_members_synced'] == 1
+    assert result['changes']['inserted'] == 2 + 2 + 1 + 2
+    assert sorted(r['flight_no'] for r in fake.rows('upsert', 'fact_actuals')) == ['VJ100', 'VJ200']
+    assert [r['crew_id'] for r in fake.rows('upsert', 'fact_leg_members')] == ['1001']
+
+    # unchanged data: nothing is written again
+    result, fake = run_with_fake_supabase(scheduler)
+    assert result['success'], result['errors']
+    assert result['changes']['unchanged'] == 7 and result['changes']['inserted'] == 0
+    assert not [call for call in fake.calls if call[0] == 'upsert']
+
+    # a flight gone from the fetched window is deleted, a changed one rewritten
+    aims.flights = [dict(aims.flights[0], sta='10:15')]
+    result, fake = run_with_fake_supabase(scheduler)
+    stats = result['stages']['flights']
+    assert (stats['changed'], stats['deleted']) == (1, 1), stats
+    assert [r['sta'] for r in fake.rows('upsert', 'fact_actuals')] == ['10:15']
+    deletes = [payload for op, table, payload in fake.calls if op == 'delete' and table == 'fact_actuals']
+    assert deletes == [[('flight_date', [day_text(1)]), ('flight_no', ['VJ200'])]], deletes
+    print("SUCCESS: stages write inserts, skip unchanged rows and delete vanished keys")
+
+
+def test_batch_writer_flush_and_shutdown():
+    print("Testing BatchWriter batching, dedup and close...")
+    fake = FakeSupabase()
+    tracker = ChangeTracker(['crew_id'])
+    writes = []
+
+    def write(client, table, records, on_conflict):
+        writes.append([r['crew_id'] for r in records])
+        return True
+
+    writer = BatchWriter(fake, 'dim_crew', 'crew_id', write, batch_size=3, tracker=tracker, collect=True)
+    for crew_id, name in [('1', 'a'), ('2', 'b'), ('1', 'c'), ('3', 'd'), ('4', 'e'), ('5', 'f'), ('6', 'g')]:
+        writer.put({'crew_id': crew_id, 'name': name}, digest=f"h{crew_id}{name}")
+    stats = writer.close()
+
+    # full batches are flushed as they fill, the remainder on close; duplicate keys collapse to the last
+    assert writes == [['1', '2'], ['3', '4', '5'], ['6']], writes
+    assert stats['batches'] == 3 and stats['written'] == 6 and stats['failed_batches'] == 0
+    assert [r['name'] for r in writer.applied][:2] == ['c', 'b']
+    assert tracker.get(('1',)) == 'h1c' and len(tracker) == 6
+    assert not writer._thread.is_alive()
+
+    # a failed batch is counted and not committed to the tracker
+    tracker = ChangeTracker(['crew_id'])
+    writer = BatchWriter(fake, 'dim_crew', 'crew_id', lambda *args: False, batch_size=2, tracker=tracker)
+    writer.put({'crew_id': '1'}, digest='x')
+    stats = writer.close()
+    assert stats['failed_batches'] == 1 and stats['written'] == 0 and len(tracker) == 0
+
+    # no Supabase client: records are drained without writing
+    writer = BatchWriter(None, 'dim_crew', 'crew_id', write, batch_size=2)
+    writer.put({'crew_id': '9'})
+    assert writer.close()['batches'] == 0
+    print("SUCCESS: batches flush at batch_size and on close, failures are not tracked")
+
+
+def test_change_tracker():
+    print("Testing ChangeTracker change detection...")
+    tracker = ChangeTracker(['flight_date', 'flight_no'])
+    row = {'flight_date': '15/01/26', 'flight_no': 'VJ100', 'sta': '10:00', 'synced_at': 'a'}
+    other = {'flight_date': '16/01/26', 'flight_no': 'VJ200', 'sta': '11:00', 'synced_at': 'a'}
+    key = tracker.key(row)
+    assert key == ('15/01/26', 'VJ100')
+    assert tracker.get(key) is None
+
+    tracker.commit([(key, tracker.digest(row)), (tracker.key(other), tracker.digest(other))])
+
+    # unchanged: only the ETL timestamp differs
+    assert tracker.digest(dict(row, synced_at='b')) == tracker.get(key)
+    # changed: any other column differs
+    assert tracker.digest(dict(row, sta='10:15')) != tracker.get(key)
+
+    # deleted: known keys not seen this run, limited to the fetched scope
+    assert tracker.stale_keys({key}) == [('16/01/26', 'VJ200')]
+    assert tracker.stale_keys({key}, in_scope=lambda k: k[0] == '15/01/26') == []
+    assert tracker.stale_keys({key, tracker.key(other)}) == []
+    tracker.forget([tracker.key(other)])
+    assert len(tracker) == 1 and tracker.stale_keys(set()) == [key]
+    print("SUCCESS: unchanged, changed and deleted rows are told apart")
+
+
+def test_quals_after_crew():
+    print("Testing that the quals stage writes after the crew stage...")
+    scheduler = make_scheduler(FakeAIMS(crew_delay=0.3))
+
+    result, fake = run_with_fake_supabase(scheduler)
+    assert result['success'], result['errors']
+    crew_writes = [i for i, (op, table, payload) in enumerate(fake.calls)
+                   if table == 'dim_crew' and 'qualifications' not in payload[0]]
+    qual_writes = [i for i, (op, table, payload) in enumerate(fake.calls)
+                   if table == 'dim_crew' and 'qualifications' in payload[0]]
+    assert crew_writes and qual_writes
+    assert max(crew_writes) < min(qual_writes), fake.calls
+    print("SUCCESS: dim_crew qualifications land after the crew rows")
+
+
+def test_run_lock_skips_concurrent_run():
+    print("Testing that a run is skipped while its lock is held...")
+    lock_path = os.path.join(tempfile.mkdtemp(), 'aims_etl.lock')
+    scheduler = ETLScheduler(tiered=True)
+    scheduler.run_locks = {name: ETLRunLock(lock_path, name=name) for name in ETL_TIERS}
+    executed = []
+    scheduler._execute_etl_run = lambda tier=None: executed.append(tier) or {
+        'success': True, 'tier': tier, 'start_time': datetime.now().isoformat()
+    }
+
+    # another process (separate open file) holds the "rest" lock
+    holder = ETLRunLock(lock_path, name='rest')
+    assert holder.acquire()
+    try:
+        skipped = scheduler.run_etl_job('rest')
+        assert skipped['skipped'] and not skipped['success']
+        assert scheduler.tier_status['rest']['skipped_runs'] == 1
+        # a full run needs every tier lock
+        assert scheduler.run_etl_job()['skipped']
+        # other tiers are not blocked
+        assert scheduler.run_etl_job('near')['success']
+        assert executed == ['near']
+        assert scheduler.skipped_runs == 2
+        # the partially acquired locks of the skipped full run were released
+        assert scheduler.run_locks['near'].acquire()
+        scheduler.run_locks['near'].release()
+    finally:
+        holder.release()
+
+    assert scheduler.run_etl_job('rest')['success']
+    assert executed == ['near', 'rest']
+    print("SUCCESS: held tier lock skips its runs and full runs only")
+
+
+if __name__ == "__main__":
+    test_stage_pipeline()
+    test_batch_writer_flush_and_shutdown()
+    test_change_tracker()
+    test_quals_after_crew()
+    test_run_lock_skips_concurrent_run()
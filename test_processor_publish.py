@@ -0,0 +1,97 @@
+"""
+Test copy-on-write publishing of the dataset (fork / update_processor)
+"""
+
+import sys
+import threading
+sys.path.insert(0, '.')
+
+import data_processor
+from data_processor import DataProcessor, get_processor, update_processor
+
+DAY = '15/01/26'
+
+
+def actual(flight_no, reg, sta):
+    return {
+        'flight_date': DAY, 'flight_no': flight_no, 'ac_reg': reg,
+        'departure': 'SGN', 'arrival': 'HAN', 'std': '08:00', 'sta': sta
+    }
+
+
+def publish_test_dataset():
+    """Publish a small dataset in place of the default one; returns the previous one"""
+    processor = DataProcessor()
+    data_processor._live_processors.discard(processor)
+    processor.apply_etl_delta('flights', [actual('VJ100', 'VN-A500', '10:00')], [])
+    processor.version = next(data_processor._dataset_versions)
+    previous, data_processor._processor = data_processor._processor, processor
+    return processor, previous
+
+
+def test_failed_update_leaves_published_untouched():
+    print("Testing that a failed update publishes nothing...")
+    published, previous = publish_test_dataset()
+    try:
+        def mutate(draft):
+            draft.apply_etl_delta('flights', [actual('VJ100', 'VN-A500', '12:00'),
+                                              actual('VJ200', 'VN-A501', '11:00')], [])
+            raise RuntimeError('ingest failed half way')
+
+        try:
+            update_processor(mutate)
+            raise AssertionError("update_processor swallowed the error")
+        except RuntimeError:
+            pass
+
+        assert get_processor() is published
+        assert [f['sta'] for f in published.flights] == ['10:00']
+        assert [f['flt'] for f in published.flights_by_date[DAY]] == ['VJ100']
+        assert dict(published.reg_flight_hours) == {'VN-A500': 2.0}
+        assert 'VN-A501' not in published.reg_flight_count_by_date[DAY]
+        print("SUCCESS: the published dataset is unchanged after a failed mutate")
+    finally:
+        data_processor._processor = previous
+
+
+def test_reader_keeps_snapshot_during_swap():
+    print("Testing that readers keep their snapshot while a writer publishes...")
+    published, previous = publish_test_dataset()
+    mutated, release = threading.Event(), threading.Event()
+    try:
+        def mutate(draft):
+            draft.apply_etl_delta('flights', [actual('VJ100', 'VN-A500', '12:00')], [])
+            mutated.set()
+            assert release.wait(5)
+            return draft
+
+        reader_view = get_processor()
+        results = []
+        writer = threading.Thread(target=lambda: results.append(update_processor(mutate)))
+        writer.start()
+        assert mutated.wait(5)
+
+        # mid-update (publish lock held): readers are not blocked and see the old dataset
+        seen = []
+        reader = threading.Thread(target=lambda: seen.append(get_processor()))
+        reader.start()
+        reader.join(2)
+        assert seen == [published]
+        assert reader_view.flights[0]['sta'] == '10:00'
+
+        release.set()
+        writer.join(5)
+        new = get_processor()
+        assert new is results[0] and new is not published and new.version > published.version
+        assert new.flights[0]['sta'] == '12:00' and new.reg_flight_hours['VN-A500'] == 4.0
+        # the reference a reader took before the swap still holds the old data
+        assert reader_view.flights[0]['sta'] == '10:00' and reader_view.reg_flight_hours['VN-A500'] == 2.0
+        print("SUCCESS: the swap is a single reference change, old snapshots stay intact")
+    finally:
+        release.set()
+        data_processor._processor = previous
+
+
+if __name__ == "__main__":
+    test_failed_update_leaves_published_untouched()
+    test_reader_keeps_snapshot_during_swap()
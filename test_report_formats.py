@@ -0,0 +1,170 @@
+"""
+Test header detection of the report format registry on the sample CSVs
+"""
+
+import csv
+import sys
+from collections import Counter
+from datetime import date, timedelta
+sys.path.insert(0, '.')
+
+from csv_encoding import read_text
+from report_formats import REPORT_FORMATS, classify_duty_code, detect_report, duty_runs, find_report_header
+
+# file -> (report, format name, header row index)
+SAMPLES = {
+    'DayRepReport15Jan2026.csv': ('dayrep', 'dayrep', 2),
+    'SacutilReport1.csv': ('sacutil', 'sacutil', 2),
+    'RolCrTotReport.csv': ('rolcrtot', 'rolcrtot', 0),
+    'Crew schedule 01-28Feb(standby,callsick, fatigue).csv': ('crew_schedule', 'crew_schedule_matrix', 3),
+    'Crew schedule 15Jan(standby,callsick, fatigue).csv': ('crew_schedule', 'crew_schedule', 1),
+}
+
+
+def read_rows(file_name):
+    return list(csv.reader(read_text(file_name).splitlines()))
+
+
+def test_sample_reports():
+    print("Testing report detection on sample CSVs...")
+    for file_name, (report, format_name, header_row) in SAMPLES.items():
+        rows = read_rows(file_name)
+        detected = detect_report(iter(rows))
+        fmt, index, col_map = find_report_header(report, rows)
+        print(f"  {file_name}: {detected} / {fmt.name if fmt else None} at row {index}")
+        assert detected == report, f"{file_name}: detected {detected}, expected {report}"
+        assert fmt is not None and fmt.name == format_name, f"{file_name}: format {fmt and fmt.name}"
+        assert index == header_row, f"{file_name}: header at row {index}, expected {header_row}"
+        assert fmt.match_header(rows[index], rows, index) == col_map
+    print("SUCCESS: every sample CSV maps to its report and header row")
+
+
+def test_sample_columns():
+    print("Testing resolved columns...")
+    rows = read_rows('DayRepReport15Jan2026.csv')
+    _, _, col_map = find_report_header('dayrep', rows)
+    assert (col_map['date'], col_map['reg'], col_map['flt'], col_map['std'], col_map['sta']) == (0, 1, 2, 5, 6)
+    assert col_map['crew'] == 14
+
+    rows = read_rows('SacutilReport1.csv')
+    _, _, col_map = find_report_header('sacutil', rows)
+    assert (col_map['date'], col_map['ac'], col_map['total_block'], col_map['avg_util']) == (0, 1, 4, 11)
+
+    rows = read_rows('RolCrTotReport.csv')
+    _, _, col_map = find_report_header('rolcrtot', rows)
+    # 28-Day(s) / 12-Month(s) sit one row below the ID,Name,Seniority header
+    assert (col_map['block_28day'], col_map['block_12month']) == (3, 4)
+
+    rows = read_rows('Crew schedule 01-28Feb(standby,callsick, fatigue).csv')
+    _, _, col_map = find_report_header('crew_schedule', rows)
+    assert len(col_map['days']) == 28, f"{len(col_map['days'])} day columns"
+    print("SUCCESS: column indices resolved from the headers")
+
+
+def test_sta_does_not_match_status():
+    print("Testing full-match of 'sta' against 'status'...")
+    dayrep = REPORT_FORMATS['dayrep']
+
+    # STATUS before STA: a prefix match would map sta to the STATUS column
+    row = ['Date', 'Reg', 'Flt', 'Dep', 'Arr', 'Status', 'STD', 'STA', 'Crew']
+    col_map = dayrep.match_header(row)
+    assert col_map is not None
+    assert col_map['sta'] == 7, f"sta mapped to column {col_map['sta']}"
+    assert col_map['std'] == 6
+
+    # No STA column at all: 'Status' must not be taken for it, the default applies
+    row = ['Date', 'Reg', 'Flt', 'Dep', 'Arr', 'Status', 'STD']
+    col_map = dayrep.match_header(row)
+    assert 'sta' not in col_map['found']
+    assert col_map['sta'] == dayrep.defaults['sta']
+    print("SUCCESS: 'status' is not mistaken for 'sta'")
+
+
+def test_unknown_rows():
+    print("Testing unrelated CSV...")
+    rows = [['foo', 'bar'], ['1', '2']]
+    assert detect_report(rows) is None
+    assert find_report_header('dayrep', rows) == (None, None, None)
+    print("SUCCESS: unknown layout is not detected")
+
+
+def expand_runs(statuses, breaks=frozenset()):
+    """Day-by-day view of duty_runs output"""
+    days = [None] * len(statuses)
+    for status, first, last in duty_runs(statuses, breaks):
+        for j in range(first, last + 1):
+            days[j] = status
+    return days
+
+
+def test_duty_runs():
+    print("Testing RLE of duty statuses...")
+    statuses = ['SBY', 'SBY', None, 'SL', 'SL', 'CSL', 'OSBY', 'OSBY', 'OSBY', None]
+    assert list(duty_runs(statuses)) == [('SBY', 0, 1), ('SL', 3, 4), ('CSL', 5, 5), ('OSBY', 6, 8)]
+    assert expand_runs(statuses) == statuses
+    # a break (the next column is not the following day) splits an otherwise merged run
+    assert list(duty_runs(statuses, frozenset({7}))) == [
+        ('SBY', 0, 1), ('SL', 3, 4), ('CSL', 5, 5), ('OSBY', 6, 6), ('OSBY', 7, 8)
+    ]
+    assert list(duty_runs([None, None])) == [] and list(duty_runs([])) == []
+    print("SUCCESS: runs expand back to the input statuses")
+
+
+def test_schedule_matrix_ranges():
+    print("Testing matrix roster ranges against a day-by-day expansion...")
+    from data_processor import DataProcessor
+
+    file_name = 'Crew schedule 01-28Feb(standby,callsick, fatigue).csv'
+    rows = read_rows(file_name)
+    _, header_index, col_map = find_report_header('crew_schedule', rows)
+
+    # Reference: one (crew, status, day) entry per tracked cell
+    expected = Counter()
+    for row in rows[header_index + 1:]:
+        crew_id = row[col_map['id']].strip() if len(row) > col_map['id'] else ''
+        if not crew_id[:1].isdigit():
+            continue
+        for position in col_map['days']:
+            status = classify_duty_code(row[position]) if position < len(row) else None
+            if status:
+                day = f"{int(rows[header_index][position]):02d}/02/26"
+                expected[(crew_id, status, day)] += 1
+
+    processor = DataProcessor()
+    with open(file_name, 'rb') as f:
+        processor.process_crew_schedule_csv(file_path=file_name, file_content=f.read(), sync_db=False)
+
+    actual = Counter()
+    per_crew = {}
+    for record in processor.standby_records:
+        start = date(2000 + int(record['start_date'][6:]), int(record['start_date'][3:5]), int(record['start_date'][:2]))
+        end = date(2000 + int(record['end_date'][6:]), int(record['end_date'][3:5]), int(record['end_date'][:2]))
+        assert start <= end, record
+        per_crew.setdefault((record['crew_id'], record['status_type']), []).append((start, end))
+        while start <= end:
+            actual[(record['crew_id'], record['status_type'], start.strftime('%d/%m/%y'))] += 1
+            start += timedelta(days=1)
+
+    assert actual == expected, f"{len(actual)} expanded days vs {len(expected)} cells"
+    assert len(processor.standby_records) < sum(expected.values())
+
+    # Ranges are maximal: no two runs of one crew/status touch
+    for ranges in per_crew.values():
+        ranges.sort()
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            assert start > end + timedelta(days=1), ranges
+
+    # Per-date counts agree with the cells
+    for day, counts in processor.crew_schedule_by_date.items():
+        for status, count in counts.items():
+            assert count == sum(n for (_, s, d), n in expected.items() if s == status and d == day), (day, status)
+    print(f"SUCCESS: {len(processor.standby_records)} ranges cover the {sum(expected.values())} duty cells exactly")
+
+
+if __name__ == "__main__":
+    test_sample_reports()
+    test_sample_columns()
+    test_sta_does_not_match_status()
+    test_unknown_rows()
+    test_duty_runs()
+    test_schedule_matrix_ranges()
@@ -0,0 +1,119 @@
+"""
+Test that concurrent SingleFlight calls with the same key share one computation
+"""
+
+import sys
+import threading
+import time
+sys.path.insert(0, '.')
+
+from single_flight import SingleFlight, SingleFlightTimeout
+
+
+def run_concurrently(count, target):
+    results, errors = [None] * count, [None] * count
+    barrier = threading.Barrier(count)
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = target()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_coalesce():
+    print("Testing coalescing of concurrent calls...")
+    flight = SingleFlight()
+    executions = []
+
+    def compute():
+        executions.append(1)
+        time.sleep(0.2)
+        return {'value': 42}
+
+    results, errors = run_concurrently(10, lambda: flight.do('key', compute))
+    assert errors == [None] * 10, errors
+    assert len(executions) == 1, f"{len(executions)} executions"
+    # every caller gets the same object
+    assert all(result is results[0] for result in results)
+    assert flight.stats['executed'] == 1 and flight.stats['shared'] == 9, flight.stats
+    assert flight.in_flight() == 0
+
+    # no caching: the next call computes again
+    flight.do('key', compute)
+    assert len(executions) == 2
+    print("SUCCESS: 10 callers, 1 execution")
+
+
+def test_distinct_keys():
+    print("Testing distinct keys...")
+    flight = SingleFlight()
+    counter = iter(range(100))
+    lock = threading.Lock()
+
+    def compute():
+        time.sleep(0.05)
+        with lock:
+            return next(counter)
+
+    keys = iter(range(5))
+    results, _ = run_concurrently(5, lambda: flight.do(next(keys), compute))
+    assert sorted(results) == list(range(5)), results
+    assert flight.stats['executed'] == 5
+    print("SUCCESS: different keys are computed separately")
+
+
+def test_shared_exception():
+    print("Testing shared exception...")
+    flight = SingleFlight()
+    executions = []
+
+    def fail():
+        executions.append(1)
+        time.sleep(0.1)
+        raise ValueError('backend down')
+
+    _, errors = run_concurrently(5, lambda: flight.do('key', fail))
+    assert len(executions) == 1
+    assert all(isinstance(e, ValueError) for e in errors), errors
+    assert flight.in_flight() == 0
+    print("SUCCESS: the leader's exception reaches every caller")
+
+
+def test_timeout():
+    print("Testing waiter timeout...")
+    flight = SingleFlight(timeout=0.05)
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.3)
+        return 'done'
+
+    leader = threading.Thread(target=lambda: flight.do('key', slow))
+    leader.start()
+    started.wait()
+    try:
+        flight.do('key', slow)
+        raise AssertionError("SingleFlightTimeout not raised")
+    except SingleFlightTimeout:
+        pass
+    leader.join()
+    assert flight.stats['timeouts'] == 1
+    assert flight.do('key', lambda: 'again') == 'again'
+    print("SUCCESS: waiters give up after the timeout, the key is released")
+
+
+if __name__ == "__main__":
+    test_coalesce()
+    test_distinct_keys()
+    test_shared_exception()
+    test_timeout()
@@ -0,0 +1,75 @@
+"""
+Test the incremental static build (StaticSiteBuilder) on a small processor
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, '.')
+
+from data_processor import DataProcessor
+from static_site import MANIFEST_NAME, StaticSiteBuilder
+
+DATES = ('15/01/26', '16/01/26', '17/01/26')
+
+
+def actual(flight_date, flight_no, reg, sta='10:00'):
+    return {
+        'flight_date': flight_date, 'flight_no': flight_no, 'ac_reg': reg,
+        'departure': 'SGN', 'arrival': 'HAN', 'std': '08:00', 'sta': sta
+    }
+
+
+def make_processor():
+    processor = DataProcessor()
+    processor.apply_etl_delta('flights', [
+        actual(day, f"VJ{i}", f"VN-A50{i}") for i, day in enumerate(DATES)
+    ], [])
+    return processor
+
+
+def snapshot(out_dir: Path):
+    """rel path -> mtime of every built file except the manifest"""
+    return {
+        str(path.relative_to(out_dir)): path.stat().st_mtime_ns
+        for path in out_dir.rglob('*') if path.is_file() and path.name != MANIFEST_NAME
+    }
+
+
+def test_incremental_build():
+    print("Testing incremental static builds...")
+    processor = make_processor()
+    out_dir = Path(tempfile.mkdtemp())
+
+    first = StaticSiteBuilder(processor, out_dir).build()
+    assert first['built_dates'] == list(DATES)
+    for key in ('2026-01-15', '2026-01-16', '2026-01-17'):
+        assert (out_dir / 'data' / f'{key}.json').exists() and (out_dir / key / 'index.html').exists()
+    before = snapshot(out_dir)
+
+    # nothing changed: no date is rendered and no file is touched
+    again = StaticSiteBuilder(processor, out_dir).build()
+    assert again['built_dates'] == [] and again['skipped_dates'] == list(DATES)
+    assert again['written'] == [] and again['removed'] == []
+    assert snapshot(out_dir) == before
+
+    # one changed date: only its view (plus the all-dates totals) is rewritten
+    processor.apply_etl_delta('flights', [actual('16/01/26', 'VJ1', 'VN-A501', sta='11:00')], [])
+    changed = StaticSiteBuilder(processor, out_dir).build()
+    assert changed['built_dates'] == ['16/01/26']
+    per_date = [p for p in changed['written'] if p.startswith('2026-') or p.startswith('data/2026-')]
+    assert per_date == ['data/2026-01-16.json'], changed['written']
+
+    # a date that disappeared: its page, its view and its directory are removed
+    processor.apply_etl_delta('flights', [], [('17/01/26', 'VJ2')])
+    removed = StaticSiteBuilder(processor, out_dir).build()
+    assert sorted(removed['removed']) == ['2026-01-17/index.html', 'data/2026-01-17.json']
+    assert not (out_dir / 'data' / '2026-01-17.json').exists()
+    assert not os.path.exists(out_dir / '2026-01-17')
+    assert (out_dir / 'data' / '2026-01-15.json').exists()
+    print("SUCCESS: unchanged builds write nothing, changed dates rewrite only themselves, removed dates are deleted")
+
+
+if __name__ == "__main__":
+    test_incremental_build()
@@ -0,0 +1,152 @@
+"""
+Test SQLiteBackend round trips on an in-memory database
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import supabase_client
+from storage_backend import SQLiteBackend
+
+
+FLIGHTS = [
+    {'date': '31/12/25', 'calendar_date': '31/12/25', 'reg': 'VN-A500', 'flt': '100', 'dep': 'SGN',
+     'arr': 'HAN', 'std': '08:00', 'sta': '10:00', 'crew': '-AN(CP) 1001'},
+    {'date': '15/01/26', 'calendar_date': '15/01/26', 'reg': 'VN-A501', 'flt': '200', 'dep': 'HAN',
+     'arr': 'DAD', 'std': '09:00', 'sta': '10:20', 'crew': '-BINH(FO) 1002'},
+    {'date': '15/01/26', 'calendar_date': '16/01/26', 'reg': 'VN-A502', 'flt': '300', 'dep': 'SGN',
+     'arr': 'PQC', 'std': '01:00', 'sta': '02:00', 'crew': ''},
+    {'date': '01/02/26', 'calendar_date': '01/02/26', 'reg': 'VN-A500', 'flt': '400', 'dep': 'DAD',
+     'arr': 'SGN', 'std': '12:00', 'sta': '13:10', 'crew': ''},
+]
+
+
+def columns(name):
+    return getattr(supabase_client, name).split(',')
+
+
+def test_csv_tables_round_trip():
+    print("Testing CSV tables round trip...")
+    backend = SQLiteBackend(':memory:')
+
+    backend.insert_flights(FLIGHTS)
+    assert backend.get_flights() == FLIGHTS
+    assert [f['flt'] for f in backend.get_flights('15/01/26')] == ['200', '300']
+    # DD/MM/YYYY and ISO spell the same day
+    assert backend.get_flights('15/01/2026') == backend.get_flights('2026-01-15')
+    assert backend.get_flights('15/01/26', columns='reg, flt') == [
+        {'reg': 'VN-A501', 'flt': '200'}, {'reg': 'VN-A502', 'flt': '300'}
+    ]
+    # ranges are chronological across the year boundary, not text order
+    assert [f['flt'] for f in backend.get_flights_range('31/12/25', '15/01/26')] == ['100', '200', '300']
+    assert backend.get_flights_range('bad', '15/01/26') == []
+    assert backend.get_available_dates() == ['31/12/25', '15/01/26', '01/02/26']
+    # full refresh replaces the table
+    backend.insert_flights(FLIGHTS[:1])
+    assert backend.get_flights() == FLIGHTS[:1]
+
+    util = [dict(zip(columns('AC_UTILIZATION_COLUMNS'), ['15/01/26', '320', '10:00', '02:00', '12:00', 5, 1, 6, '11.5'])),
+            dict(zip(columns('AC_UTILIZATION_COLUMNS'), ['16/01/26', '321', '09:00', '00:00', '09:00', 4, 0, 4, '9.0']))]
+    backend.insert_ac_utilization(util)
+    assert backend.get_ac_utilization() == util
+    assert backend.get_ac_utilization('16/01/2026') == util[1:]
+
+    hours = [dict(zip(columns('ROLLING_HOURS_COLUMNS'),
+                      [cid, f"CREW {cid}", '1', '50:00', '600:00', h, 600.0, h / 100, 60.0, 'normal', 'normal']))
+             for cid, h in (('1001', 50.0), ('1002', 95.5))]
+    backend.insert_rolling_hours(hours)
+    assert backend.get_rolling_hours() == hours[::-1]
+    assert backend.get_rolling_hours(columns='crew_id') == [{'crew_id': '1002'}, {'crew_id': '1001'}]
+
+    schedule = [{'date': '15/01/26', 'crew_id': '1001', 'status_type': 'SBY'},
+                {'date': '16/01/26', 'crew_id': '1002', 'status_type': 'SL'}]
+    backend.insert_crew_schedule(schedule)
+    assert backend.get_crew_schedule() == schedule
+    assert backend.get_crew_schedule('16/01/26') == schedule[1:]
+
+    assert backend.clear_all_data()
+    assert backend.get_flights() == [] and backend.get_rolling_hours() == []
+    print("SUCCESS: flights, ac_utilization, rolling_hours and crew_schedule round trip")
+
+
+def test_standby_range_matching():
+    print("Testing standby range matching...")
+    backend = SQLiteBackend(':memory:')
+    records = [
+        {'crew_id': '1001', 'name': 'AN', 'base': 'SGN', 'status_type': 'SBY',
+         'start_date': '15/01/26', 'end_date': '15/01/26'},
+        {'crew_id': '1002', 'name': 'BINH', 'base': 'HAN', 'status_type': 'SL',
+         'start_date': '30/12/25', 'end_date': '02/01/26'},
+        {'crew_id': '1003', 'name': 'CUONG', 'base': 'DAD', 'status_type': 'CSL',
+         'start_date': '14/01/26', 'end_date': '20/01/26'},
+    ]
+    # a duplicate of the upsert key in one file is absorbed
+    backend.upsert_standby_records(records + [dict(records[0], name='AN 2')])
+
+    assert len(backend.get_standby_records()) == 3
+    assert sorted(r['crew_id'] for r in backend.get_standby_records('15/01/26')) == ['1001', '1003']
+    assert [r['name'] for r in backend.get_standby_records('15/01/26') if r['crew_id'] == '1001'] == ['AN 2']
+    # a duty spanning the year boundary covers both ends and the days between
+    for day in ('30/12/25', '01/01/2026', '2026-01-02'):
+        assert [r['crew_id'] for r in backend.get_standby_records(day)] == ['1002'], day
+    assert backend.get_standby_records('03/01/26') == []
+    assert backend.get_standby_records('not a date') == []
+    print("SUCCESS: standby records match every day of their range")
+
+
+def test_aims_tables_round_trip():
+    print("Testing AIMS staging tables round trip...")
+    backend = SQLiteBackend(':memory:')
+    actual = {'flight_date': '15/01/26', 'flight_no': 'VJ100', 'ac_reg': 'VN-A500', 'departure': 'SGN',
+              'arrival': 'HAN', 'std': '08:00', 'sta': '10:00', 'atd': '08:05', 'ata': '10:02',
+              'block_minutes': 117, 'status': 'ARR'}
+    other = dict(actual, flight_date='16/01/26', flight_no='VJ200')
+    backend.upsert_fact_actuals([actual, other])
+    backend.upsert_fact_actuals([dict(actual, ata='10:10', block_minutes=125)])
+    assert len(backend.get_fact_actuals()) == 2
+    assert backend.get_fact_actuals(['15/01/2026']) == [dict(actual, ata='10:10', block_minutes=125)]
+    assert backend.get_fact_actuals(['15/01/26', '16/01/26'], columns='flight_no') == [
+        {'flight_no': 'VJ100'}, {'flight_no': 'VJ200'}
+    ]
+
+    leg = {'leg_date': '15/01/26', 'flight_no': 'VJ100', 'dep': 'SGN', 'reg': 'VN-A500', 'std': '08:00',
+           'crew_id': '1001', 'crew_name': 'AN', 'crew_role': 'CP'}
+    backend.insert_fact_leg_members([leg, dict(leg, crew_id='1002', crew_role='FO'),
+                                     dict(leg, leg_date='16/01/26')])
+    backend.insert_fact_leg_members([dict(leg, crew_role='PU')])
+    assert len(backend.get_fact_leg_members()) == 3
+    assert sorted(r['crew_role'] for r in backend.get_fact_leg_members('15/01/26')) == ['FO', 'PU']
+    assert len(backend.get_fact_leg_members(dates=['15/01/26', '16/01/2026'])) == 3
+
+    backend.insert_etl_notification({'stage': 'flights', 'dates': ['15/01/26'], 'origin': 'a',
+                                     'created_at': '2026-01-15T00:00:01+00:00'})
+    backend.insert_etl_notification({'stage': 'leg_members', 'dates': [], 'origin': 'b',
+                                     'created_at': '2026-01-15T00:00:02+00:00'})
+    rows = backend.get_etl_notifications()
+    assert [r['stage'] for r in rows] == ['flights', 'leg_members'] and rows[0]['dates'] == ['15/01/26']
+    assert [r['origin'] for r in backend.get_etl_notifications(since=rows[0]['created_at'])] == ['b']
+    assert len(backend.get_etl_notifications(limit=1)) == 1
+    print("SUCCESS: fact_actuals, fact_leg_members and etl_notifications round trip")
+
+
+def test_rejects_invalid_columns():
+    print("Testing column projection validation...")
+    backend = SQLiteBackend(':memory:')
+    for bad in ('reg; DROP TABLE flights', 'reg, nope', 'reg as x', '"reg"', 'reg,'):
+        try:
+            backend.get_flights(columns=bad)
+            raise AssertionError(f"accepted {bad!r}")
+        except ValueError:
+            pass
+    # derived ISO columns are readable, '*' selects everything
+    assert backend.get_flights(columns='op_date') == []
+    backend.insert_flights(FLIGHTS[:1])
+    assert backend.get_flights(columns='*')[0]['op_date'] == '2025-12-31'
+    print("SUCCESS: invalid projections raise ValueError")
+
+
+if __name__ == "__main__":
+    test_csv_tables_round_trip()
+    test_standby_range_matching()
+    test_aims_tables_round_trip()
+    test_rejects_invalid_columns()